@@ -0,0 +1,406 @@
+# -----------------------
+# HTTP API
+# -----------------------
+# Serviço HTTP/JSON em asyncio (só biblioteca padrão) com as operações do menu:
+#   POST   /transacoes                 {"valor": "250,00", "categoria": "casa"[, "UUID": ...]}
+#   GET    /transacoes[?categoria=C][&min=V][&max=V][&uuid=PREFIXO][&limite=N]   (filtro pelos índices)
+#   GET    /transacoes/<uuid>
+#   PUT    /transacoes/<uuid>          {"valor": ..., "categoria": ...[, "versao": n]}   (PATCH também)
+#   DELETE /transacoes/<uuid>[?versao=n]
+#   GET    /relatorios/total|m5|media|ultimas|mensal|percentis[?categoria=C][&k=N]
+#   GET    /relatorios/histograma[?categoria=C][&baldes=N]
+#   GET    /relatorios/periodo?de=dd/mm/aaaa&ate=dd/mm/aaaa[&categoria=C]
+# As transações ficam em memória no repositório. As escritas que chegam juntas viram um
+# lote só no aplicar_lote (uma escrita no journal) e cada requisição só é respondida
+# depois que o seu lote foi gravado. O loop só cuida das conexões: buscas, relatórios e
+# gravações rodam em threads do executor, então o fsync de um lote não segura ninguém.
+#   python desafio_final_grupo3_ultimaversao.py serve [--host H] [--porta P]
+#   python desafio_final_grupo3_ultimaversao.py carga [--requisicoes N] [--concorrencia C]
+# Não importa o script: o servidor recebe dele o próprio módulo (`app`), de onde vêm a
+# validação, os relatórios e o ConflitoVersao. O CLI (serve e carga) chama servir_http e
+# teste_de_carga por aqui.
+import asyncio
+import functools
+import json
+import math
+import random
+import threading
+import time
+import urllib.parse
+
+from data import settings
+
+JANELA_ESCRITA_HTTP = 0.002  # segundos que o servidor espera juntando escritas antes de gravar o lote
+LOTE_MAXIMO_HTTP = 5_000     # operações por gravação
+CORPO_MAXIMO_HTTP = 1 << 20  # bytes aceitos no corpo de uma requisição
+
+_MOTIVOS_HTTP = {200: "OK", 201: "Created", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+                 409: "Conflict", 413: "Payload Too Large", 500: "Internal Server Error"}
+
+class ErroHTTP(Exception):
+    """Erro que vira a resposta {"erro": mensagem} com esse status."""
+
+    def __init__(self, status, mensagem):
+        super().__init__(mensagem)
+        self.status = status
+
+class ServidorTransacoes:
+    """
+    Atende as requisições da API sobre um repositório já carregado.
+    O repositório é usado fora do loop (ver _em_thread). As gravações são serializadas
+    por `_lock_repositorio`, que os relatórios e filtros também pegam: eles percorrem as
+    estruturas em memória que a gravação altera. A busca por UUID não precisa dela.
+    `app` é o módulo do script.
+    """
+
+    def __init__(self, repo, app, janela=JANELA_ESCRITA_HTTP, lote_maximo=LOTE_MAXIMO_HTTP):
+        self.repo = repo
+        self.app = app
+        self.janela = janela
+        self.lote_maximo = lote_maximo
+        self._pendentes = []   # (operação, future de quem pediu)
+        self._gravacao = None  # tarefa que grava os pendentes, se já agendada
+        self._adicoes = set()  # UUIDs (em minúsculas) de cadastros ainda não gravados
+        self._lock_repositorio = threading.Lock()
+        self.lotes_gravados = 0
+        self.operacoes_gravadas = 0
+
+    def _travado(self, funcao, *args):
+        with self._lock_repositorio:
+            return funcao(*args)
+
+    async def _em_thread(self, funcao, *args, travar=False):
+        """Roda funcao(*args) numa thread do executor; com `travar`, sem gravação em andamento."""
+        if travar:
+            funcao, args = self._travado, (funcao, *args)
+        return await asyncio.get_running_loop().run_in_executor(None, functools.partial(funcao, *args))
+
+    # --- escritas agrupadas ---
+
+    async def escrever(self, operacao):
+        """Enfileira a operação (op, transação[, original]) e espera o lote dela chegar ao disco."""
+        futuro = asyncio.get_running_loop().create_future()
+        self._pendentes.append((operacao, futuro))
+        if self._gravacao is None:
+            self._gravacao = asyncio.ensure_future(self._gravar_pendentes())
+        await futuro
+
+    async def _gravar_pendentes(self):
+        try:
+            await asyncio.sleep(self.janela)
+            while self._pendentes:  # o que chega durante uma gravação vai no lote seguinte
+                lote, self._pendentes = self._pendentes[:self.lote_maximo], self._pendentes[self.lote_maximo:]
+                erros = await self._em_thread(self._gravar, [operacao for operacao, _ in lote], travar=True)
+                self._responder(lote, erros)
+        finally:
+            self._gravacao = None
+
+    def _gravar(self, operacoes):
+        """Grava o lote (chamado com _lock_repositorio); retorna o erro de cada operação, ou None."""
+        try:
+            self.repo.aplicar_lote(operacoes)
+            erros = [None] * len(operacoes)
+        except self.app.ConflitoVersao:
+            # um conflito descarta o lote inteiro: grava uma a uma para que só a operação em conflito falhe
+            erros = []
+            for operacao in operacoes:
+                try:
+                    self.repo.aplicar_lote([operacao])
+                    erros.append(None)
+                except self.app.ConflitoVersao as e:
+                    erros.append(e)
+        except Exception as e:
+            erros = [e] * len(operacoes)
+        self.lotes_gravados += 1
+        self.operacoes_gravadas += erros.count(None)
+        return erros
+
+    def _responder(self, lote, erros):
+        for (_, futuro), erro in zip(lote, erros):
+            if futuro.done():  # o cliente desconectou enquanto esperava
+                continue
+            if erro is None:
+                futuro.set_result(None)
+            else:
+                futuro.set_exception(erro)
+
+    def gravar_pendentes_agora(self):
+        """Grava o que ainda está na fila (ao encerrar o servidor)."""
+        lote, self._pendentes = self._pendentes, []
+        if lote:
+            self._responder(lote, self._travado(self._gravar, [operacao for operacao, _ in lote]))
+
+    # --- rotas ---
+
+    @staticmethod
+    def _ler_corpo(corpo):
+        try:
+            registro = json.loads(corpo or b"{}")
+        except (json.JSONDecodeError, UnicodeDecodeError) as e:
+            raise ErroHTTP(400, f"json inválido: {e}") from None
+        if not isinstance(registro, dict):
+            raise ErroHTTP(400, "o corpo deve ser um objeto json")
+        return registro
+
+    @staticmethod
+    def _versao(valor):
+        if valor is None:
+            return None
+        try:
+            if isinstance(valor, bool):
+                raise ValueError(valor)
+            return int(valor)
+        except (TypeError, ValueError):
+            raise ErroHTTP(400, f"versao inválida: {valor!r}") from None
+
+    async def _existente(self, uuid_transacao):
+        transacao = await self._em_thread(self.repo.buscar, uuid_transacao)
+        if transacao is None:
+            raise ErroHTTP(404, f"Nenhuma transação encontrada com esse UUID: {uuid_transacao}")
+        return transacao
+
+    async def tratar(self, metodo, alvo, corpo):
+        """Executa uma requisição e devolve (status, resposta em json)."""
+        url = urllib.parse.urlsplit(alvo)
+        parametros = {chave: valores[-1] for chave, valores in urllib.parse.parse_qs(url.query).items()}
+        partes = [urllib.parse.unquote(parte) for parte in url.path.split("/") if parte]
+
+        if partes == ["transacoes"] and metodo == "GET":
+            try:
+                limite = int(parametros.get("limite", self.app.LIMITE_LISTAGEM_FILTRO))
+                return 200, await self._em_thread(self.app.dados_filtro, self.repo, parametros.get("categoria"),
+                                                  parametros.get("min"), parametros.get("max"), parametros.get("uuid"), limite,
+                                                  travar=True)
+            except ValueError as e:
+                raise ErroHTTP(400, str(e)) from None
+
+        if partes == ["transacoes"]:
+            if metodo != "POST":
+                raise ErroHTTP(405, "use GET para filtrar ou POST para cadastrar")
+            try:
+                transacao = self.app.validar_transacao(self._ler_corpo(corpo))
+            except ValueError as e:
+                raise ErroHTTP(400, str(e)) from None
+            chave = str(transacao["UUID"]).strip().lower()
+            # o mesmo UUID pode estar na fila, ainda não gravado: o segundo cadastro sobrescreveria o primeiro
+            existe = chave in self._adicoes or await self._em_thread(self.repo.buscar, transacao["UUID"]) is not None
+            if existe or chave in self._adicoes:  # outro cadastro pode ter entrado na fila durante a busca
+                raise ErroHTTP(409, f"UUID {transacao['UUID']} já existe")
+            self._adicoes.add(chave)
+            try:
+                await self.escrever(("add", transacao))
+            finally:
+                self._adicoes.discard(chave)
+            return 201, await self._existente(transacao["UUID"])
+
+        if len(partes) == 2 and partes[0] == "transacoes":
+            uuid_transacao = partes[1]
+            if metodo == "GET":
+                return 200, await self._existente(uuid_transacao)
+            if metodo in ("PUT", "PATCH"):
+                registro = self._ler_corpo(corpo)
+                existente = await self._existente(uuid_transacao)
+                transacao = existente.copy()
+                versao = self._versao(registro.get("versao"))
+                transacao["versao"] = existente.get("versao", 1) if versao is None else versao
+                if registro.get("categoria"):
+                    transacao["categoria"] = str(registro["categoria"])
+                if registro.get("valor") not in (None, ""):
+                    try:
+                        transacao["valor"] = self.app._valor_lote(registro["valor"])
+                    except ValueError as e:
+                        raise ErroHTTP(400, str(e)) from None
+                # com "versao" no corpo a edição só passa se ninguém alterou a transação depois dela;
+                # sem, vale a versão lida agora, com o original para mesclar edições concorrentes na fila
+                await self.escrever(("edit", transacao) if versao is not None else ("edit", transacao, existente))
+                return 200, await self._existente(uuid_transacao)
+            if metodo == "DELETE":
+                existente = await self._existente(uuid_transacao)
+                versao = self._versao(parametros.get("versao"))
+                await self.escrever(("delete", {"UUID": existente["UUID"]} if versao is None
+                                     else {"UUID": existente["UUID"], "versao": versao}))
+                return 200, {"UUID": existente["UUID"], "excluida": True}
+            raise ErroHTTP(405, f"método {metodo} não suportado em /transacoes/<uuid>")
+
+        if len(partes) == 2 and partes[0] == "relatorios" and partes[1] in ("total", "m5", "media", "ultimas", "periodo", "mensal",
+                                                                            "percentis", "histograma"):
+            if metodo != "GET":
+                raise ErroHTTP(405, "relatórios só aceitam GET")
+            numeros = {}
+            for nome, padrao in (("k", 5), ("baldes", self.app.BALDES_HISTOGRAMA)):
+                try:
+                    numeros[nome] = int(parametros.get(nome, padrao))
+                except ValueError:
+                    raise ErroHTTP(400, f"{nome} inválido: {parametros[nome]!r}") from None
+                if numeros[nome] <= 0:
+                    raise ErroHTTP(400, f"{nome} deve ser positivo")
+            try:
+                return 200, await self._em_thread(self.app.dados_relatorio, self.repo, partes[1], parametros.get("categoria"),
+                                                  numeros["k"], parametros.get("de"), parametros.get("ate"), numeros["baldes"],
+                                                  travar=True)
+            except ValueError as e:
+                raise ErroHTTP(400, str(e)) from None
+
+        raise ErroHTTP(404, f"rota não encontrada: {url.path}")
+
+    # --- conexões ---
+
+    async def atender(self, reader, writer):
+        """Uma conexão HTTP/1.1 (keep-alive: várias requisições em sequência)."""
+        try:
+            while True:
+                try:
+                    cabecalho = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                    break
+                linhas = cabecalho.decode("latin-1").split("\r\n")
+                try:
+                    metodo, alvo, versao_http = linhas[0].split(" ", 2)
+                except ValueError:
+                    break
+                cabecalhos = {}
+                for linha in linhas[1:]:
+                    nome, _, valor = linha.partition(":")
+                    if nome:
+                        cabecalhos[nome.strip().lower()] = valor.strip()
+                conexao = cabecalhos.get("connection", "").lower()
+                manter = conexao == "keep-alive" or (conexao != "close" and versao_http.strip() == "HTTP/1.1")
+
+                try:
+                    tamanho = int(cabecalhos.get("content-length") or 0)
+                    if tamanho > CORPO_MAXIMO_HTTP:
+                        manter = False  # o corpo não é lido, então a conexão não pode ser reaproveitada
+                        raise ErroHTTP(413, f"corpo acima de {CORPO_MAXIMO_HTTP} bytes")
+                    corpo = await reader.readexactly(tamanho) if tamanho > 0 else b""
+                    status, resposta = await self.tratar(metodo.upper(), alvo, corpo)
+                except ErroHTTP as e:
+                    status, resposta = e.status, {"erro": str(e)}
+                except self.app.ConflitoVersao as e:
+                    status, resposta = 409, {"erro": str(e)}
+                except ValueError:
+                    status, resposta = 400, {"erro": "Content-Length inválido"}
+                    manter = False
+                except asyncio.IncompleteReadError:
+                    break
+                except Exception as e:
+                    status, resposta = 500, {"erro": f"{type(e).__name__}: {e}"}
+
+                dados = json.dumps(resposta, ensure_ascii=False, default=self.app._json_padrao).encode("utf-8")
+                writer.write((f"HTTP/1.1 {status} {_MOTIVOS_HTTP.get(status, '')}\r\n"
+                              "Content-Type: application/json; charset=utf-8\r\n"
+                              f"Content-Length: {len(dados)}\r\n"
+                              + ("" if manter else "Connection: close\r\n")
+                              + "\r\n").encode("latin-1") + dados)
+                await writer.drain()
+                if not manter:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+async def servir_http(repo, app, host="127.0.0.1", porta=8000):
+    """Carrega o banco na memória e atende a API do script `app` até ser interrompido (Ctrl+C)."""
+    quantidade = len(repo.transacoes())
+    api = ServidorTransacoes(repo, app)
+    servidor = await asyncio.start_server(api.atender, host, porta, backlog=1024)
+    enderecos = ", ".join("http://%s:%s" % soquete.getsockname()[:2] for soquete in servidor.sockets)
+    print(f"🌐 API com {quantidade} transações em {enderecos} (Ctrl+C para encerrar)")
+    try:
+        async with servidor:
+            await servidor.serve_forever()
+    finally:
+        api.gravar_pendentes_agora()
+        print(f"💾 {api.operacoes_gravadas} escrita(s) gravada(s) em {api.lotes_gravados} lote(s).")
+
+# --- teste de carga ---
+
+MISTURA_CARGA = {"get": 60, "add": 15, "edit": 10, "total": 5, "media": 5, "m5": 5}  # peso de cada operação
+
+async def _requisicao_http(reader, writer, metodo, alvo, corpo=None):
+    dados = b"" if corpo is None else json.dumps(corpo).encode("utf-8")
+    writer.write(f"{metodo} {alvo} HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n"
+                 f"Content-Length: {len(dados)}\r\n\r\n".encode("latin-1") + dados)
+    await writer.drain()
+    linhas = (await reader.readuntil(b"\r\n\r\n")).decode("latin-1").split("\r\n")
+    tamanho = next((int(linha.partition(":")[2]) for linha in linhas[1:] if linha.lower().startswith("content-length:")), 0)
+    resposta = await reader.readexactly(tamanho)
+    return int(linhas[0].split(" ", 2)[1]), json.loads(resposta) if resposta else None
+
+def percentil(ordenados, p):
+    """Percentil p (0-100) de uma lista já ordenada, pelo método do posto mais próximo."""
+    if not ordenados:
+        return None
+    return ordenados[min(len(ordenados) - 1, max(0, math.ceil(p / 100 * len(ordenados)) - 1))]
+
+async def teste_de_carga(host="127.0.0.1", porta=8000, requisicoes=10_000, concorrencia=50, mistura=MISTURA_CARGA, seed=settings.seed):
+    """
+    Abre `concorrencia` conexões keep-alive e dispara `requisicoes` requisições sorteadas
+    pela `mistura`. Cada conexão cadastra uma transação antes de o relógio começar, para
+    que consultas e edições tenham UUIDs válidos. Retorna vazão, p50/p99 e erros.
+    """
+    sorteio = random.Random(seed)
+    categorias = list(settings.categorias_proporcao)
+    operacoes, pesos = list(mistura), list(mistura.values())
+
+    def nova_transacao():
+        return {"valor": f"{sorteio.uniform(1, 1000):.2f}".replace(".", ","), "categoria": sorteio.choice(categorias)}
+
+    conexoes = [await asyncio.open_connection(host, porta) for _ in range(concorrencia)]
+    uuids, latencias, erros = [], {op: [] for op in operacoes}, {}
+    for reader, writer in conexoes:
+        status, resposta = await _requisicao_http(reader, writer, "POST", "/transacoes", nova_transacao())
+        if status != 201:
+            raise OSError(f"o cadastro inicial falhou ({status}): {resposta}")
+        uuids.append(resposta["UUID"])
+    restantes = iter(range(requisicoes))
+
+    async def cliente(reader, writer):
+        for _ in restantes:  # o iterador é compartilhado: as conexões dividem as requisições
+            op = sorteio.choices(operacoes, pesos)[0]
+            categoria = urllib.parse.quote(sorteio.choice(categorias))
+            if op == "get":
+                pedido = ("GET", f"/transacoes/{sorteio.choice(uuids)}", None)
+            elif op == "add":
+                pedido = ("POST", "/transacoes", nova_transacao())
+            elif op == "edit":
+                pedido = ("PUT", f"/transacoes/{sorteio.choice(uuids)}", {"valor": nova_transacao()["valor"]})
+            else:
+                pedido = ("GET", f"/relatorios/{op}?categoria={categoria}", None)
+            inicio = time.perf_counter()
+            status, resposta = await _requisicao_http(reader, writer, *pedido)
+            latencias[op].append(time.perf_counter() - inicio)
+            if status >= 400:
+                erros[status] = erros.get(status, 0) + 1
+            elif op == "add":
+                uuids.append(resposta["UUID"])
+
+    inicio = time.perf_counter()
+    try:
+        await asyncio.gather(*(cliente(reader, writer) for reader, writer in conexoes))
+    finally:
+        duracao = time.perf_counter() - inicio
+        for _, writer in conexoes:
+            writer.close()
+
+    def resumo(valores):
+        valores = sorted(valores)
+        return {"requisicoes": len(valores),
+                "p50_ms": round(percentil(valores, 50) * 1000, 3) if valores else None,
+                "p99_ms": round(percentil(valores, 99) * 1000, 3) if valores else None}
+
+    todas = [latencia for valores in latencias.values() for latencia in valores]
+    return {"conexoes": concorrencia, "segundos": round(duracao, 3),
+            "rps": round(len(todas) / duracao, 1) if duracao else None, **resumo(todas),
+            "por_operacao": {op: resumo(valores) for op, valores in latencias.items() if valores},
+            "erros": {str(status): quantidade for status, quantidade in sorted(erros.items())}}
+
+def formatar_carga(resultado):
+    texto = (f"🚀 {resultado['requisicoes']} requisições em {resultado['segundos']:.2f}s com {resultado['conexoes']} conexões: "
+             f"{resultado['rps']:.1f} req/s\n"
+             f"⏱️ Latência p50: {resultado['p50_ms']:.2f} ms | p99: {resultado['p99_ms']:.2f} ms\n")
+    for op, parcial in resultado["por_operacao"].items():
+        texto += f"   {op:<6} {parcial['requisicoes']:>8} req   p50 {parcial['p50_ms']:>8.2f} ms   p99 {parcial['p99_ms']:>8.2f} ms\n"
+    if resultado["erros"]:
+        texto += "⚠️ Respostas com erro: " + ", ".join(f"{status}: {n}" for status, n in resultado["erros"].items()) + "\n"
+    return texto.rstrip("\n").replace(".", ",")
@@ -0,0 +1,262 @@
+# -----------------------
+# SQLITE storage
+# -----------------------
+# Banco em SQLite (arquivo .db): cada transação é uma linha, com o valor em centavos
+# e índices no UUID (sem diferenciar maiúsculas), em (categoria, centavos) e em centavos.
+# Assim busca, filtros, totais, médias e top-k são respondidos pelo próprio SQL, sem carregar tudo.
+# load_bd/salvar_json/converter_bd escolhem o sqlite pela extensão, como no binário.
+# Aqui fica só o SQL, sem nada do script: o RepositorioTransacoesSQLite de lá (ver SQLITE
+# storage) converte as transações nas linhas (uuid, centavos, categoria, versao, criado_em)
+# gravadas aqui e passa o que as consultas precisam dele (o SketchQuantis).
+import contextlib
+import sqlite3
+import uuid
+
+_ESQUEMA_SQLITE = """
+CREATE TABLE IF NOT EXISTS transacoes (
+    id INTEGER PRIMARY KEY,  -- ordem de cadastro
+    uuid TEXT NOT NULL,
+    centavos INTEGER NOT NULL,
+    categoria TEXT,
+    versao INTEGER,          -- NULL: transação nunca gravada com versão (conta como 1)
+    criado_em TEXT           -- ISO 8601; NULL nas transações de antes das datas
+);
+CREATE UNIQUE INDEX IF NOT EXISTS transacoes_uuid ON transacoes (lower(uuid));
+CREATE INDEX IF NOT EXISTS transacoes_categoria ON transacoes (categoria, centavos);
+CREATE INDEX IF NOT EXISTS transacoes_centavos ON transacoes (centavos);
+CREATE TABLE IF NOT EXISTS meta (chave TEXT PRIMARY KEY, valor TEXT);
+"""
+_INSERIR_SQLITE = ("INSERT INTO transacoes (uuid, centavos, categoria, versao, criado_em) VALUES (?, ?, ?, ?, ?) "
+                   "ON CONFLICT (lower(uuid)) DO UPDATE SET uuid = excluded.uuid, centavos = excluded.centavos, "
+                   "categoria = excluded.categoria, versao = excluded.versao, criado_em = excluded.criado_em")
+_COLUNAS_SQLITE = "uuid, centavos, categoria, versao, criado_em"
+# versão dos dados (ver RepositorioTransacoesSQLite.versao_dados): um valor novo a cada escrita
+_NOVA_VERSAO_SQLITE = "INSERT INTO meta (chave, valor) VALUES ('versao_dados', ?) ON CONFLICT (chave) DO UPDATE SET valor = excluded.valor"
+
+def _marcar_versao_sqlite(conexao):
+    conexao.execute(_NOVA_VERSAO_SQLITE, (uuid.uuid4().hex,))
+
+def conectar_sqlite(filepath, compartilhada=False, sincronizar=True):
+    """
+    Abre (criando se preciso) o banco sqlite com o esquema das transações. Com
+    `compartilhada`, a conexão pode ser usada por outras threads (o servidor HTTP usa
+    o repositório das threads do executor), se o sqlite3 serializa o acesso a ela.
+    `sincronizar` é o SINCRONIZAR_ESCRITAS do script.
+    """
+    # timeout: escritores concorrentes esperam a vez em vez de falhar
+    conexao = sqlite3.connect(filepath, timeout=60, check_same_thread=not (compartilhada and sqlite3.threadsafety == 3))
+    conexao.execute("PRAGMA journal_mode=WAL")    # leitores não esperam os escritores
+    # FULL: o commit só volta depois do fsync do WAL (NORMAL nunca corrompe, mas pode perder os últimos commits)
+    conexao.execute(f"PRAGMA synchronous={'FULL' if sincronizar else 'NORMAL'}")
+    conexao.executescript(_ESQUEMA_SQLITE)
+    colunas = [coluna[1] for coluna in conexao.execute("PRAGMA table_info(transacoes)")]
+    if "versao" not in colunas:
+        conexao.execute("ALTER TABLE transacoes ADD COLUMN versao INTEGER")  # banco criado antes das versões
+    if "criado_em" not in colunas:
+        conexao.execute("ALTER TABLE transacoes ADD COLUMN criado_em TEXT")  # banco criado antes das datas
+    conexao.execute("CREATE INDEX IF NOT EXISTS transacoes_criado_em ON transacoes (criado_em)")
+    return conexao
+
+def _transacao_sqlite(uuid_transacao, centavos, categoria, versao=None, criado_em=None):
+    transacao = {"UUID": uuid_transacao, "valor": centavos / 100, "categoria": categoria}
+    if criado_em is not None:
+        transacao["criado_em"] = criado_em
+    if versao is not None:
+        transacao["versao"] = versao
+    return transacao
+
+def chave_sqlite(uuid_transacao):
+    return str(uuid_transacao).strip().lower()  # comparado com lower(uuid) no SQL
+
+def escrever_sqlite(linhas, filepath, sincronizar=True):
+    """Substitui todo o conteúdo do banco sqlite pelas linhas, em streaming e numa única transação."""
+    with contextlib.closing(conectar_sqlite(filepath, sincronizar=sincronizar)) as conexao, conexao:
+        conexao.execute("DELETE FROM transacoes")
+        conexao.executemany(_INSERIR_SQLITE, linhas)
+        _marcar_versao_sqlite(conexao)
+
+def iterar_sqlite(filepath, tamanho_bloco=10_000):
+    """Percorre o banco sqlite na ordem de cadastro, devolvendo (id da linha, transação)."""
+    with contextlib.closing(conectar_sqlite(filepath)) as conexao:
+        cursor = conexao.execute(f"SELECT id, {_COLUNAS_SQLITE} FROM transacoes ORDER BY id")
+        while True:
+            linhas = cursor.fetchmany(tamanho_bloco)
+            if not linhas:
+                return
+            for id_linha, *campos in linhas:
+                yield id_linha, _transacao_sqlite(*campos)
+
+def ler_registro_sqlite(filepath, id_linha):
+    with contextlib.closing(conectar_sqlite(filepath)) as conexao:
+        linha = conexao.execute(f"SELECT {_COLUNAS_SQLITE} FROM transacoes WHERE id = ?", (id_linha,)).fetchone()
+    return _transacao_sqlite(*linha) if linha else None
+
+class ConsultasSQLite:
+    """
+    Visão das transações de um banco sqlite com a mesma interface de consulta dos
+    AgregadosPorCategoria (quantidade/total/media/minimo/maximo/resumo) e da
+    TabelaColunar (contar/top_k): cada consulta vira um SELECT com agregação no banco.
+    Iterar devolve as transações na ordem de cadastro. `novo_sketch` cria o sketch de
+    quantis vazio da distribuicao.
+    """
+
+    def __init__(self, conexao, novo_sketch):
+        self.conexao = conexao
+        self.novo_sketch = novo_sketch
+
+    def _agregar(self, expressao, categoria=None):
+        if categoria is None:
+            return self.conexao.execute(f"SELECT {expressao} FROM transacoes").fetchone()[0]
+        return self.conexao.execute(f"SELECT {expressao} FROM transacoes WHERE categoria = ?", (categoria,)).fetchone()[0]
+
+    def __iter__(self):
+        cursor = self.conexao.execute(f"SELECT {_COLUNAS_SQLITE} FROM transacoes ORDER BY id")
+        for linha in cursor:
+            yield _transacao_sqlite(*linha)
+
+    def __len__(self):
+        return self.quantidade()
+
+    def categorias(self):
+        return [c for (c,) in self.conexao.execute("SELECT DISTINCT categoria FROM transacoes ORDER BY categoria")]
+
+    def quantidade(self, categoria=None):
+        return self._agregar("COUNT(*)", categoria)
+
+    contar = quantidade
+
+    def total(self, categoria=None):
+        return self._agregar("COALESCE(SUM(centavos), 0)", categoria) / 100
+
+    def media(self, categoria=None):
+        quantidade = self.quantidade(categoria)
+        return self.total(categoria) / quantidade if quantidade else None
+
+    def minimo(self, categoria=None):
+        centavos = self._agregar("MIN(centavos)", categoria)
+        return centavos / 100 if centavos is not None else None
+
+    def maximo(self, categoria=None):
+        centavos = self._agregar("MAX(centavos)", categoria)
+        return centavos / 100 if centavos is not None else None
+
+    def resumo(self, categoria=None):
+        return {"total": self.total(categoria), "quantidade": self.quantidade(categoria), "media": self.media(categoria),
+                "min": self.minimo(categoria), "max": self.maximo(categoria)}
+
+    def distribuicao(self, categoria=None):
+        """O sketch de quantis dos AgregadosPorCategoria, montado numa passada pelos centavos (memória limitada)."""
+        sketch = self.novo_sketch()
+        filtro, parametros = ("WHERE categoria = ?", (categoria,)) if categoria is not None else ("", ())
+        for centavos, quantidade in self.conexao.execute(f"SELECT centavos, COUNT(*) FROM transacoes {filtro} GROUP BY centavos",
+                                                        parametros):
+            sketch.adicionar(centavos, quantidade)
+        return sketch
+
+    def totais_por_mes(self, categoria=None):
+        """Mesmo formato dos AgregadosPorCategoria.totais_por_mes, com GROUP BY no mês do criado_em."""
+        filtro, parametros = ("WHERE categoria = ?", (categoria,)) if categoria is not None else ("", ())
+        linhas = self.conexao.execute(f"SELECT substr(criado_em, 1, 7) AS mes, SUM(centavos), COUNT(*) FROM transacoes {filtro} "
+                                      "GROUP BY mes ORDER BY mes IS NULL, mes", parametros)
+        return [{"mes": mes, "total": soma / 100, "quantidade": quantidade} for mes, soma, quantidade in linhas]
+
+    def top_k(self, k=5, m='max', categoria=None):
+        """
+        Mesmas regras da TabelaColunar.top_k, com ORDER BY ... LIMIT no banco
+        (empates na ordem de cadastro; 'median' é a distância à média em centavos).
+        """
+        if m == 'max':
+            ordem, parametros = "centavos DESC", []
+        elif m == 'min':
+            ordem, parametros = "centavos", []
+        elif m == 'median':
+            quantidade = self.quantidade(categoria)
+            if not quantidade:
+                return []
+            ordem, parametros = "ABS(centavos - ?)", [self._agregar("SUM(centavos)", categoria) / quantidade]
+        else:
+            raise ValueError(f"m deve ser 'max', 'min' ou 'median', não {m!r}")
+        filtro = "WHERE categoria = ?" if categoria is not None else ""
+        filtros = [categoria] if categoria is not None else []
+        linhas = self.conexao.execute(f"SELECT {_COLUNAS_SQLITE} FROM transacoes {filtro} ORDER BY {ordem}, id LIMIT ?",
+                                      filtros + parametros + [max(k, 0)])
+        return [_transacao_sqlite(*linha) for linha in linhas]
+
+    def ultimas(self, n=5, categoria=None):
+        """As n criadas por último, lidas do fim do índice em criado_em (sem data conta como mais antiga)."""
+        filtro, parametros = ("WHERE categoria = ?", [categoria]) if categoria is not None else ("", [])
+        linhas = self.conexao.execute(f"SELECT {_COLUNAS_SQLITE} FROM transacoes {filtro} ORDER BY criado_em DESC, id DESC LIMIT ?",
+                                      parametros + [n]).fetchall()
+        return [_transacao_sqlite(*linha) for linha in reversed(linhas)]
+
+    def entre(self, inicio=None, fim=None, categoria=None):
+        condicoes, parametros = ([], []) if categoria is None else (["categoria = ?"], [categoria])
+        if inicio is not None:
+            condicoes.append("criado_em >= ?")
+            parametros.append(inicio)
+        if fim is not None:
+            condicoes.append("(criado_em < ? OR criado_em IS NULL)")
+            parametros.append(fim)
+        filtro = "WHERE " + " AND ".join(condicoes) if condicoes else ""
+        linhas = self.conexao.execute(f"SELECT {_COLUNAS_SQLITE} FROM transacoes {filtro} ORDER BY criado_em, id", parametros)
+        return [_transacao_sqlite(*linha) for linha in linhas]
+
+    def buscar(self, uuid_procurado):
+        linha = self.conexao.execute(f"SELECT {_COLUNAS_SQLITE} FROM transacoes WHERE lower(uuid) = ?",
+                                     (chave_sqlite(uuid_procurado),)).fetchone()
+        return _transacao_sqlite(*linha) if linha else None
+
+    def filtrar(self, categoria=None, minimo=None, maximo=None, prefixo=None):
+        """O filtro do RepositorioTransacoes em SQL: a faixa de UUIDs usa o índice em lower(uuid)."""
+        condicoes, parametros = [], []
+        if categoria is not None:
+            condicoes.append("categoria = ?")
+            parametros.append(categoria)
+        if minimo is not None:
+            condicoes.append("centavos >= ?")
+            parametros.append(minimo)
+        if maximo is not None:
+            condicoes.append("centavos <= ?")
+            parametros.append(maximo)
+        if prefixo:
+            prefixo = chave_sqlite(prefixo)
+            condicoes.append("lower(uuid) >= ? AND lower(uuid) < ?")
+            parametros += [prefixo, prefixo + "\U0010ffff"]
+        filtro = "WHERE " + " AND ".join(condicoes) if condicoes else ""
+        linhas = self.conexao.execute(f"SELECT {_COLUNAS_SQLITE} FROM transacoes {filtro} ORDER BY centavos, id", parametros)
+        return [_transacao_sqlite(*linha) for linha in linhas]
+
+    def versao_dados(self):
+        """
+        Gravada na tabela meta, na mesma transação de cada lote: um valor aleatório
+        novo por escrita, então também distingue um banco apagado e recriado.
+        """
+        linha = self.conexao.execute("SELECT valor FROM meta WHERE chave = 'versao_dados'").fetchone()
+        return linha[0] if linha else "inicial"
+
+    @contextlib.contextmanager
+    def escrita(self):
+        """
+        Uma transação do banco para um lote. BEGIN IMMEDIATE reserva a escrita logo
+        no início, então as versões lidas dentro dela são as atuais (os leitores
+        continuam lendo a versão anterior enquanto isso, pelo WAL).
+        """
+        self.conexao.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            self.conexao.rollback()
+            raise
+        self.conexao.commit()
+
+    def gravar(self, operacoes):
+        """Grava as operações (op, chave, linha), com linha None nas exclusões, e marca uma nova versão dos dados."""
+        for op, chave, linha in operacoes:
+            if op == "add":
+                self.conexao.execute(_INSERIR_SQLITE, linha)
+            elif op == "edit":
+                self.conexao.execute("UPDATE transacoes SET uuid = ?, centavos = ?, categoria = ?, versao = ?, criado_em = ? WHERE lower(uuid) = ?",
+                                     linha + (chave,))
+            else:
+                self.conexao.execute("DELETE FROM transacoes WHERE lower(uuid) = ?", (chave,))
+        _marcar_versao_sqlite(self.conexao)
@@ -0,0 +1,196 @@
+# -----------------------
+# BENCHMARK
+# -----------------------
+# Mede as operações do menu em bancos de 10k a 10M transações, sem prompts:
+#   python desafio_final_grupo3_ultimaversao.py bench [--tamanhos 10k,100k,1M,10M] [--repeticoes N]
+#                                                     [--saida r.json] [--baseline b.json] [--atualizar-baseline]
+# Os bancos são gerados uma vez em ./bench/<n>/ (criar_transacoes com a seed do settings;
+# a partir de 1M pelo criar_bd_em_lote, que sorteia os mesmos valores) e reaproveitados.
+# Cada medição roda num processo novo, sobre uma cópia de trabalho do banco, e registra
+# tempo, pico de RSS durante a operação e bytes escritos.
+# Não importa o script: as operações medidas são as do módulo `app` recebido, chamadas como
+# o menu chamaria (o processo filho o recebe pelo nome).
+import builtins
+import contextlib
+import importlib
+import io
+import json
+import multiprocessing
+import os
+import platform
+import random
+import shutil
+import statistics
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import numpy as np  # opcional: só para registrar a versão no resultado
+except ImportError:
+    np = None
+
+try:
+    import resource  # pico de memória (fora do Linux, onde não há /proc)
+except ImportError:
+    resource = None
+
+from data import settings
+
+OPERACOES_BENCH = ("load_bd", "salvar_json", "total", "m5", "media", "consultar", "filtrar", "editar", "excluir")
+TAMANHOS_BENCH = "10k,100k,1M,10M"
+DIRETORIO_BENCH = "./bench"
+TOLERANCIA_BENCH = 0.25  # regressão: mais de 25% acima do baseline...
+PISOS_BENCH = {"segundos": 0.005, "pico_rss_mb": 8, "bytes_escritos": 4096}  # ...e acima dessa diferença absoluta (ruído)
+
+def tamanho_bench(texto):
+    """'10k' -> 10000, '1M' -> 1000000."""
+    texto = texto.strip()
+    multiplicador = {"k": 1_000, "m": 1_000_000}.get(texto[-1:].lower(), 1)
+    return int(float(texto[:-1] if multiplicador > 1 else texto) * multiplicador)
+
+def preparar_dados_bench(app, num_transacoes, diretorio=DIRETORIO_BENCH, seed=settings.seed):
+    """Gera (se ainda não existe) o banco de `num_transacoes`, com o índice, e retorna (caminho, UUIDs de amostra)."""
+    pasta = os.path.join(diretorio, str(num_transacoes))
+    filepath = os.path.join(pasta, "transactions.json")
+    caminho_amostra = os.path.join(pasta, "amostra.json")
+    if not os.path.exists(caminho_amostra):
+        with contextlib.redirect_stdout(io.StringIO()):
+            app.criar_bd_datado(num_transacoes, path2save=pasta, em_lote=num_transacoes >= 1_000_000)
+        # UUIDs espalhados pelo banco, sempre os mesmos para a mesma seed
+        posicoes = set(random.Random(seed).sample(range(max(1, num_transacoes * 9 // 10)), min(16, num_transacoes)))
+        amostra = [t["UUID"] for linha, t in enumerate(app.iterar_bd(filepath)) if linha in posicoes]
+        app.obter_indice(filepath).validar()  # o índice fica pronto, como num banco já em uso
+        with open(caminho_amostra, "w") as file:
+            json.dump(amostra, file)
+    with open(caminho_amostra) as file:
+        return filepath, json.load(file)
+
+def _copia_de_trabalho(app, filepath, pasta, com_indice=False):
+    """Cópia do banco para uma medição (o snapshot é só um hard link: nenhuma operação o reescreve no lugar)."""
+    shutil.rmtree(pasta, ignore_errors=True)
+    os.makedirs(pasta)
+    destino = os.path.join(pasta, os.path.basename(filepath))
+    try:
+        os.link(filepath, destino)
+    except OSError:
+        shutil.copy2(filepath, destino)  # mantém o mtime, que o índice confere
+    if com_indice and os.path.exists(app.caminho_indice(filepath)):
+        shutil.copy2(app.caminho_indice(filepath), app.caminho_indice(destino))
+    return destino
+
+def _zerar_pico_rss():
+    """Zera o pico de RSS do processo (Linux); retorna False se não der."""
+    try:
+        with open("/proc/self/clear_refs", "w") as file:
+            file.write("5")
+        return True
+    except OSError:
+        return False
+
+def _pico_rss_mb():
+    try:
+        with open("/proc/self/status") as file:
+            for linha in file:
+                if linha.startswith("VmHWM:"):
+                    return int(linha.split()[1]) / 1024
+    except OSError:
+        pass
+    if resource is None:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return pico / (1024 * 1024 if sys.platform == "darwin" else 1024)  # bytes no macOS, KB no Linux
+
+def _bytes_escritos():
+    """Bytes passados a write() pelo processo até agora (Linux), ou None."""
+    try:
+        with open("/proc/self/io") as file:
+            for linha in file:
+                if linha.startswith("wchar:"):
+                    return int(linha.split()[1])
+    except OSError:
+        pass
+    return None
+
+def _medir_operacao(nome_app, operacao, filepath, uuid_alvo):
+    """
+    Roda no processo filho: monta o estado que o menu teria (banco carregado e
+    repositório) e mede só a operação, respondendo os input() dela.
+    """
+    app = importlib.import_module(nome_app)  # o script já carregado no filho ("__main__" quando rodado direto)
+    respostas = iter({"m5": ["n"], "consultar": [uuid_alvo],
+                      "filtrar": ["casa", "100,00", "500,00", ""], "editar": [uuid_alvo, "", "123,45", "s"],
+                      "excluir": [uuid_alvo, "s"]}.get(operacao, []))
+    builtins.input = lambda mensagem="": next(respostas)
+    pasta, _ = os.path.split(filepath)
+
+    repo = None
+    if operacao not in ("load_bd", "salvar_json"):
+        repo = app.RepositorioTransacoes(filepath, transacoes=app.carregar_transacoes(filepath))
+    bd = app.carregar_transacoes(filepath) if operacao == "salvar_json" else None
+    executar = {
+        "load_bd": lambda: app.load_bd(filepath),
+        "salvar_json": lambda: app.salvar_json(bd, pasta, "transactions.salvo.json"),
+        "total": lambda: app.calcular_total_transacoes(repo.agregados()),
+        "m5": lambda: app.mostrar_m5_transacoes(repo),
+        "media": lambda: app.calcular_media(repo),
+        "consultar": lambda: app.consultar_transacao_por_ID(repo),
+        "filtrar": lambda: app.mostrar_transacoes_filtradas(repo),
+        "editar": lambda: app.editar_transacao_por_ID(repo),
+        "excluir": lambda: app.excluir_transacao(repo),
+    }[operacao]
+
+    zerado = _zerar_pico_rss()
+    escritos = _bytes_escritos()
+    with contextlib.redirect_stdout(io.StringIO()):  # na memória: o print não entra nos bytes escritos
+        inicio = time.perf_counter()
+        executar()
+        segundos = time.perf_counter() - inicio
+    depois = _bytes_escritos()
+    return {"segundos": segundos, "pico_rss_mb": _pico_rss_mb(), "pico_inclui_preparo": not zerado,
+            "bytes_escritos": None if escritos is None else depois - escritos}
+
+def executar_benchmark(app, tamanhos, operacoes=OPERACOES_BENCH, repeticoes=1, diretorio=DIRETORIO_BENCH):
+    """Mede cada operação do script `app` em cada tamanho (mediana de `repeticoes` processos); retorna um dicionário."""
+    contexto = multiprocessing.get_context("spawn")  # processo limpo: nada herdado da medição anterior
+    pasta_trabalho = os.path.join(diretorio, "trabalho")
+    resultados = {}
+    for num_transacoes in tamanhos:
+        print(f"📦 {num_transacoes} transações: preparando o banco...", flush=True)
+        filepath, amostra = preparar_dados_bench(app, num_transacoes, diretorio)
+        resultados[str(num_transacoes)] = {}
+        for operacao in operacoes:
+            medidas = []
+            for repeticao in range(repeticoes):
+                copia = _copia_de_trabalho(app, filepath, pasta_trabalho, com_indice=operacao in ("editar", "excluir"))
+                with ProcessPoolExecutor(1, mp_context=contexto) as pool:
+                    medidas.append(pool.submit(_medir_operacao, app.__name__, operacao, copia,
+                                               amostra[repeticao % len(amostra)]).result())
+            shutil.rmtree(pasta_trabalho, ignore_errors=True)
+            medida = {campo: (statistics.median(m[campo] for m in medidas) if medidas[0][campo] is not None else None)
+                      for campo in ("segundos", "pico_rss_mb", "bytes_escritos")}
+            medida["pico_inclui_preparo"] = medidas[0]["pico_inclui_preparo"]
+            medida["amostras_segundos"] = [round(m["segundos"], 6) for m in medidas]
+            resultados[str(num_transacoes)][operacao] = medida
+            print(f"   {operacao:<12} {medida['segundos']:>10.4f} s   pico {medida['pico_rss_mb'] or 0:>8.1f} MB   "
+                  f"escritos {medida['bytes_escritos'] if medida['bytes_escritos'] is not None else '-'} B", flush=True)
+    return {"gerado_em": time.strftime("%Y-%m-%dT%H:%M:%S"), "python": platform.python_version(),
+            "plataforma": platform.platform(), "numpy": np.__version__ if np is not None else None,
+            "processadores": os.cpu_count(), "repeticoes": repeticoes, "resultados": resultados}
+
+def comparar_benchmark(atual, baseline, tolerancia=TOLERANCIA_BENCH, pisos=PISOS_BENCH):
+    """Lista as medições piores que o baseline (tempo, pico de memória ou bytes escritos)."""
+    regressoes = []
+    for tamanho, operacoes in atual["resultados"].items():
+        for operacao, medida in operacoes.items():
+            base = baseline.get("resultados", {}).get(tamanho, {}).get(operacao)
+            if base is None:
+                continue
+            for metrica, piso in pisos.items():
+                novo, antigo = medida.get(metrica), base.get(metrica)
+                if novo is None or antigo is None:
+                    continue
+                if novo > antigo * (1 + tolerancia) and novo - antigo > piso:
+                    regressoes.append({"tamanho": int(tamanho), "operacao": operacao, "metrica": metrica,
+                                       "baseline": antigo, "atual": novo, "razao": round(novo / antigo, 2) if antigo else None})
+    return regressoes
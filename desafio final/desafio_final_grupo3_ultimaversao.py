@@ -1,11 +1,52 @@
 # -----------------------
 # depencies
 # -----------------------
+import argparse
+import array
+import asyncio
+import atexit
+import bisect
+import collections
+import collections.abc
+import contextlib
+import csv
+import datetime
+import functools
+import hashlib
+import heapq
+import itertools
 import json
+import math
+import mmap
+import operator
 import os
+import re
+import struct
 import uuid
 import random
 import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+INICIO_PROGRAMA = time.perf_counter()  # marco zero dos tempos de inicialização (ver WARM START)
+
+try:
+    import numpy as np  # opcional: usado pela tabela colunar dos relatórios
+except ImportError:
+    np = None
+
+try:
+    import fcntl  # travas de arquivo no Linux/macOS
+except ImportError:
+    fcntl = None
+    import msvcrt  # e no Windows
+
+import api_http
+import armazenamento_sqlite  # o SQL do banco .db (ver SQLITE storage)
+import benchmark
+import diagnostico
+import injecao_falhas
 
 # -----------------------
 # load settings
@@ -13,6 +54,30 @@ import sys
 sys.path.append('./data/')
 from data import settings
 
+# -----------------------
+# storage config
+# -----------------------
+USAR_JOURNAL = True                     # inserções/edições/exclusões vão para o journal em vez de reescrever o json
+LIMITE_JOURNAL_BYTES = 4 * 1024 * 1024  # acima desse tamanho o journal é compactado num novo snapshot em background
+FORMATO_SNAPSHOT = 'json'               # 'json', 'binario' (snapshot compacto em ./data/transactions.bin) ou 'sqlite' (./data/transactions.db)
+CONTA_PADRAO = '0000001-0'              # a conta padrão usa ./data/transactions.*; as outras ficam em ./data/contas/<conta>/
+SINCRONIZAR_ESCRITAS = True             # fsync do journal e do snapshot antes de dar a escrita por gravada (sobrevive a queda de energia)
+JANELA_GROUP_COMMIT = 0.0               # segundos que as escritas do repositório esperam juntas antes de uma gravação só (0 desliga)
+LIMITE_GROUP_COMMIT = 10_000            # operações na fila do group commit que já disparam a gravação
+
+_lock_journal = threading.Lock()   # serializa escritas no journal
+_lock_snapshot = threading.Lock()  # impede leitura do snapshot durante a troca feita pela compactação
+_thread_compactacao = None
+
+# -----------------------
+# reports config
+# -----------------------
+LIMITE_RELATORIO_SERIAL = 500_000  # abaixo disso os relatórios rodam num processo só (abrir o pool custa mais que somar)
+LIMITE_QUANTIS_EXATOS = 10_000     # valores distintos por categoria que o sketch de quantis ainda conta um a um (exato)
+ERRO_RELATIVO_QUANTIS = 0.005      # erro relativo máximo dos percentis acima disso (ver QUANTILE sketches)
+PERCENTIS_RELATORIO = (50, 90, 99)
+BALDES_HISTOGRAMA = 10             # faixas do histograma de valores
+
 # -----------------------
 # SYSTEM functions
 # -----------------------
@@ -45,37 +110,2984 @@ def criar_transacoes(proporcao_categorias, num_transacoes=1,  categoria=None, se
 
     return transacoes
 
-def salvar_json(transacoes, path2save, filename):
-    # create path if not exist
-    if not os.path.exists(path2save):
-        os.makedirs(path2save)
-    with open(os.path.join(path2save,filename), "w") as file:
-        json.dump(transacoes, file, indent=4)
-    print(f"Arquivo salvo em: {os.path.abspath(os.path.curdir)+'/'+path2save+'/'+filename}")
+def salvar_json(transacoes, path2save, filename):
+    # create path if not exist
+    if not os.path.exists(path2save):
+        os.makedirs(path2save)
+    # json ou binário vão para um temporário trocado de uma vez (sqlite: transação do banco),
+    # então parar no meio da gravação deixa o arquivo anterior inteiro
+    gravar_snapshot(transacoes, os.path.join(path2save,filename))
+    descartar_journais(os.path.join(path2save,filename))  # o snapshot já contém tudo o que estava no journal
+    print(f"Arquivo salvo em: {os.path.abspath(os.path.curdir)+'/'+path2save+'/'+filename}")
+
+def criar_bd(num_transacoes:int = 10000, proporcao_categorias:list = settings.categorias_proporcao, path2save="./data", filename='transactions.json', em_lote=False):
+    if em_lote:  # geração em lotes, gravando direto no disco (para milhões de transações)
+        return criar_bd_em_lote(num_transacoes, proporcao_categorias, path2save, filename)
+    salvar_json(criar_transacoes(num_transacoes=num_transacoes,  proporcao_categorias=proporcao_categorias),
+                path2save, filename
+    )
+
+def load_bd(filepath='./data/transactions.json'):
+    with _lock_snapshot:
+        bd = ler_snapshot(filepath)
+        bd = aplicar_journais(bd, filepath)
+    return bd
+
+def tela_inicial(conta=CONTA_PADRAO, carga=None):
+    print("Bem-vindo <teu nome inteiro aqui>!")
+    print(f'conta: {conta}')
+    print("\nEste programa permite gerenciar transações de sua conta pessoal.")
+    print("\nEscolha uma das opções abaixo:")
+    print("1. Visualizar relatórios")
+    print("2. Cadastrar transações")
+    print("3. Editar transações")
+    print("4. Excluir transações")
+    print("5. Consultar transação por ID")
+    print("7. Diagnóstico de desempenho")
+    print("-" * 10)
+    print("0. Sair")
+    print('\n')
+    if carga is not None:  # pré-carga do banco em background (ver WARM START)
+        carga.menu_exibido()
+        print(carga.status() + '\n')
+
+# -----------------------
+# MONEY
+# -----------------------
+# Dinheiro é contado em centavos inteiros: int64 na tabela colunar, no binário e no
+# sqlite, int do Python nos agregados. Assim totais e médias são exatos para qualquer N.
+# No dict da transação (e no json) o "valor" continua em reais, sempre o float mais
+# próximo de centavos/100: o json grava "452.93" e a leitura volta aos mesmos centavos.
+# Texto digitado ou importado passa por ler_valor ('1.234,56'), e as telas por formatar_valor.
+_VALOR_PT_BR = re.compile(r"([+-]?)(\d{1,3}(?:\.\d{3})+|\d+)(?:,(\d{1,2}))?")  # 1.234,56 / 1234,5 / 250
+_VALOR_PONTO = re.compile(r"([+-]?)(\d+)\.(\d{1,2})")                          # 1234.56 (ponto decimal)
+
+def ler_valor(texto):
+    """
+    Centavos (int) de um valor em texto: '1.234,56', '1234,56', '250', 'R$ 9,90' ou
+    '1234.56'. Texto vazio, não numérico ou com mais de duas casas decimais levanta ValueError.
+    """
+    limpo = str(texto).strip()
+    limpo = limpo[2:].strip() if limpo.upper().startswith("R$") else limpo
+    achado = _VALOR_PT_BR.fullmatch(limpo) or _VALOR_PONTO.fullmatch(limpo)
+    if achado is None:
+        raise ValueError(f"valor inválido: {texto!r}")
+    sinal, inteiro, fracao = achado.groups()
+    centavos = int(inteiro.replace(".", "")) * 100 + int((fracao or "0").ljust(2, "0"))
+    return -centavos if sinal == "-" else centavos
+
+def para_centavos(valor):
+    """Centavos (int) de um valor em reais: o float do json, int, Decimal ou texto (ver ler_valor)."""
+    if isinstance(valor, str):
+        return ler_valor(valor)
+    return round(valor * 100)
+
+def formatar_valor(valor, milhar=True):
+    """Valor em reais no formato brasileiro: 1234.5 -> '1.234,50' (sem o ponto de milhar se milhar=False)."""
+    centavos = para_centavos(valor)
+    reais, resto = divmod(abs(centavos), 100)
+    inteiro = f"{reais:,}".replace(",", ".") if milhar else str(reais)
+    return f"{'-' if centavos < 0 else ''}{inteiro},{resto:02d}"
+
+def somar_centavos(valores, quantidade=-1):
+    """
+    Soma exata, em centavos, de valores em reais. Com o numpy é vetorizada (e, sabendo
+    a `quantidade`, o array é alocado uma vez só): mais rápida que um sum() de floats.
+    """
+    if np is not None:
+        reais = np.fromiter(valores, dtype=np.float64, count=quantidade)
+        return int(np.rint(reais * 100).astype(np.int64).sum())
+    return sum(map(para_centavos, valores))
+
+# -----------------------
+# TIMESTAMPS
+# -----------------------
+# Cada transação guarda a data de criação em "criado_em" (ISO 8601, hora local, em segundos:
+# "2025-03-14T10:22:31"). Internamente a data vira um "instante": segundos desde
+# 1970-01-01 contados no próprio relógio local (sem fuso), o que basta para ordenar e
+# separar por mês. Transações antigas, sem a data, valem instante 0: são as mais antigas.
+_EPOCA = datetime.datetime(1970, 1, 1)
+JANELA_DATAS_SINTETICAS = 365 * 24 * 3600  # os bancos gerados ficam com datas no último ano
+
+def agora_iso():
+    return datetime.datetime.now().isoformat(timespec="seconds")
+
+def instante(texto):
+    """Segundos do "criado_em" (0 se ausente ou inválido)."""
+    if not texto:
+        return 0
+    try:
+        data = datetime.datetime.fromisoformat(texto)
+    except (TypeError, ValueError):
+        return 0
+    return int((data.replace(tzinfo=None) - _EPOCA).total_seconds())
+
+_DATA_DO_DIA = {}  # dia (segundos // 86400) -> 'aaaa-mm-dd'; são poucos milhares de dias distintos
+
+def data_do_dia(dia):
+    data = _DATA_DO_DIA.get(dia)
+    if data is None:
+        data = _DATA_DO_DIA[dia] = (_EPOCA + datetime.timedelta(days=dia)).date().isoformat()
+    return data
+
+def texto_instante(segundos):
+    dia, resto = divmod(int(segundos), 86400)
+    horas, resto = divmod(resto, 3600)
+    minutos, resto = divmod(resto, 60)
+    return f"{data_do_dia(dia)}T{horas:02d}:{minutos:02d}:{resto:02d}"
+
+def ler_data(texto, fim_do_dia=False):
+    """
+    Data digitada pelo usuário ('31/12/2025', '2025-12-31' ou com hora) como texto ISO.
+    Com `fim_do_dia`, uma data sem hora vira o início do dia seguinte (limite exclusivo).
+    """
+    texto = texto.strip()
+    for formato in ("%d/%m/%Y", "%d/%m/%Y %H:%M", "%d/%m/%Y %H:%M:%S"):
+        try:
+            data = datetime.datetime.strptime(texto, formato)
+            break
+        except ValueError:
+            continue
+    else:
+        try:
+            data = datetime.datetime.fromisoformat(texto).replace(tzinfo=None)
+        except ValueError:
+            raise ValueError(f"data inválida: {texto!r} (use dd/mm/aaaa ou aaaa-mm-dd)") from None
+    if fim_do_dia and len(texto) <= 10:
+        data += datetime.timedelta(days=1)
+    return data.isoformat(timespec="seconds")
+
+def mes_de(transacao):
+    """'aaaa-mm' da data de criação, ou None se a transação não tem data."""
+    if type(transacao) is Transacao:
+        return transacao.mes()
+    texto = transacao.get("criado_em")
+    return texto[:7] if isinstance(texto, str) and len(texto) >= 7 else None
+
+def datar_transacoes(transacoes, seed=settings.seed):
+    """
+    Põe "criado_em" nas transações geradas, espalhadas pelo último ano. É feito depois
+    dos valores e com outro gerador, então a sequência de valores da seed não muda.
+    """
+    for transacao, segundos in zip(transacoes, instantes_sinteticos(len(transacoes), seed)):
+        transacao["criado_em"] = texto_instante(segundos)
+    return transacoes
+
+def criar_bd_datado(num_transacoes:int = 10000, proporcao_categorias:dict = settings.categorias_proporcao, path2save="./data",
+                    filename='transactions.json', em_lote=False, seed=settings.seed):
+    """
+    Gera um banco como o criar_bd, mas com "criado_em" em todas as transações
+    (o criar_transacoes do sistema devolve as transações sem data).
+    """
+    if em_lote:  # o criar_bd_em_lote já grava as datas
+        return criar_bd_em_lote(num_transacoes, proporcao_categorias, path2save, filename, seed=seed)
+    transacoes = criar_transacoes(num_transacoes=num_transacoes, proporcao_categorias=proporcao_categorias, seed=seed)
+    salvar_json(datar_transacoes(transacoes, seed), path2save, filename)
+
+def instantes_sinteticos(quantidade, seed=settings.seed, fim=None):
+    """Instantes sorteados no último ano (até `fim`, em segundos), com um gerador próprio."""
+    if fim is None:
+        fim = instante(agora_iso())
+    inicio = fim - JANELA_DATAS_SINTETICAS
+    if np is not None:
+        return np.random.default_rng(seed).integers(inicio, fim, quantidade).tolist()
+    sorteio = random.Random(seed)
+    return [sorteio.randrange(inicio, fim) for _ in range(quantidade)]
+
+# -----------------------
+# TRANSACTION record
+# -----------------------
+# Em memória cada transação é uma Transacao com __slots__ em vez de um dict: o UUID
+# vira um int de 128 bits (o texto é refeito quando pedido; ids fora da forma canônica
+# ficam como texto), o valor fica em centavos, a categoria é a mesma string para todas
+# as transações dela e a data é um instante inteiro: ~2,4x menos memória por transação.
+# A Transacao também se comporta como o dict de antes (t['valor'], t.get('categoria'),
+# t.copy(), {**t}...), então o código que recebe dicts vale para as duas; os laços
+# dos relatórios usam os atributos direto. carregar_transacoes devolve Transacao (o load_bd
+# do sistema continua com dicts) e salvar_json grava o json de sempre.
+_CAMPOS_TRANSACAO = ("UUID", "valor", "categoria", "criado_em", "versao")
+_CAMPOS_CONHECIDOS = frozenset(_CAMPOS_TRANSACAO)
+_UUID_CANONICO = re.compile(r"[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}")
+_DATA_CANONICA = re.compile(r"\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}")
+_CATEGORIAS = {categoria: categoria for categoria in settings.categorias_proporcao}
+
+def categoria_interna(categoria):
+    """A string única da categoria: as do settings e as criadas pelo usuário são guardadas uma vez só."""
+    if categoria is None:
+        return None
+    return _CATEGORIAS.setdefault(categoria, categoria)
+
+def _int_uuid(texto):
+    """int de 128 bits de um UUID na forma canônica (minúsculas, com hífens), ou None."""
+    if len(texto) == 36 and _UUID_CANONICO.fullmatch(texto):
+        return int(texto.replace("-", ""), 16)
+    return None
+
+def _uuid_interno(valor):
+    texto = str(valor)
+    numero = _int_uuid(texto)
+    return texto if numero is None else numero
+
+def _texto_uuid(numero):
+    h = f"{numero:032x}"
+    return f"{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}"
+
+def _criado_em_interno(valor):
+    """Instante inteiro de um "criado_em" na forma canônica; outro valor (None, texto com fuso...) fica como veio."""
+    if type(valor) is str and len(valor) == 19 and _DATA_CANONICA.fullmatch(valor):
+        diferenca = datetime.datetime.fromisoformat(valor) - _EPOCA
+        segundos = diferenca.days * 86400 + diferenca.seconds
+        if segundos:
+            return segundos
+    return valor
+
+
+def chave_transacao(valor):
+    """Chave das transações em memória: o int do UUID (em qualquer caixa) ou o id em minúsculas."""
+    texto = str(valor).strip().lower()
+    numero = _int_uuid(texto)
+    return texto if numero is None else numero
+
+def chave_registro(transacao):
+    """chave_transacao do UUID de uma Transacao ou de um dict no formato do json."""
+    if type(transacao) is Transacao:
+        return transacao.chave()
+    return chave_transacao(transacao.get("UUID", ""))
+
+def _json_padrao(objeto):
+    """`default` dos json.dump(s): a Transacao vai para o json no formato de sempre."""
+    if isinstance(objeto, Transacao):
+        return objeto.para_dict()
+    raise TypeError(f"Object of type {type(objeto).__name__} is not JSON serializable")
+
+class Transacao(collections.abc.MutableMapping):
+    """
+    Uma transação: `uuid` (texto), `centavos` (int), `categoria`, `criado_em` (texto
+    ISO ou None), `versao` (int ou None) e `instante` (segundos da data, 0 se não há).
+    Campos do json que não são esses ficam em `extras` e voltam para o json do mesmo jeito.
+    """
+
+    __slots__ = ("_uuid", "centavos", "categoria", "_criado_em", "versao", "extras")
+
+    def __init__(self, uuid_transacao, centavos, categoria=None, criado_em=None, versao=None, extras=None):
+        self.uuid = uuid_transacao
+        self.centavos = centavos
+        self.categoria = categoria_interna(categoria)
+        self.criado_em = criado_em
+        self.versao = versao
+        self.extras = extras or None
+
+    @classmethod
+    def de(cls, registro):
+        """Transacao a partir de um dict no formato do json (uma Transacao volta como está)."""
+        if type(registro) is cls:
+            return registro
+        # campo a campo, sem os setters: é o laço da carga do banco
+        extras = None if registro.keys() <= _CAMPOS_CONHECIDOS else {
+            k: v for k, v in registro.items() if k not in _CAMPOS_CONHECIDOS}
+        return cls._de_campos(_uuid_interno(registro.get("UUID", "")), para_centavos(registro["valor"]),
+                              registro.get("categoria"), _criado_em_interno(registro.get("criado_em")),
+                              registro.get("versao"), extras)
+
+    @classmethod
+    def _de_campos(cls, uuid_interno, centavos, categoria, criado_em_interno, versao, extras):
+        transacao = cls.__new__(cls)
+        transacao._uuid, transacao.centavos, transacao.categoria = uuid_interno, centavos, categoria_interna(categoria)
+        transacao._criado_em, transacao.versao, transacao.extras = criado_em_interno, versao, extras
+        return transacao
+
+    def __reduce__(self):  # pickle (pool dos relatórios) direto dos campos, sem passar pelo texto
+        return Transacao._de_campos, (self._uuid, self.centavos, self.categoria, self._criado_em, self.versao, self.extras)
+
+    # --- campos guardados compactos ---
+
+    @property
+    def uuid(self):
+        return _texto_uuid(self._uuid) if type(self._uuid) is int else self._uuid
+
+    @uuid.setter
+    def uuid(self, valor):
+        self._uuid = _uuid_interno(valor)
+
+    def chave(self):
+        """A chave_transacao do UUID, sem refazer o texto quando ele está guardado como int."""
+        return self._uuid if type(self._uuid) is int else chave_transacao(self._uuid)
+
+    def uuid_bytes(self):
+        """(16 bytes, precisa guardar o texto) como o bytes_uuid, sem refazer o texto do UUID."""
+        if type(self._uuid) is int:
+            return self._uuid.to_bytes(16, "big"), False
+        return bytes_uuid(self._uuid)
+
+    @property
+    def criado_em(self):
+        return texto_instante(self._criado_em) if type(self._criado_em) is int else self._criado_em
+
+    @criado_em.setter
+    def criado_em(self, valor):
+        self._criado_em = _criado_em_interno(valor)
+
+    @property
+    def instante(self):
+        return self._criado_em if type(self._criado_em) is int else instante(self._criado_em)
+
+    def mes(self):
+        """'aaaa-mm' da data de criação, ou None se não há data (como o mes_de)."""
+        if type(self._criado_em) is int:
+            return data_do_dia(self._criado_em // 86400)[:7]
+        texto = self._criado_em
+        return texto[:7] if isinstance(texto, str) and len(texto) >= 7 else None
+
+    @property
+    def valor(self):
+        return self.centavos / 100
+
+    # --- interface de dict ---
+
+    def __getitem__(self, campo):
+        if campo == "UUID":
+            return self.uuid
+        if campo == "valor":
+            return self.centavos / 100
+        if campo == "categoria" and self.categoria is not None:
+            return self.categoria
+        if campo == "criado_em" and self._criado_em is not None:
+            return self.criado_em
+        if campo == "versao" and self.versao is not None:
+            return self.versao
+        if self.extras is not None and campo in self.extras:
+            return self.extras[campo]
+        raise KeyError(campo)
+
+    def __setitem__(self, campo, valor):
+        if campo == "UUID":
+            self.uuid = valor
+        elif campo == "valor":
+            self.centavos = para_centavos(valor)
+        elif campo == "categoria":
+            self.categoria = categoria_interna(valor)
+        elif campo == "criado_em":
+            self.criado_em = valor
+        elif campo == "versao":
+            self.versao = valor
+        else:
+            if self.extras is None:
+                self.extras = {}
+            self.extras[campo] = valor
+
+    def __delitem__(self, campo):
+        if campo not in self:
+            raise KeyError(campo)
+        if campo in ("UUID", "valor"):
+            raise KeyError(f"{campo} é obrigatório na transação")
+        if campo in _CAMPOS_CONHECIDOS:
+            setattr(self, {"criado_em": "_criado_em"}.get(campo, campo), None)
+        else:
+            del self.extras[campo]
+
+    def __iter__(self):
+        yield "UUID"
+        yield "valor"
+        if self.categoria is not None:
+            yield "categoria"
+        if self._criado_em is not None:
+            yield "criado_em"
+        if self.versao is not None:
+            yield "versao"
+        if self.extras:
+            yield from self.extras
+
+    def __len__(self):
+        return (2 + (self.categoria is not None) + (self._criado_em is not None) + (self.versao is not None)
+                + len(self.extras or ()))
+
+    def __contains__(self, campo):
+        if campo in ("UUID", "valor"):
+            return True
+        if campo in _CAMPOS_CONHECIDOS:
+            return getattr(self, {"criado_em": "_criado_em"}.get(campo, campo)) is not None
+        return bool(self.extras) and campo in self.extras
+
+    def get(self, campo, padrao=None):
+        try:
+            return self[campo]
+        except KeyError:
+            return padrao
+
+    def copy(self):
+        return Transacao._de_campos(self._uuid, self.centavos, self.categoria, self._criado_em, self.versao,
+                                    dict(self.extras) if self.extras else None)
+
+    def para_dict(self):
+        registro = {"UUID": self.uuid, "valor": self.centavos / 100}
+        if self.categoria is not None:
+            registro["categoria"] = self.categoria
+        if self._criado_em is not None:
+            registro["criado_em"] = self.criado_em
+        if self.versao is not None:
+            registro["versao"] = self.versao
+        if self.extras:
+            registro.update(self.extras)
+        return registro
+
+    def __repr__(self):
+        return repr(self.para_dict())
+
+# -----------------------
+# STORAGE functions
+# -----------------------
+# journal (write-ahead log): cada inserção, edição ou exclusão vira uma linha
+# no arquivo `<snapshot>.journal`, e o snapshot json só é reescrito na compactação.
+# Escritas duráveis: o snapshot é gravado num temporário, sincronizado (fsync) e trocado
+# com os.replace; o journal só recebe linhas inteiras, sincronizadas antes de a operação
+# ser dada por gravada, e as linhas de um lote só valem juntas (ver ler_operacoes_journal).
+
+CODIGO_FALHA_INJETADA = 86
+_falha_injetada = os.environ.get("TRANSACOES_FALHA") or None  # ver injecao_falhas.py
+
+def ponto_de_falha(nome, file=None, parcial=None):
+    """
+    Derruba o processo aqui, com os._exit (sem limpeza nenhuma, como uma queda de energia),
+    se a falha injetada é `nome`. Com `file`, antes grava `parcial` (um pedaço do que ia
+    ser escrito) e manda o buffer para o arquivo. Desligado é só uma comparação.
+    """
+    if _falha_injetada != nome:
+        return
+    if file is not None:
+        if parcial:
+            file.write(parcial)
+        file.flush()
+    os._exit(CODIGO_FALHA_INJETADA)
+
+def armar_falha(ponto, usar_journal=True):
+    """
+    Chamada pelo injecao_falhas no processo filho: arma a falha `ponto` e liga ou desliga o
+    journal. Pela função, e não pelo atributo do módulo: no filho do spawn o script roda como
+    __mp_main__, cujo dicionário é só uma cópia dos globais que as funções daqui enxergam.
+    """
+    global _falha_injetada, USAR_JOURNAL
+    _falha_injetada = ponto
+    USAR_JOURNAL = usar_journal
+
+def _fsync_pasta(filepath):
+    """fsync da pasta do arquivo: é o que torna o os.replace durável (só no POSIX)."""
+    if os.name != "posix":
+        return
+    pasta = os.open(os.path.dirname(os.path.abspath(filepath)), os.O_RDONLY)
+    try:
+        os.fsync(pasta)
+    finally:
+        os.close(pasta)
+
+def trocar_arquivo(temporario, filepath):
+    """
+    Põe o `temporario` já escrito no lugar de `filepath`: fsync dele, os.replace e fsync
+    da pasta. Quem lê (ou reabre o banco depois de uma queda) vê o arquivo antigo inteiro
+    ou o novo inteiro, nunca um pela metade.
+    """
+    ponto_de_falha("troca_antes_fsync")
+    if SINCRONIZAR_ESCRITAS:
+        with open(temporario, "rb") as file:
+            os.fsync(file.fileno())
+    ponto_de_falha("troca_antes_replace")
+    os.replace(temporario, filepath)
+    ponto_de_falha("troca_depois_replace")
+    if SINCRONIZAR_ESCRITAS:
+        _fsync_pasta(filepath)
+
+def formato_binario(filepath):
+    return filepath.endswith('.bin')
+
+def formato_sqlite(filepath):
+    return filepath.endswith(('.db', '.sqlite', '.sqlite3'))
+
+def _base_arquivos(filepath):
+    """
+    Prefixo dos arquivos auxiliares do snapshot (journal e índice). O binário mantém
+    a extensão (`transactions.bin.journal`) para não dividir o journal com o json.
+    """
+    return filepath if formato_binario(filepath) or formato_sqlite(filepath) else os.path.splitext(filepath)[0]
+
+def caminho_journal(filepath):
+    return _base_arquivos(filepath) + '.journal'
+
+def journais(filepath):
+    """
+    Retorna os journais do snapshot na ordem em que devem ser reaplicados:
+    primeiro o que está sendo compactado (se houver), depois o ativo.
+    """
+    journal = caminho_journal(filepath)
+    return [j for j in (journal + '.compactando', journal) if os.path.exists(j)]
+
+def descartar_journais(filepath):
+    with _lock_journal:
+        for journal in journais(filepath):
+            os.remove(journal)
+
+def caminho_bd(conta=CONTA_PADRAO, formato=FORMATO_SNAPSHOT):
+    """
+    Arquivo do banco da conta. Cada conta é uma partição separada (snapshot, journal
+    e índice próprios); a conta padrão continua em ./data/transactions.json.
+    """
+    if not re.fullmatch(r'\d{7}-\d', conta):
+        raise ValueError(f"Conta inválida: {conta!r} (use o formato 0000000-0)")
+    extensao = {'binario': '.bin', 'sqlite': '.db'}.get(formato, '.json')
+    pasta = './data' if conta == CONTA_PADRAO else os.path.join('./data', 'contas', conta)
+    return os.path.join(pasta, 'transactions' + extensao)
+
+def preparar_conta(conta=CONTA_PADRAO, formato=FORMATO_SNAPSHOT):
+    """
+    Caminho do banco da conta, criando a partição vazia na primeira vez que a conta é usada.
+    Para as contas novas: o banco da conta padrão é criado por preparar_bd_padrao.
+    """
+    filepath = caminho_bd(conta, formato)
+    if not os.path.exists(filepath):
+        os.makedirs(os.path.dirname(filepath), exist_ok=True)
+        with trava_arquivo(filepath):
+            if not os.path.exists(filepath):
+                gravar_snapshot([], filepath)
+    return filepath
+
+_travas = {}  # arquivo .lock -> estado da trava neste processo
+_lock_travas = threading.Lock()
+
+@contextlib.contextmanager
+def trava_arquivo(filepath, sufixo='.lock'):
+    """
+    Trava consultiva (flock / msvcrt.locking) em `<snapshot><sufixo>`, que serializa
+    os escritores de todos os processos que usam o mesmo banco. É reentrante dentro do
+    processo. Os leitores não a usam: o snapshot é trocado com os.replace e o journal
+    só recebe linhas inteiras, então ler nunca espera uma escrita.
+    """
+    caminho = _base_arquivos(filepath) + sufixo
+    with _lock_travas:
+        trava = _travas.setdefault(caminho, {"lock": threading.RLock(), "file": None, "nivel": 0})
+    with trava["lock"]:
+        if trava["nivel"] == 0:
+            trava["file"] = open(caminho, "a+b")
+            if fcntl is not None:
+                fcntl.flock(trava["file"].fileno(), fcntl.LOCK_EX)
+            else:
+                while True:
+                    try:
+                        trava["file"].seek(0)
+                        msvcrt.locking(trava["file"].fileno(), msvcrt.LK_LOCK, 1)
+                        break
+                    except OSError:  # LK_LOCK desiste depois de ~10s; continua esperando
+                        pass
+        trava["nivel"] += 1
+        try:
+            yield
+        finally:
+            trava["nivel"] -= 1
+            if trava["nivel"] == 0:
+                if fcntl is not None:
+                    fcntl.flock(trava["file"].fileno(), fcntl.LOCK_UN)
+                else:
+                    trava["file"].seek(0)
+                    msvcrt.locking(trava["file"].fileno(), msvcrt.LK_UNLCK, 1)
+                trava["file"].close()
+                trava["file"] = None
+
+class ConflitoVersao(Exception):
+    """A transação mudou (ou foi excluída) depois de lida e as alterações não puderam ser mescladas."""
+
+def resolver_versao(op, transacao, atual, original=None):
+    """
+    Controle de versão otimista. Cada transação gravada leva "versao" (sem o campo
+    conta como 1). Quem edita ou exclui manda a versão que leu: se ela ainda é a atual
+    a operação segue com versao + 1; se não, a edição é mesclada com a versão atual
+    quando `original` (a transação como foi lida) mostra que os campos alterados de
+    cada lado são diferentes. Senão levanta ConflitoVersao.
+    Operações sem "versao" são gravadas sem conferência, como antes.
+    Retorna a transação que deve ser gravada.
+    """
+    versao_atual = atual.get("versao", 1) if atual is not None else None
+    if op == "add":
+        return {**transacao, "versao": versao_atual + 1 if atual is not None else 1}
+    lida = transacao.get("versao")
+    if lida is None or lida == versao_atual:
+        if op == "delete":
+            return transacao
+        return {**transacao, "versao": (versao_atual or 0) + 1}
+
+    if atual is None:
+        raise ConflitoVersao(f"A transação {transacao['UUID']} foi excluída por outro operador.")
+    if op == "delete" or original is None:
+        raise ConflitoVersao(f"A transação {transacao['UUID']} foi alterada por outro operador (versão {lida} -> {versao_atual}).")
+    minhas = {k for k in transacao if k != "versao" and transacao[k] != original.get(k)}
+    deles = {k for k in set(atual) | set(original) if k != "versao" and atual.get(k) != original.get(k)}
+    if minhas & deles:
+        raise ConflitoVersao(f"A transação {transacao['UUID']} foi alterada por outro operador nos mesmos campos: "
+                             f"{', '.join(sorted(minhas & deles))}.")
+    return {**atual, **{k: transacao[k] for k in minhas}, "versao": versao_atual + 1}
+
+def registrar_journal(op, transacao, filepath='./data/transactions.json'):
+    """
+    Acrescenta uma operação ('add', 'edit' ou 'delete') ao journal do snapshot.
+    Só a linha nova é escrita no disco. Retorna o offset (em bytes) da linha gravada
+    e o tamanho do journal logo depois da escrita.
+    """
+    (offset,), tamanho = registrar_operacoes([(op, transacao)], filepath)
+    return offset, tamanho
+
+def registrar_operacoes(operacoes, filepath='./data/transactions.json'):
+    """
+    Versão em lote do registrar_journal: todas as operações (op, transação) vão
+    para o journal numa única escrita. Retorna os offsets de cada linha e o tamanho final.
+    Num lote de várias operações cada linha leva "lote": [id, i, n], e quem lê o journal
+    só aplica o lote se as n linhas estão lá: uma queda no meio não grava metade dele.
+    """
+    n = len(operacoes)
+    identificador = os.urandom(6).hex()
+    linhas = [(json.dumps({"op": op, "transacao": transacao} if n == 1 else
+                          {"op": op, "transacao": transacao, "lote": [identificador, i, n]}, default=_json_padrao) + "\n").encode("utf-8")
+              for i, (op, transacao) in enumerate(operacoes)]
+    dados = b"".join(linhas)
+    with trava_arquivo(filepath), _lock_journal:
+        with open(caminho_journal(filepath), "a+b") as file:
+            file.seek(0, os.SEEK_END)
+            inicio = file.tell()
+            if inicio:
+                file.seek(-1, os.SEEK_END)
+                if file.read(1) != b"\n":
+                    # sobra de uma escrita cortada por uma queda: fecha a linha para não grudar na nossa
+                    dados = b"\n" + dados
+                    inicio += 1
+            ponto_de_falha("journal_parcial", file, dados[:len(dados) // 2])
+            file.write(dados)
+            file.flush()
+            ponto_de_falha("journal_antes_fsync")
+            if SINCRONIZAR_ESCRITAS:
+                os.fsync(file.fileno())
+            tamanho = file.tell()
+    if tamanho > LIMITE_JOURNAL_BYTES:
+        compactar_em_background(filepath)
+    offsets = list(itertools.accumulate((len(linha) for linha in linhas[:-1]), initial=inicio))
+    return offsets, tamanho
+
+def aplicar_journal(transacoes, journal):
+    """
+    Reaplica as operações do journal sobre a lista de transações do snapshot.
+    As operações são idempotentes ('add'/'edit' sobrescrevem pelo UUID e 'delete' de
+    UUID inexistente é ignorado), então reaplicar um journal já compactado não estraga os dados.
+    """
+    posicao = {chave_registro(t): i for i, t in enumerate(transacoes)}
+    removidos = set()
+    with open(journal, "rb") as file:
+        operacoes, _ = ler_operacoes_journal(file)
+        for _, registro in operacoes:
+            transacao = registro["transacao"]
+            chave = chave_registro(transacao)
+            if registro["op"] == "delete":
+                if chave in posicao:
+                    removidos.add(posicao.pop(chave))
+            elif chave in posicao:
+                transacoes[posicao[chave]] = transacao
+            else:
+                posicao[chave] = len(transacoes)
+                transacoes.append(transacao)
+    if removidos:
+        transacoes = [t for i, t in enumerate(transacoes) if i not in removidos]
+    return transacoes
+
+def ler_operacoes_journal(file):
+    """
+    Lê as operações completas do journal aberto em binário, a partir da posição atual.
+    Retorna ([(offset, registro)], fim), com `fim` o byte até onde tudo já foi decidido:
+    uma linha ou um lote ainda incompletos no final (sendo escritos agora, ou cortados por
+    uma queda) ficam depois dele. Linhas que não são json (o resto de uma escrita cortada)
+    são puladas, e as linhas de um lote ("lote": [id, i, n]) só entram se as n estão lá.
+    """
+    operacoes, lote = [], []
+    offset = fim = file.tell()
+    for linha in file:
+        if not linha.endswith(b"\n"):
+            break
+        inicio, offset = offset, offset + len(linha)
+        try:
+            registro = json.loads(linha)
+            marca = registro.get("lote")
+        except (json.JSONDecodeError, UnicodeDecodeError, AttributeError):
+            lote, fim = [], offset  # linha cortada: também invalida o lote em que estava
+            continue
+        if marca is None:
+            operacoes.append((inicio, registro))
+            lote, fim = [], offset
+            continue
+        identificador, i, n = marca
+        if i == 0:
+            lote, fim = [(inicio, registro)], inicio
+        elif lote and lote[0][1]["lote"][0] == identificador and i == len(lote):
+            lote.append((inicio, registro))
+        else:
+            lote, fim = [], offset  # resto de um lote que perdeu o começo
+            continue
+        if len(lote) == n:
+            operacoes.extend(lote)
+            lote, fim = [], offset
+    return operacoes, fim
+
+def aplicar_journais(transacoes, filepath):
+    for journal in journais(filepath):
+        transacoes = aplicar_journal(transacoes, journal)
+    return transacoes
+
+_json_texto = json.encoder.encode_basestring_ascii
+
+def _registro_json(t):
+    """
+    Mesmo texto do json.dumps(t, indent=4) com mais 4 espaços de recuo, montado direto
+    quando todos os valores são simples (o indent faz o json usar o encoder em Python, bem mais lento).
+    """
+    if type(t) is Transacao:
+        t = t.para_dict()  # um dict de uma vez, em vez de um __getitem__ por campo
+    campos = []
+    for chave, valor in t.items():
+        if isinstance(valor, str):
+            texto = _json_texto(valor)
+        elif valor is None or isinstance(valor, bool):
+            texto = json.dumps(valor)
+        elif isinstance(valor, (int, float)) and math.isfinite(valor):
+            texto = repr(valor) if type(valor) in (int, float) else json.dumps(valor)
+        else:
+            return json.dumps(t, indent=4, default=_json_padrao).replace("\n", "\n    ")
+        campos.append(f"{_json_texto(str(chave))}: {texto}")
+    if not campos:
+        return "{}"
+    return "{\n        " + ",\n        ".join(campos) + "\n    }"
+
+def escrever_json(transacoes, file):
+    """
+    Escreve as transações no mesmo formato do json.dump(..., indent=4), mas uma a uma,
+    então aceita qualquer iterável (inclusive geradores) sem montar a lista.
+    """
+    primeira = True
+    for t in transacoes:
+        file.write(("[\n    " if primeira else ",\n    ") + _registro_json(t))
+        if primeira:
+            primeira = False
+            ponto_de_falha("snapshot_parcial", file)
+    file.write("[]" if primeira else "\n]")
+
+def gravar_snapshot(transacoes, filepath):
+    """
+    Grava o snapshot (json ou binário, pela extensão) num arquivo temporário e troca
+    de uma vez (trocar_arquivo), assim quem lê nunca vê um arquivo pela metade, nem
+    depois de uma queda no meio da gravação.
+    """
+    if formato_sqlite(filepath):
+        armazenamento_sqlite.escrever_sqlite(map(_linha_sqlite, transacoes), filepath, SINCRONIZAR_ESCRITAS)  # a troca já é atômica dentro da transação do sqlite
+        return
+    temporario = filepath + '.tmp'
+    try:
+        if formato_binario(filepath):
+            escrever_binario(transacoes, temporario)
+        else:
+            with open(temporario, "w") as file:
+                escrever_json(transacoes, file)
+    except BaseException:  # erro ou Ctrl-C no meio: o snapshot atual nem foi tocado
+        with contextlib.suppress(OSError):
+            os.remove(temporario)
+        raise
+    trocar_arquivo(temporario, filepath)
+
+def ler_snapshot(filepath, compacto=False, progresso=None):
+    """
+    Lê o snapshot inteiro (sem o journal) como lista de transações. Com `compacto`,
+    cada uma vira Transacao assim que é lida, então os dicts nunca existem todos juntos;
+    e com `progresso`, ela é chamada de tempos em tempos com o offset já lido (em bytes).
+    """
+    if compacto and progresso is not None:
+        return _ler_com_progresso(iterar_snapshot(filepath), progresso)
+    if compacto:
+        return [Transacao.de(t) for _, t in iterar_snapshot(filepath)]
+    if formato_binario(filepath):
+        return [t for _, t in iterar_binario(filepath)]
+    if formato_sqlite(filepath):
+        return [t for _, t in armazenamento_sqlite.iterar_sqlite(filepath)]
+    with open(filepath, "r") as file:
+        return json.load(file)
+
+def _ler_com_progresso(registros, progresso, tamanho_bloco=1_000):
+    transacoes = []
+    while bloco := list(itertools.islice(registros, tamanho_bloco)):
+        transacoes += [Transacao.de(t) for _, t in bloco]
+        progresso(bloco[-1][0])
+    return transacoes
+
+def iterar_snapshot(filepath):
+    """Percorre o snapshot em streaming, devolvendo (offset em bytes, transação)."""
+    if formato_binario(filepath):
+        return iterar_binario(filepath)
+    if formato_sqlite(filepath):
+        return armazenamento_sqlite.iterar_sqlite(filepath)
+    return iterar_registros_json(filepath)
+
+def ler_registro_snapshot(filepath, offset):
+    """Lê só a transação que começa no byte `offset` do snapshot."""
+    if formato_binario(filepath):
+        return ler_registro_binario(filepath, offset)
+    if formato_sqlite(filepath):
+        return armazenamento_sqlite.ler_registro_sqlite(filepath, offset)
+    decoder = json.JSONDecoder()
+    with open(filepath, "rb") as file:
+        file.seek(offset)
+        dados = b""
+        while True:
+            bloco = file.read(512)
+            dados += bloco
+            try:
+                return decoder.raw_decode(dados.decode("utf-8"))[0]
+            except (json.JSONDecodeError, UnicodeDecodeError):
+                if not bloco:
+                    raise
+
+def converter_bd(origem='./data/transactions.json', destino='./data/transactions.bin'):
+    """
+    Converte o banco entre json e binário (o formato sai da extensão de cada arquivo),
+    com o journal da origem já aplicado. É feito em streaming e sem perdas.
+    """
+    gravar_snapshot(iterar_bd(origem), destino)
+    descartar_journais(destino)  # o snapshot novo já representa o estado completo
+
+# snapshot binário: cabeçalho + registros de tamanho fixo de 33 bytes (versão 2 do formato:
+# UUID em 16 bytes, valor em centavos int64, código da categoria uint8 e instante de criação
+# int64; a versão 1, ainda lida, tinha 25 bytes, sem o instante) e, no fim do arquivo,
+# o dicionário de categorias apontado pelo cabeçalho.
+
+_CABECALHO_BINARIO = struct.Struct('<4sIQQQ')  # magic, versão, registros, offset e tamanho do dicionário
+_REGISTRO_BINARIO = struct.Struct('<16sqBq')    # UUID, centavos, código da categoria e instante de criação
+_REGISTRO_BINARIO_V1 = struct.Struct('<16sqB')   # versão 1 do formato, sem a data (ainda lida)
+_dicionarios_binarios = {}
+
+def bytes_uuid(texto):
+    """
+    Retorna os 16 bytes do UUID e se o texto original precisa ser guardado à parte
+    (UUID fora da forma canônica minúscula, ou id que nem é UUID).
+    """
+    try:
+        uuid_transacao = uuid.UUID(texto)
+        return uuid_transacao.bytes, str(uuid_transacao) != texto
+    except ValueError:
+        return chave_uuid(texto), True
+
+def ordem_por_instante(instantes):
+    """
+    Índice de tempo: as linhas ordenadas pelo instante de criação (empates na ordem
+    de cadastro), como bytes de int64 little-endian.
+    """
+    if np is not None:
+        return np.argsort(np.asarray(instantes, dtype=np.int64), kind='stable').astype('<i8').tobytes()
+    ordem = array.array('q', sorted(range(len(instantes)), key=instantes.__getitem__))  # sorted é estável
+    if sys.byteorder == 'big':
+        ordem.byteswap()
+    return ordem.tobytes()
+
+def escrever_binario(transacoes, filepath):
+    """
+    Grava as transações no formato binário, em streaming. Depois dos registros vem
+    o índice de tempo (ordem_por_instante) e, no fim, o dicionário de categorias (e
+    os ids que não são UUID canônico), que só é conhecido depois de ver todas as
+    transações; o cabeçalho é completado com a posição dele.
+    """
+    categorias, codigo_da_categoria, ids_texto, versoes = [], {}, {}, {}
+    instantes = array.array('q')
+    quantidade = 0
+    with open(filepath, "wb") as file:
+        file.write(_CABECALHO_BINARIO.pack(b'TBIN', 2, 0, 0, 0))
+        ponto_de_falha("snapshot_parcial", file)
+        buffer = bytearray()
+        for quantidade, t in enumerate(transacoes, start=1):
+            if type(t) is Transacao:  # campos já compactos: nada de refazer e reler os textos
+                categoria, centavos, segundos = t.categoria, t.centavos, t.instante
+                chave, guardar_texto = t.uuid_bytes()
+            else:
+                categoria, centavos, segundos = t.get('categoria'), para_centavos(t['valor']), instante(t.get('criado_em'))
+                chave, guardar_texto = bytes_uuid(str(t['UUID']))
+            codigo = codigo_da_categoria.get(categoria)
+            if codigo is None:
+                if len(categorias) == 256:
+                    raise ValueError("O formato binário suporta no máximo 256 categorias.")
+                codigo = codigo_da_categoria[categoria] = len(categorias)
+                categorias.append(categoria)
+            if guardar_texto:
+                ids_texto[quantidade - 1] = str(t['UUID'])
+            if "versao" in t:
+                versoes[quantidade - 1] = t["versao"]
+            instantes.append(segundos)
+            buffer += _REGISTRO_BINARIO.pack(chave, centavos, codigo, segundos)
+            if len(buffer) >= 1 << 20:
+                file.write(buffer)
+                buffer.clear()
+        file.write(buffer)
+        offset_ordem = file.tell()
+        file.write(ordem_por_instante(instantes))
+        dicionario = json.dumps({"categorias": categorias, "ids_texto": ids_texto, "versoes": versoes,
+                                 "ordem_tempo": offset_ordem}).encode("utf-8")
+        offset_dicionario = file.tell()
+        file.write(dicionario)
+        file.seek(0)
+        file.write(_CABECALHO_BINARIO.pack(b'TBIN', 2, quantidade, offset_dicionario, len(dicionario)))
+
+def _cabecalho_binario(filepath):
+    """
+    Lê o cabeçalho e o dicionário do snapshot binário (guardados em cache enquanto o arquivo não muda).
+    Retorna (registros, categorias, ids_texto, versoes, formato), com formato = (struct dos
+    registros, offset do índice de tempo ou None na versão 1).
+    """
+    estado = os.stat(filepath)
+    chave = (filepath, estado.st_mtime_ns, estado.st_size)
+    if chave not in _dicionarios_binarios:
+        with open(filepath, "rb") as file:
+            magic, versao, quantidade, offset_dicionario, tamanho_dicionario = _CABECALHO_BINARIO.unpack(file.read(_CABECALHO_BINARIO.size))
+            if magic != b'TBIN' or versao not in (1, 2):
+                raise ValueError(f"Snapshot binário inválido: {filepath}")
+            file.seek(offset_dicionario)
+            dicionario = json.loads(file.read(tamanho_dicionario))
+        _dicionarios_binarios.clear()
+        formato = (_REGISTRO_BINARIO, dicionario["ordem_tempo"]) if versao == 2 else (_REGISTRO_BINARIO_V1, None)
+        _dicionarios_binarios[chave] = (quantidade, dicionario["categorias"], {int(k): v for k, v in dicionario["ids_texto"].items()},
+                                        {int(k): v for k, v in dicionario.get("versoes", {}).items()}, formato)
+    return _dicionarios_binarios[chave]
+
+def _transacao_binaria(linha, chave, centavos, codigo, categorias, ids_texto, versoes, segundos=0):
+    transacao = {"UUID": ids_texto.get(linha) or str(uuid.UUID(bytes=chave)),
+                 "valor": centavos / 100,
+                 "categoria": categorias[codigo]}
+    if segundos:
+        transacao["criado_em"] = texto_instante(segundos)
+    if linha in versoes:
+        transacao["versao"] = versoes[linha]
+    return transacao
+
+def iterar_binario(filepath, registros_por_bloco=65536, inicio=0, fim=None):
+    """Percorre o snapshot binário (ou só as linhas [inicio, fim)), devolvendo (offset em bytes, transação)."""
+    quantidade, categorias, ids_texto, versoes, (registro, _) = _cabecalho_binario(filepath)
+    if fim is not None:
+        quantidade = min(fim, quantidade)
+    with open(filepath, "rb") as file:
+        file.seek(_CABECALHO_BINARIO.size + inicio * registro.size)
+        linha = inicio
+        while linha < quantidade:
+            bloco = file.read(min(registros_por_bloco, quantidade - linha) * registro.size)
+            for campos in registro.iter_unpack(bloco):
+                yield (_CABECALHO_BINARIO.size + linha * registro.size,
+                       _transacao_binaria(linha, *campos[:3], categorias, ids_texto, versoes, *campos[3:]))
+                linha += 1
+
+def ler_registro_binario(filepath, offset):
+    quantidade, categorias, ids_texto, versoes, (registro, _) = _cabecalho_binario(filepath)
+    with open(filepath, "rb") as file:
+        file.seek(offset)
+        campos = registro.unpack(file.read(registro.size))
+    linha = (offset - _CABECALHO_BINARIO.size) // registro.size
+    return _transacao_binaria(linha, *campos[:3], categorias, ids_texto, versoes, *campos[3:])
+
+def compactar_journal(filepath='./data/transactions.json'):
+    """
+    Incorpora o journal ao snapshot. O journal ativo é congelado (renomeado para
+    `.compactando`) para que novas operações continuem sendo gravadas durante a compactação.
+    Só um processo compacta por vez; os escritores esperam apenas a troca de nome do journal.
+    """
+    journal = caminho_journal(filepath)
+    congelado = journal + '.compactando'
+    indice = _indices.get(filepath)
+    with trava_arquivo(filepath, '.compactacao.lock'):
+        with trava_arquivo(filepath), indice.lock if indice else contextlib.nullcontext():
+            if indice:
+                indice.validar()  # garante que o índice já viu todo o journal antes de congelá-lo
+            with _lock_journal:
+                if not os.path.exists(congelado):  # se existir, sobrou de uma compactação interrompida
+                    if not os.path.exists(journal):
+                        return
+                    os.replace(journal, congelado)
+                    if indice:
+                        indice.congelar(os.path.getsize(congelado))
+
+        transacoes = aplicar_journal(ler_snapshot(filepath, compacto=True), congelado)
+
+        with _lock_snapshot:
+            gravar_snapshot(transacoes, filepath)
+            os.remove(congelado)
+
+    # os offsets do snapshot mudaram: o índice é refeito aqui mesmo, fora da thread do menu
+    if indice:
+        with indice.lock:
+            indice.reconstruir()
+
+def compactar_em_background(filepath='./data/transactions.json'):
+    global _thread_compactacao
+    if _thread_compactacao is not None and _thread_compactacao.is_alive():
+        return
+    _thread_compactacao = threading.Thread(target=compactar_journal, args=(filepath,), daemon=True)
+    _thread_compactacao.start()
+
+# índice de UUID em disco: tabela hash de endereçamento aberto gravada em
+# `<snapshot>.idx` e acessada via mmap. Cada slot guarda os 16 bytes do UUID, a
+# origem do registro (snapshot ou journal) e o offset dele, então achar uma
+# transação custa uma leitura no índice e outra no arquivo, seja qual for o tamanho do banco.
+
+_CABECALHO_INDICE = struct.Struct('<4sIQQqqQQQ')  # magic, versão, slots, usados, mtime/tamanho do snapshot, bases dos journais, fim indexado
+_SLOT_INDICE = struct.Struct('<16sBQ')            # UUID, origem, offset
+ORIGEM_VAZIO, ORIGEM_SNAPSHOT, ORIGEM_JOURNAL, ORIGEM_REMOVIDO = 0, 1, 2, 3
+CARGA_MAXIMA_INDICE = 0.7
+
+_indices = {}
+_separadores_json = re.compile(r'[\s,\[]*')
+_nao_ascii = re.compile(r'[^\x00-\x7f]')
+
+def caminho_indice(filepath):
+    return _base_arquivos(filepath) + '.idx'
+
+def chave_uuid(valor):
+    """
+    Converte o UUID (em qualquer caixa) nos 16 bytes usados no índice.
+    Identificadores que não são UUID válidos viram o md5 do texto em minúsculas.
+    """
+    texto = str(valor).strip().lower()
+    try:
+        return uuid.UUID(texto).bytes
+    except ValueError:
+        return hashlib.md5(texto.encode("utf-8")).digest()
+
+def iterar_registros_json(filepath, tamanho_bloco=1 << 20):
+    """
+    Percorre um array json sem carregá-lo inteiro, devolvendo (offset em bytes, registro).
+    O texto é decodificado como latin-1 para que cada caractere corresponda a um byte do arquivo.
+    """
+    decoder = json.JSONDecoder()
+    with open(filepath, "rb") as file:
+        texto, base, i, fim_arquivo, so_ascii = "", 0, 0, False, True
+        while True:
+            i = _separadores_json.match(texto, i).end()
+            if i < len(texto) and texto[i] == "]":
+                return
+            try:
+                registro, fim = decoder.raw_decode(texto, i)
+            except json.JSONDecodeError:
+                if fim_arquivo:
+                    if i >= len(texto):
+                        return
+                    raise
+                bloco = file.read(tamanho_bloco)
+                fim_arquivo = not bloco
+                texto, base, i = texto[i:] + bloco.decode("latin-1"), base + i, 0
+                so_ascii = texto.isascii()  # o caso comum: dispensa procurar acentos registro a registro
+                continue
+            if not so_ascii and _nao_ascii.search(texto, i, fim):
+                registro = json.loads(texto[i:fim].encode("latin-1").decode("utf-8"))
+            yield base + i, registro
+            i = fim
+
+def pendentes_journal(filepath='./data/transactions.json'):
+    """Estado final de cada UUID tocado pelo journal: a transação, ou None se foi excluída."""
+    pendentes = {}
+    for journal in journais(filepath):
+        with open(journal, "rb") as file:
+            operacoes, _ = ler_operacoes_journal(file)
+            for _, registro in operacoes:
+                transacao = registro["transacao"]
+                pendentes[transacao["UUID"]] = None if registro["op"] == "delete" else transacao
+    return pendentes
+
+def iterar_bd(filepath='./data/transactions.json'):
+    """
+    Versão em streaming do load_bd: gera as transações uma a uma direto do array
+    json, sem montar a lista, então a memória não cresce com o tamanho do arquivo.
+    O journal (pequeno, limitado pela compactação) é lido antes e aplicado no caminho.
+    """
+    pendentes = pendentes_journal(filepath)
+    for _, transacao in iterar_snapshot(filepath):
+        chave = transacao.get("UUID")
+        if chave in pendentes:
+            transacao = pendentes.pop(chave)
+            if transacao is None:
+                continue
+        yield transacao
+
+    # o que sobrou no journal são transações novas
+    for transacao in pendentes.values():
+        if transacao is not None:
+            yield transacao
+
+class IndiceUUID:
+    """
+    Índice UUID -> (origem, offset) persistido em disco e mantido a cada escrita.
+
+    Os offsets de journal são lógicos: o journal congelado pela compactação começa em
+    `base_congelado` e o ativo em `base_ativo`. Assim, congelar o journal é só
+    atualizar o cabeçalho, sem reescrever os slots.
+    """
+
+    def __init__(self, filepath):
+        self.filepath = filepath
+        self.caminho = caminho_indice(filepath)
+        self.lock = threading.RLock()
+        self.file = None
+        self.mm = None
+
+    # --- arquivo do índice ---
+
+    def _abrir(self, caminho):
+        self.file = open(caminho, "r+b")
+        self.mm = mmap.mmap(self.file.fileno(), 0)
+        (magic, versao, self.n_slots, self.n_usados, self.snap_mtime, self.snap_tamanho,
+         self.base_congelado, self.base_ativo, self.fim_indexado) = _CABECALHO_INDICE.unpack_from(self.mm, 0)
+        if magic != b'TIDX' or versao != 1:
+            raise ValueError(f"Índice inválido: {caminho}")
+
+    def _criar(self, caminho, n_slots):
+        with open(caminho, "wb") as file:
+            file.truncate(_CABECALHO_INDICE.size + n_slots * _SLOT_INDICE.size)
+        self.file = open(caminho, "r+b")
+        self.mm = mmap.mmap(self.file.fileno(), 0)
+        self.n_slots, self.n_usados = n_slots, 0
+
+    def _fechar(self):
+        if self.mm is not None:
+            self.mm.close()
+            self.file.close()
+            self.mm = self.file = None
+
+    def _gravar_cabecalho(self):
+        _CABECALHO_INDICE.pack_into(self.mm, 0, b'TIDX', 1, self.n_slots, self.n_usados, self.snap_mtime,
+                                    self.snap_tamanho, self.base_congelado, self.base_ativo, self.fim_indexado)
+
+    def _publicar(self, temporario):
+        """Fecha o índice montado em `temporario` e o coloca no lugar do atual."""
+        self._gravar_cabecalho()
+        self._fechar()
+        os.replace(temporario, self.caminho)
+        self._abrir(self.caminho)
+
+    # --- tabela hash ---
+
+    def _procurar(self, chave):
+        """Retorna (posição, origem, offset) do slot da chave ou do slot vazio onde ela entraria."""
+        i = int.from_bytes(chave[:8], "little") % self.n_slots
+        while True:
+            pos = _CABECALHO_INDICE.size + i * _SLOT_INDICE.size
+            chave_slot, origem, offset = _SLOT_INDICE.unpack_from(self.mm, pos)
+            if origem == ORIGEM_VAZIO or chave_slot == chave:
+                return pos, origem, offset
+            i = (i + 1) % self.n_slots
+
+    def _marcar(self, chave, origem, offset):
+        pos, origem_atual, _ = self._procurar(chave)
+        if origem_atual == ORIGEM_VAZIO:
+            if self.n_usados + 1 > CARGA_MAXIMA_INDICE * self.n_slots:
+                self._redimensionar(self.n_slots * 2)
+                pos = self._procurar(chave)[0]
+            self.n_usados += 1
+        _SLOT_INDICE.pack_into(self.mm, pos, chave, origem, offset)
+
+    def _redimensionar(self, n_slots):
+        """Copia os slots válidos para uma tabela maior (os removidos são descartados aqui)."""
+        antigo_mm, antigo_file, antigo_n = self.mm, self.file, self.n_slots
+        temporario = f"{self.caminho}.{os.getpid()}.tmp"
+        self._criar(temporario, n_slots)
+        for i in range(antigo_n):
+            chave, origem, offset = _SLOT_INDICE.unpack_from(antigo_mm, _CABECALHO_INDICE.size + i * _SLOT_INDICE.size)
+            if origem in (ORIGEM_SNAPSHOT, ORIGEM_JOURNAL):
+                pos = self._procurar(chave)[0]
+                _SLOT_INDICE.pack_into(self.mm, pos, chave, origem, offset)
+                self.n_usados += 1
+        antigo_mm.close()
+        antigo_file.close()
+        self._publicar(temporario)
+
+    def _aplicar(self, op, uuid_transacao, offset):
+        chave = chave_uuid(uuid_transacao)
+        if op == "delete":
+            pos, origem, _ = self._procurar(chave)
+            if origem != ORIGEM_VAZIO:
+                _SLOT_INDICE.pack_into(self.mm, pos, chave, ORIGEM_REMOVIDO, 0)
+        else:
+            self._marcar(chave, ORIGEM_JOURNAL, offset)
+
+    # --- construção e manutenção ---
+
+    def _indexar_journal(self, caminho, inicio, base):
+        """Indexa as linhas completas do journal a partir do byte `inicio`; retorna onde parou."""
+        with open(caminho, "rb") as file:
+            file.seek(inicio)
+            operacoes, fim = ler_operacoes_journal(file)  # para antes de uma linha ou lote ainda sendo escritos
+        for offset, registro in operacoes:
+            self._aplicar(registro["op"], registro["transacao"]["UUID"], base + offset)
+        return fim
+
+    def reconstruir(self):
+        """Refaz o índice do zero a partir do snapshot e dos journais."""
+        self._fechar()
+        estado = os.stat(self.filepath)
+        temporario = f"{self.caminho}.{os.getpid()}.tmp"  # outro processo pode estar reconstruindo o mesmo índice
+        bytes_por_transacao = _REGISTRO_BINARIO.size if formato_binario(self.filepath) else 100  # ~110 no json
+        self._criar(temporario, max(1024, 2 * (estado.st_size // bytes_por_transacao)))
+        self.snap_mtime, self.snap_tamanho = estado.st_mtime_ns, estado.st_size
+        for offset, registro in iterar_snapshot(self.filepath):
+            self._marcar(chave_uuid(registro["UUID"]), ORIGEM_SNAPSHOT, offset)
+
+        journal = caminho_journal(self.filepath)
+        self.base_congelado = self.base_ativo = 0
+        if os.path.exists(journal + '.compactando'):
+            self.base_ativo = self._indexar_journal(journal + '.compactando', 0, 0)
+        self.fim_indexado = self.base_ativo
+        if os.path.exists(journal):
+            self.fim_indexado += self._indexar_journal(journal, 0, self.base_ativo)
+        self._publicar(temporario)
+
+    def validar(self):
+        """
+        Confere se o índice corresponde ao snapshot e aos journais atuais. Se o snapshot
+        mudou o índice é refeito; se o journal só cresceu, indexa apenas as linhas novas.
+        """
+        journal = caminho_journal(self.filepath)
+        try:
+            if self.mm is not None and os.stat(self.caminho).st_ino != os.fstat(self.file.fileno()).st_ino:
+                self._fechar()  # outro processo publicou um índice novo
+            if self.mm is None:
+                self._abrir(self.caminho)
+            estado = os.stat(self.filepath)
+            tamanho_congelado = os.path.getsize(journal + '.compactando') if os.path.exists(journal + '.compactando') else 0
+            tamanho_ativo = os.path.getsize(journal) if os.path.exists(journal) else 0
+            consistente = ((estado.st_mtime_ns, estado.st_size) == (self.snap_mtime, self.snap_tamanho)
+                           and self.base_ativo - self.base_congelado == tamanho_congelado
+                           and self.fim_indexado - self.base_ativo <= tamanho_ativo)
+        except (OSError, ValueError, struct.error):
+            consistente = False
+        if not consistente:
+            self.reconstruir()
+        elif self.fim_indexado - self.base_ativo < tamanho_ativo:
+            self.fim_indexado = self.base_ativo + self._indexar_journal(journal, self.fim_indexado - self.base_ativo, self.base_ativo)
+            self._gravar_cabecalho()
+
+    def congelar(self, tamanho_congelado):
+        """Chamado pela compactação logo depois de renomear o journal ativo para `.compactando`."""
+        self.base_congelado = self.base_ativo
+        self.base_ativo = self.base_congelado + tamanho_congelado
+        self.fim_indexado = self.base_ativo
+        self._gravar_cabecalho()
+
+    # --- leitura e escrita ---
+
+    def _ler_journal(self, offset):
+        journal = caminho_journal(self.filepath)
+        if offset >= self.base_ativo:
+            caminho, offset = journal, offset - self.base_ativo
+        else:
+            caminho, offset = journal + '.compactando', offset - self.base_congelado
+        with open(caminho, "rb") as file:
+            file.seek(offset)
+            return json.loads(file.readline())["transacao"]
+
+    def _ler_chave(self, chave):
+        """Valida o índice e lê a transação da chave (None se não existe); chamado com self.lock e _lock_snapshot."""
+        self.validar()
+        _, origem, offset = self._procurar(chave)
+        if origem == ORIGEM_SNAPSHOT:
+            return ler_registro_snapshot(self.filepath, offset)
+        if origem == ORIGEM_JOURNAL:
+            return self._ler_journal(offset)
+        return None
+
+    def buscar(self, uuid_procurado):
+        """Retorna a transação com esse UUID (sem diferenciar maiúsculas/minúsculas) ou None."""
+        chave = chave_uuid(uuid_procurado)
+        # outro processo pode trocar o snapshot ou apagar o journal congelado no meio da
+        # leitura (a compactação dele não usa o nosso _lock_snapshot); nesse caso lê de novo
+        for tentativa in range(5):
+            try:
+                with self.lock, _lock_snapshot:
+                    transacao = self._ler_chave(chave)
+                    if transacao is None:
+                        return None
+                    estado = os.stat(self.filepath)
+                    if (estado.st_mtime_ns, estado.st_size) == (self.snap_mtime, self.snap_tamanho):
+                        break
+            except (OSError, ValueError):
+                if tentativa == 4:
+                    raise
+        else:
+            # o snapshot mudou em todas as tentativas: com a trava de escrita nenhum processo
+            # o troca (a compactação também a usa), então a leitura feita sob ela vale
+            with trava_arquivo(self.filepath), self.lock, _lock_snapshot:
+                transacao = self._ler_chave(chave)
+            if transacao is None:
+                return None
+        # ids que não são UUID usam md5 no índice, então confirma o texto
+        if str(transacao.get("UUID", "")).strip().lower() != str(uuid_procurado).strip().lower():
+            return None
+        return transacao
+
+    def contem(self, uuid_procurado):
+        """
+        Diz se o UUID está no banco olhando só o índice, sem ler a transação nem revalidar
+        (para checagens em massa: chame validar() antes). Ids que não são UUID são
+        comparados pelo md5, então uma colisão seria possível, mas é desprezível.
+        """
+        with self.lock:
+            if self.mm is None:
+                self.validar()
+            return self._procurar(chave_uuid(uuid_procurado))[1] in (ORIGEM_SNAPSHOT, ORIGEM_JOURNAL)
+
+    def gravar(self, op, transacao):
+        """Registra a operação no journal e atualiza o índice com o offset dela."""
+        self.gravar_lote([(op, transacao)])
+
+    def gravar_lote(self, operacoes):
+        """Registra várias operações (op, transação) no journal de uma vez e indexa cada uma."""
+        with trava_arquivo(self.filepath), self.lock:
+            self.validar()
+            offsets, tamanho = registrar_operacoes(operacoes, self.filepath)
+            for (op, transacao), offset in zip(operacoes, offsets):
+                self._aplicar(op, transacao["UUID"], self.base_ativo + offset)
+            self.fim_indexado = self.base_ativo + tamanho
+            self._gravar_cabecalho()
+
+def obter_indice(filepath='./data/transactions.json'):
+    """Retorna o índice de UUID do snapshot, aberto uma vez por processo."""
+    indice = _indices.get(filepath)
+    if indice is None:
+        indice = _indices[filepath] = IndiceUUID(filepath)
+    return indice
+
+def janela_group_commit():
+    """Janela do group commit em segundos: TRANSACOES_GROUP_COMMIT (em ms) ou JANELA_GROUP_COMMIT."""
+    try:
+        return float(os.environ["TRANSACOES_GROUP_COMMIT"]) / 1000
+    except (KeyError, ValueError):
+        return JANELA_GROUP_COMMIT
+
+def carregar_transacoes(filepath='./data/transactions.json', progresso=None):
+    """
+    O load_bd do repositório: snapshot mais journal, com cada transação já como Transacao
+    (as do snapshot viram Transacao enquanto são lidas). `progresso` como no ler_snapshot.
+    """
+    with _lock_snapshot:
+        bd = ler_snapshot(filepath, compacto=True, progresso=progresso)
+        bd = aplicar_journais(bd, filepath)
+    for i, t in enumerate(bd):  # as vindas do journal ainda são dicts
+        bd[i] = Transacao.de(t)
+    return bd
+
+LIMITE_ALTERADAS_TEMPO = 10_000  # alterações acumuladas por cima do índice de tempo antes de refazê-lo
+
+class RepositorioTransacoes:
+    """
+    Dono dos dados da sessão: o menu cria um só e passa para todas as funções.
+    As transações ficam em memória (UUID em minúsculas -> transação, na ordem de
+    cadastro) e só são relidas do disco quando o snapshot ou o journal mudam de
+    mtime/tamanho, isto é, quando outro programa mexeu no banco.
+    Com `janela_grupo` > 0 as escritas usam group commit (ver _enfileirar).
+
+    Carregar e montar as estruturas derivadas (agregados, índices, tabela) acontece
+    sob `_lock_carga`, assim como a escrita na memória: a pré-carga do menu (ver WARM
+    START) monta tudo numa thread e quem pede algo que ela ainda está montando espera
+    por ela em vez de montar de novo.
+    """
+
+    janela_grupo = 0.0
+    progresso_carga = None  # chamada com o offset lido do snapshot durante a carga (barra da pré-carga)
+
+    def __init__(self, filepath='./data/transactions.json', transacoes=None):
+        self.filepath = filepath
+        self._dados = None
+        self._assinatura = None
+        self._tabela = None
+        self._agregados = None
+        self._indices = None
+        self._tempo = None  # (tabela, alteradas) das consultas por data, ver _indice_tempo
+        self._tempo_assinatura = None
+        self._cache = None
+        self._lock_carga = threading.RLock()
+        self.janela_grupo = janela_group_commit()
+        self._grupo = []  # (operações como vieram, operações resolvidas) ainda não gravadas
+        self._geracao_grupo = 0
+        self._lock_grupo = threading.RLock()
+        self._timer_grupo = None
+        self._descarregar_ao_sair = False
+        self.conflitos_grupo = []  # ConflitoVersao descobertos só na hora de gravar a fila
+        if transacoes is not None:  # dados já carregados (ex.: o `bd` do bloco principal)
+            self._assinatura = self._assinatura_disco()
+            self._dados = {t.chave(): t for t in map(Transacao.de, transacoes)}
+
+    _chave = staticmethod(chave_transacao)  # int do UUID: mais compacto que o texto como chave do dict
+
+    def _assinatura_disco(self):
+        try:
+            return tuple((caminho, os.stat(caminho).st_mtime_ns, os.stat(caminho).st_size)
+                         for caminho in [self.filepath] + journais(self.filepath))
+        except FileNotFoundError:
+            return None  # arquivo sumiu no meio (ex.: compactação); força a releitura
+
+    def _atualizar(self):
+        assinatura = self._assinatura_disco()
+        if self._grupo and assinatura != self._assinatura:
+            self.descarregar()  # outro programa gravou: a fila (que só está na memória) vai antes da releitura
+            assinatura = self._assinatura_disco()
+        if self._dados is None or assinatura is None or assinatura != self._assinatura:
+            with self._lock_carga:
+                self._carregar()
+
+    def _carregar(self):
+        """Relê o banco se preciso; chamado com _lock_carga (outra thread pode ter acabado de carregar)."""
+        assinatura = self._assinatura_disco()
+        if self._dados is None or assinatura is None or assinatura != self._assinatura:
+            self._dados = {t.chave(): t for t in carregar_transacoes(self.filepath, progresso=self.progresso_carga)}
+            self._assinatura = assinatura
+            self._tabela = None
+            self._agregados = None
+            self._indices = None
+            self._tempo = None
+
+    # --- leitura ---
+
+    def transacoes(self):
+        """Todas as transações, na ordem de cadastro."""
+        self._atualizar()
+        return self._dados.values()
+
+    def ultimas(self, n=5, categoria=None):
+        """As n transações criadas por último (da categoria, se dada), da mais antiga para a mais nova."""
+        return list(itertools.islice(self._recentes(categoria=categoria), n))[::-1]
+
+    def entre(self, inicio=None, fim=None, categoria=None):
+        """Transações criadas com inicio <= criado_em < fim (textos ISO; None = sem limite), em ordem de criação."""
+        return list(self._recentes(None if inicio is None else instante(inicio),
+                                   None if fim is None else instante(fim), categoria))[::-1]
+
+    def totais_por_mes(self, categoria=None):
+        return self.agregados().totais_por_mes(categoria)
+
+    def _indice_tempo(self):
+        """
+        (tabela, alteradas) para as consultas por data: a tabela colunar com o índice de
+        tempo, que pode ser de antes das últimas escritas, e o que mudou desde então
+        (UUID em minúsculas -> transação, ou None se excluída). Assim uma escrita não
+        obriga a reordenar tudo. Com um banco binário ainda não carregado, a tabela é
+        aberta via mmap (o índice de tempo já está no arquivo) e o journal vira `alteradas`.
+        Retorna None sem o numpy.
+        """
+        if np is None:
+            return None
+        if self._dados is None and formato_binario(self.filepath) and os.path.exists(self.filepath):
+            assinatura = self._assinatura_disco()
+            if self._tempo is None or self._tempo_assinatura != assinatura:
+                alteradas = {self._chave(u): t for u, t in pendentes_journal(self.filepath).items()}
+                self._tempo, self._tempo_assinatura = (TabelaColunar.de_binario(self.filepath), alteradas), assinatura
+            return self._tempo
+        self._atualizar()
+        tempo = self._tempo
+        if tempo is None or self._tempo_assinatura is not None:
+            with self._lock_carga:
+                self._carregar()
+                if self._tempo is None or self._tempo_assinatura is not None:
+                    tabela = self._tabela if self._tabela is not None else TabelaColunar.de_transacoes(self._dados.values())
+                    self._tempo, self._tempo_assinatura = (tabela, {}), None
+                tempo = self._tempo
+        return tempo
+
+    def _recentes(self, inicio=None, fim=None, categoria=None):
+        """Gera as transações com inicio <= instante < fim, da mais nova para a mais antiga."""
+        if categoria is not None:
+            yield from (t for t in self._recentes(inicio, fim) if t.get('categoria') == categoria)
+            return
+        indice = self._indice_tempo()
+        if indice is None:  # sem numpy não há índice: ordena o período em memória
+            periodo = [(instante(t.get('criado_em')), t) for t in self.transacoes()]
+            periodo = [item for item in periodo if (inicio is None or item[0] >= inicio) and (fim is None or item[0] < fim)]
+            for _, transacao in sorted(periodo[::-1], key=lambda item: item[0], reverse=True):
+                yield transacao
+            return
+        tabela, alteradas = indice
+        dados = self._dados
+
+        def da_tabela():
+            for linha in tabela.linhas_recentes(inicio, fim):
+                chave = self._chave(tabela.uuid(linha))
+                if chave in alteradas:
+                    continue
+                transacao = dados.get(chave) if dados is not None else None
+                yield int(tabela.instantes[linha]), transacao or tabela.transacao(linha)
+
+        novas = [(instante(t.get('criado_em')), t) for t in alteradas.values() if t is not None]
+        novas = [item for item in novas if (inicio is None or item[0] >= inicio) and (fim is None or item[0] < fim)]
+        novas = sorted(novas[::-1], key=lambda item: item[0], reverse=True)
+        # empates de segundo: o que foi gravado depois da tabela vem primeiro
+        for _, transacao in heapq.merge(novas, da_tabela(), key=lambda item: item[0], reverse=True):
+            yield transacao
+
+    def buscar(self, uuid_procurado):
+        """
+        Retorna a transação com esse UUID (sem diferenciar maiúsculas/minúsculas) ou None.
+        Se os dados ainda não estão em memória, usa o índice em disco em vez de carregar tudo.
+        """
+        if self._dados is None or self._assinatura != self._assinatura_disco():
+            return obter_indice(self.filepath).buscar(uuid_procurado)
+        return self._dados.get(self._chave(uuid_procurado))
+
+    def __len__(self):
+        return len(self.transacoes())
+
+    def tabela(self):
+        """
+        Versão colunar das transações para os relatórios, refeita só quando os dados mudam.
+        Retorna None se o numpy não estiver instalado.
+        """
+        if np is None:
+            return None
+        self._atualizar()
+        tabela = self._tabela
+        if tabela is None:
+            with self._lock_carga:
+                self._carregar()
+                if self._tabela is None:
+                    self._tabela = TabelaColunar.de_transacoes(self._dados.values())
+                    self._tempo, self._tempo_assinatura = (self._tabela, {}), None
+                tabela = self._tabela
+        return tabela
+
+    def agregados(self):
+        """Totais por categoria mantidos a cada escrita (montados na primeira consulta)."""
+        self._atualizar()
+        agregados = self._agregados
+        if agregados is None:
+            with self._lock_carga:
+                self._carregar()
+                if self._agregados is None:
+                    self._agregados = AgregadosPorCategoria.de_transacoes(self._dados.values(), fonte=self.transacoes)
+                agregados = self._agregados
+        return agregados
+
+    def verificar_agregados(self):
+        """Confere os agregados mantidos contra um recálculo completo; retorna as divergências."""
+        return self.agregados().verificar(self.transacoes())
+
+    def indices(self):
+        """Índices por categoria, valor e UUID (ver SECONDARY indexes), montados na primeira consulta."""
+        self._atualizar()
+        indices = self._indices
+        if indices is None:
+            with self._lock_carga:
+                self._carregar()
+                if self._indices is None:
+                    self._indices = IndicesSecundarios.de_transacoes(self._dados.values(), self._dados.__getitem__)
+                indices = self._indices
+        return indices
+
+    def filtrar(self, categoria=None, minimo=None, maximo=None, prefixo=None):
+        """
+        Transações da categoria, com minimo <= valor <= maximo (em centavos) e UUID
+        começando com `prefixo`; os filtros omitidos não restringem. Ordenadas por valor.
+        """
+        return self.indices().filtrar(categoria, minimo, maximo, prefixo)
+
+    def versao_dados(self):
+        """
+        Versão dos dados para o cache de relatórios (texto; None se o banco não existe).
+        Toda escrita acrescenta ao journal ou reescreve o snapshot, então o mtime, o
+        tamanho e o inode dos arquivos mudam a cada operação, inclusive as de outros programas.
+        """
+        try:
+            assinatura = [(caminho, os.stat(caminho).st_ino, os.stat(caminho).st_mtime_ns, os.stat(caminho).st_size)
+                          for caminho in [self.filepath] + journais(self.filepath)]
+        except FileNotFoundError:
+            return None
+        versao = hashlib.md5(repr(assinatura).encode("utf-8")).hexdigest()
+        return f"{versao}+{self._geracao_grupo}" if self._grupo else versao  # a fila do group commit também conta
+
+    def cache_relatorios(self):
+        if self._cache is None:
+            self._cache = CacheRelatorios(caminho=caminho_cache(self.filepath) if cache_em_disco_ativo() else None)
+        return self._cache
+
+    # --- escrita ---
+
+    def _aplicar(self, op, transacao):
+        self.aplicar_lote([(op, transacao)])
+
+    def _atual(self, uuid_transacao):
+        """Estado da transação no disco agora (chamado com a trava de escrita, então é o mais recente)."""
+        if self._dados is not None:
+            return self._dados.get(self._chave(uuid_transacao))
+        return obter_indice(self.filepath).buscar(uuid_transacao)
+
+    def _resolver_versoes(self, operacoes, conflitos=None):
+        """
+        Passa cada operação (op, transação[, original]) pelo resolver_versao, na ordem do lote.
+        Com a lista `conflitos`, uma operação em conflito vai para ela e sai do lote em vez de levantar.
+        """
+        resolvidas, no_lote = [], {}
+        for op, transacao, *original in operacoes:
+            chave = self._chave(transacao["UUID"])
+            atual = no_lote[chave] if chave in no_lote else self._atual(transacao["UUID"])
+            try:
+                transacao = resolver_versao(op, transacao, atual, original[0] if original else None)
+            except ConflitoVersao as e:
+                if conflitos is None:
+                    raise
+                conflitos.append(e)
+                continue
+            no_lote[chave] = None if op == "delete" else transacao
+            resolvidas.append((op, transacao))
+        return resolvidas
+
+    def aplicar_lote(self, operacoes):
+        """
+        Aplica as operações (op, transação[, original]) na memória (se os dados estão
+        carregados) e grava todas no disco de uma vez: uma escrita no journal, ou uma
+        única reescrita do json quando o journal está desligado.
+
+        Tudo acontece com a trava de escrita do banco, então as versões são conferidas
+        contra o estado mais recente (ver resolver_versao); um conflito levanta
+        ConflitoVersao antes de qualquer escrita.
+        """
+        operacoes = list(operacoes)
+        if not operacoes:
+            return
+        if self.janela_grupo > 0:
+            self._enfileirar(operacoes)
+            return
+        with trava_arquivo(self.filepath):
+            self._gravar_lote(operacoes)
+
+    def _gravar_lote(self, operacoes):
+        # com a trava de carga do começo ao fim: uma carga no meio leria o disco sem o lote e
+        # depois ganharia a assinatura de quem já tem
+        with self._lock_carga:
+            self._escrever_lote(self._aplicar_em_memoria(operacoes))
+
+    def _aplicar_em_memoria(self, operacoes, conflitos=None):
+        """Confere as versões e aplica o lote na memória; retorna as operações resolvidas, prontas para o disco."""
+        if not USAR_JOURNAL:
+            self._atualizar()  # sem journal é preciso ter a lista inteira para reescrever o json
+        with self._lock_carga:  # a pré-carga não monta nada com o lote pela metade
+            if USAR_JOURNAL and self._dados is not None and self._assinatura != self._assinatura_disco():
+                self._dados = None  # o disco mudou por fora: a cópia em memória é relida quando precisar
+                self._tempo = None
+            operacoes = self._resolver_versoes(operacoes, conflitos)
+
+            self._tabela = None
+            if self._tempo is not None and self._tempo_assinatura is None:
+                tabela, alteradas = self._tempo
+                if len(alteradas) + len(operacoes) > max(LIMITE_ALTERADAS_TEMPO, len(tabela) // 10):
+                    self._tempo = None  # muita coisa mudou: sai mais barato reordenar na próxima consulta
+            if self._dados is not None:
+                for op, transacao in operacoes:
+                    chave = self._chave(transacao["UUID"])
+                    registro = None if op == "delete" else Transacao.de(transacao)
+                    if self._tempo is not None and self._tempo_assinatura is None:
+                        self._tempo[1][chave] = registro
+                    antiga = self._dados.get(chave)
+                    for mantidos in (self._agregados, self._indices):
+                        if mantidos is not None:
+                            if antiga is not None:
+                                mantidos.remover(antiga)
+                            if registro is not None:
+                                mantidos.adicionar(registro)
+                    if registro is None:
+                        self._dados.pop(chave, None)
+                    else:
+                        self._dados[chave] = registro
+            return operacoes
+
+    def _escrever_lote(self, operacoes):
+        if not operacoes:
+            return
+        if USAR_JOURNAL:
+            obter_indice(self.filepath).gravar_lote(operacoes)
+        else:
+            path2save, filename = os.path.split(self.filepath)
+            salvar_json(list(self._dados.values()), path2save, filename)
+
+        if self._dados is not None:
+            self._assinatura = self._assinatura_disco()  # a própria escrita não conta como mudança externa
+
+    def adicionar(self, transacao):
+        self._aplicar("add", transacao)
+
+    def editar(self, transacao, original=None):
+        """
+        Grava a transação editada. Se ela tem "versao" (a que foi lida), a edição é
+        conferida contra a versão atual; com `original` (a transação como foi lida)
+        edições concorrentes em campos diferentes são mescladas.
+        """
+        self.aplicar_lote([("edit", transacao, original)])
+
+    def excluir(self, uuid_transacao, versao=None):
+        """Exclui a transação; com `versao`, só se ninguém a alterou depois dessa versão."""
+        self._aplicar("delete", {"UUID": uuid_transacao} if versao is None else {"UUID": uuid_transacao, "versao": versao})
+
+    # --- group commit ---
+
+    def _enfileirar(self, operacoes):
+        """
+        Group commit: o lote é conferido e aplicado na memória na hora (um conflito de
+        versão levanta aqui, como sem a janela), mas a gravação fica para daqui a
+        `janela_grupo` segundos, junto com a dos lotes que chegarem até lá: uma escrita
+        no journal (ou uma reescrita do json, com o journal desligado) para todos.
+        Uma queda durante a janela perde a fila inteira, nunca uma parte dela.
+        """
+        with self._lock_grupo:
+            with trava_arquivo(self.filepath):
+                self._atualizar()  # a fila só existe na memória, então os dados precisam estar nela
+                resolvidas = self._aplicar_em_memoria(operacoes)
+            self._grupo.append((operacoes, resolvidas))
+            self._geracao_grupo += 1
+            if sum(len(r) for _, r in self._grupo) >= LIMITE_GROUP_COMMIT:
+                self.descarregar()
+            elif self._timer_grupo is None:
+                self._timer_grupo = threading.Timer(self.janela_grupo, self.descarregar)
+                self._timer_grupo.daemon = True
+                self._timer_grupo.start()
+                if not self._descarregar_ao_sair:
+                    atexit.register(self.descarregar)
+                    self._descarregar_ao_sair = True
+
+    def descarregar(self):
+        """Grava agora a fila do group commit. Retorna quantas operações foram para o disco."""
+        with self._lock_grupo:
+            if self._timer_grupo is not None:
+                self._timer_grupo.cancel()
+                self._timer_grupo = None
+            fila, self._grupo = self._grupo, []
+            if not fila:
+                return 0
+            try:
+                with trava_arquivo(self.filepath), self._lock_carga:
+                    if self._assinatura == self._assinatura_disco():
+                        operacoes = [operacao for _, resolvidas in fila for operacao in resolvidas]
+                    else:
+                        # outro programa gravou durante a janela: as versões são conferidas de novo contra o
+                        # disco, e o que entrou em conflito fica de fora (em conflitos_grupo)
+                        self._dados = self._tabela = self._agregados = self._indices = self._tempo = None
+                        conflitos = len(self.conflitos_grupo)
+                        operacoes = self._aplicar_em_memoria([operacao for originais, _ in fila for operacao in originais],
+                                                             self.conflitos_grupo)
+                        for erro in self.conflitos_grupo[conflitos:]:
+                            print(f"⚠️ Operação descartada no group commit: {erro}", file=sys.stderr)
+                    ponto_de_falha("grupo_antes_gravar")
+                    self._escrever_lote(operacoes)
+            except BaseException:
+                self._dados = self._tabela = self._agregados = self._indices = self._tempo = None  # a memória tem o que não foi gravado
+                raise
+            return len(operacoes)
+
+# -----------------------
+# SQLITE storage
+# -----------------------
+# Repositório sobre um banco sqlite (arquivo .db): o SQL fica em armazenamento_sqlite.py,
+# aqui só a conversão das transações em linhas e a interface do RepositorioTransacoes.
+
+def _linha_sqlite(t):
+    return (str(t['UUID']), para_centavos(t['valor']), t.get('categoria'), t.get('versao'), t.get('criado_em'))
+
+class RepositorioTransacoesSQLite(RepositorioTransacoes):
+    """
+    Repositório com o banco em sqlite: mesma interface do RepositorioTransacoes,
+    mas nada é mantido em memória. Leituras e relatórios são consultas SQL e
+    cada lote de escritas é uma transação do banco (sem group commit).
+    """
+
+    _chave = staticmethod(armazenamento_sqlite.chave_sqlite)
+
+    def __init__(self, filepath='./data/transactions.db'):
+        super().__init__(filepath)
+        self.janela_grupo = 0.0  # o commit do sqlite já é a unidade de escrita
+        self.conexao = armazenamento_sqlite.conectar_sqlite(filepath, compartilhada=True, sincronizar=SINCRONIZAR_ESCRITAS)
+        self._consultas = armazenamento_sqlite.ConsultasSQLite(self.conexao, SketchQuantis)
+
+    def transacoes(self):
+        return self._consultas
+
+    def ultimas(self, n=5, categoria=None):
+        return self._consultas.ultimas(n, categoria)
+
+    def entre(self, inicio=None, fim=None, categoria=None):
+        return self._consultas.entre(inicio, fim, categoria)
+
+    def totais_por_mes(self, categoria=None):
+        return self._consultas.totais_por_mes(categoria)
+
+    def buscar(self, uuid_procurado):
+        return self._consultas.buscar(uuid_procurado)
+
+    def tabela(self):
+        return self._consultas  # top-k direto no banco
+
+    def agregados(self):
+        return self._consultas  # totais e médias com SUM/COUNT no banco
+
+    def verificar_agregados(self):
+        """Compara as agregações do SQL com um recálculo em Python; retorna as divergências."""
+        esperado = AgregadosPorCategoria.de_transacoes(iter(self._consultas))
+        divergencias = []
+        for categoria in set(self._consultas.categorias()) | set(esperado.categorias()):
+            atual, certo = self._consultas.resumo(categoria), esperado.resumo(categoria)
+            if atual != certo:
+                divergencias.append(f"{categoria}: sqlite {atual} != recalculado {certo}")
+        if self._consultas.totais_por_mes() != esperado.totais_por_mes():
+            divergencias.append("totais por mês do sqlite divergem do recálculo")
+        return divergencias
+
+    def filtrar(self, categoria=None, minimo=None, maximo=None, prefixo=None):
+        return self._consultas.filtrar(categoria, minimo, maximo, prefixo)
+
+    def versao_dados(self):
+        return self._consultas.versao_dados()
+
+    def aplicar_lote(self, operacoes):
+        """Grava o lote numa transação do banco, conferindo as versões já com a escrita reservada."""
+        operacoes = list(operacoes)
+        if not operacoes:
+            return
+        with self._consultas.escrita():
+            self._gravar_lote(operacoes)
+
+    def _atual(self, uuid_transacao):
+        return self.buscar(uuid_transacao)
+
+    def _gravar_lote(self, operacoes):
+        self._consultas.gravar([(op, self._chave(transacao["UUID"]), None if op == "delete" else _linha_sqlite(transacao))
+                                for op, transacao in self._resolver_versoes(operacoes)])
+
+def abrir_repositorio(filepath='./data/transactions.json', transacoes=None):
+    """Repositório adequado ao arquivo do banco: sqlite pela extensão, senão json/binário."""
+    if formato_sqlite(filepath):
+        return RepositorioTransacoesSQLite(filepath)
+    return RepositorioTransacoes(filepath, transacoes)
+
+# -----------------------
+# BULK generation
+# -----------------------
+
+def _gerador_numpy(seed):
+    """
+    MT19937 do numpy inicializado igual ao random.seed(seed) do Python (init_by_array
+    com os blocos de 32 bits do inteiro), então os valores saem idênticos aos do
+    gera_transacao. Retorna None se não for possível (sem numpy ou seed não inteira).
+    """
+    if np is None or not isinstance(seed, int):
+        return None
+    seed, chave = abs(seed), []
+    while True:
+        chave.append(seed & 0xffffffff)
+        seed >>= 32
+        if not seed:
+            break
+    return np.random.RandomState(chave)
+
+def _centavos_em_lote(valores):
+    """
+    Equivalente vetorizado de round(valor, 2) * 100. Os poucos valores que caem perto
+    de meio centavo (onde x*100 pode arredondar diferente) são refeitos com o round do Python.
+    """
+    escalado = valores * 100
+    centavos = np.rint(escalado).astype(np.int64)
+    for i in np.flatnonzero(np.abs(escalado - np.floor(escalado) - 0.5) < 1e-6):
+        centavos[i] = round(round(float(valores[i]), 2) * 100)
+    return centavos
+
+def _uuids4_em_lote(quantidade):
+    """`quantidade` UUIDs v4 aleatórios, como 16 bytes cada, num único bytes."""
+    bloco = bytearray(os.urandom(16 * quantidade))
+    bloco[6::16] = bytes((b & 0x0f) | 0x40 for b in bloco[6::16])  # versão 4
+    bloco[8::16] = bytes((b & 0x3f) | 0x80 for b in bloco[8::16])  # variante RFC 4122
+    return bytes(bloco)
+
+def _texto_uuids(bloco):
+    """Converte os UUIDs de `bloco` para texto canônico, devolvendo uma string com 36 caracteres por UUID."""
+    hexa = bloco.hex()
+    return "".join(f"{hexa[i:i + 8]}-{hexa[i + 8:i + 12]}-{hexa[i + 12:i + 16]}-{hexa[i + 16:i + 20]}-{hexa[i + 20:i + 32]}"
+                   for i in range(0, len(hexa), 32))
+
+def _textos_instantes(instantes):
+    """texto_instante de uma lista inteira (vetorizado com numpy)."""
+    if np is None:
+        return [texto_instante(segundos) for segundos in instantes]
+    return np.datetime_as_string(np.array(instantes, dtype="datetime64[s]")).tolist()
+
+def gerar_lotes(proporcao_categorias, num_transacoes=1, categoria=None, seed=settings.seed, tamanho_lote=1_000_000):
+    """
+    Versão em lotes do criar_transacoes: gera (categoria, centavos, uuids, instantes) com
+    até `tamanho_lote` transações por vez, na mesma ordem e com os mesmos valores
+    (mesma seed) que o criar_transacoes, sem guardar o total na memória.
+    `centavos` é uma lista de inteiros, `uuids` um bytes com 16 bytes por transação
+    e `instantes` as datas de criação (ver instantes_sinteticos).
+    """
+    assert sum([proporcao_categorias[k] for k in proporcao_categorias])==1, '`proporcao_categorias` não soma 100%! Favor rever.'
+    if categoria:
+        quantidades = {categoria: num_transacoes}
+    else:
+        quantidades = {c: int(num_transacoes * proporcao) for c, proporcao in proporcao_categorias.items()}
+
+    gerador = _gerador_numpy(seed)
+    if gerador is None:
+        random.seed(seed)
+    fim, datas = instante(agora_iso()), random.Random(seed)
+    datas_numpy = np.random.default_rng(seed) if np is not None else None
+    for categoria, quantidade in quantidades.items():
+        for inicio in range(0, quantidade, tamanho_lote):
+            n = min(tamanho_lote, quantidade - inicio)
+            if gerador is not None:
+                centavos = _centavos_em_lote(gerador.uniform(1.0, 1000.0, n)).tolist()
+            else:
+                centavos = [round(round(random.uniform(1.0, 1000.0), 2) * 100) for _ in range(n)]
+            if datas_numpy is not None:
+                instantes = datas_numpy.integers(fim - JANELA_DATAS_SINTETICAS, fim, n).tolist()
+            else:
+                instantes = [datas.randrange(fim - JANELA_DATAS_SINTETICAS, fim) for _ in range(n)]
+            yield categoria, centavos, _uuids4_em_lote(n), instantes
+
+def criar_bd_em_lote(num_transacoes:int = 10000, proporcao_categorias:dict = settings.categorias_proporcao, path2save="./data",
+                     filename='transactions.json', tamanho_lote=1_000_000, seed=settings.seed):
+    """
+    Gera o banco em lotes e grava cada lote direto no arquivo (json no formato do
+    salvar_json, ou binário se o nome terminar em .bin). A memória usada depende só
+    de `tamanho_lote`, então dá para gerar 100M de transações.
+    """
+    if not os.path.exists(path2save):
+        os.makedirs(path2save)
+    filepath = os.path.join(path2save, filename)
+    lotes = gerar_lotes(proporcao_categorias, num_transacoes, seed=seed, tamanho_lote=tamanho_lote)
+    if formato_binario(filepath):
+        transacoes = ({"UUID": str(uuid.UUID(bytes=uuids[16 * i:16 * i + 16])), "valor": c / 100, "categoria": categoria,
+                       "criado_em": texto_instante(instantes[i])}
+                      for categoria, centavos, uuids, instantes in lotes for i, c in enumerate(centavos))
+        gravar_snapshot(transacoes, filepath)
+    else:
+        temporario = filepath + '.tmp'
+        with open(temporario, "w") as file:
+            separador = "[\n"
+            for categoria, centavos, uuids, instantes in lotes:
+                texto_uuids, categoria_json = _texto_uuids(uuids), json.dumps(categoria)
+                datas = _textos_instantes(instantes)
+                file.write(separador + ",\n".join(
+                    f'    {{\n        "UUID": "{texto_uuids[36 * i:36 * i + 36]}",\n        "valor": {c / 100!r},\n        "categoria": {categoria_json},'
+                    f'\n        "criado_em": "{datas[i]}"\n    }}'
+                    for i, c in enumerate(centavos)))
+                separador = ",\n"
+            file.write("[]" if separador == "[\n" else "\n]")
+        trocar_arquivo(temporario, filepath)
+    descartar_journais(filepath)
+    print(f"Arquivo salvo em: {os.path.abspath(filepath)}")
+
+# -----------------------
+# COLUMNAR table
+# -----------------------
+
+_DTYPE_BINARIO = np.dtype([('uuid', 'S16'), ('centavos', '<i8'), ('codigo', 'u1'), ('instante', '<i8')]) if np is not None else None  # 33 bytes, igual a _REGISTRO_BINARIO
+_DTYPE_BINARIO_V1 = np.dtype([('uuid', 'S16'), ('centavos', '<i8'), ('codigo', 'u1')]) if np is not None else None
+
+class TabelaColunar:
+    """
+    Transações guardadas em colunas NumPy em vez de uma lista de dicts:
+    `centavos` (int64), `codigos` (uint8, posição da categoria em `categorias`),
+    `uuids` (16 bytes fixos) e `instantes` (int64, data de criação; 0 se não há);
+    as versões (controle otimista) ficam em `versoes`, só para as linhas que têm.
+    São ~33 bytes por transação, contra algumas centenas do dict, e totais,
+    médias e top-k rodam vetorizados.
+    """
+
+    def __init__(self, centavos, codigos, categorias, uuids, ids_texto=None, instantes=None, ordem=None, versoes=None):
+        self.centavos = centavos
+        self.codigos = codigos
+        self.categorias = categorias
+        self.uuids = uuids
+        self.ids_texto = ids_texto or {}  # linha -> UUID original, quando ele não é um UUID canônico
+        self.versoes = versoes or {}      # linha -> "versao" da transação, como no dicionário do binário
+        self.instantes = instantes if instantes is not None else np.zeros(len(centavos), dtype=np.int64)
+        self._ordem = ordem  # índice de tempo (ver ordem_tempo), montado na primeira consulta se não veio do arquivo
+
+    @classmethod
+    def de_transacoes(cls, transacoes):
+        """Monta a tabela a partir de qualquer iterável de transações no formato do json."""
+        if np is None:
+            raise ImportError("A tabela colunar precisa do numpy (pip install numpy).")
+        centavos, codigos, uuids, instantes = array.array('q'), array.array('B'), bytearray(), array.array('q')
+        categorias, codigo_da_categoria, ids_texto, versoes = [], {}, {}, {}
+        for linha, t in enumerate(transacoes):
+            if type(t) is Transacao:  # campos já em centavos/instante/bytes: nada para converter
+                centavos.append(t.centavos)
+                instantes.append(t.instante)
+                categoria = t.categoria
+                chave, guardar_texto = t.uuid_bytes()
+                versao = t.versao
+            else:
+                centavos.append(para_centavos(t['valor']))
+                instantes.append(instante(t.get('criado_em')))
+                categoria = t.get('categoria')
+                chave, guardar_texto = bytes_uuid(str(t['UUID']))
+                versao = t.get('versao')
+            if versao is not None:
+                versoes[linha] = versao
+            codigo = codigo_da_categoria.get(categoria)
+            if codigo is None:
+                if len(categorias) == 256:
+                    raise ValueError("A tabela colunar suporta no máximo 256 categorias.")
+                codigo = codigo_da_categoria[categoria] = len(categorias)
+                categorias.append(categoria)
+            codigos.append(codigo)
+            if guardar_texto:
+                ids_texto[linha] = str(t['UUID'])
+            uuids += chave
+        return cls(np.frombuffer(centavos, dtype=np.int64), np.frombuffer(codigos, dtype=np.uint8),
+                   categorias, np.frombuffer(bytes(uuids), dtype='S16'), ids_texto, np.frombuffer(instantes, dtype=np.int64),
+                   versoes=versoes)
+
+    @classmethod
+    def de_json(cls, filepath='./data/transactions.json'):
+        """Lê o banco json direto para colunas, sem montar a lista de dicts."""
+        return cls.de_transacoes(iterar_bd(filepath))
+
+    @classmethod
+    def de_binario(cls, filepath='./data/transactions.bin'):
+        """
+        Abre o snapshot binário via mmap: as colunas (e o índice de tempo gravado no
+        arquivo) são views sobre o arquivo, então não há parsing nem cópia, só o que
+        for lido entra na memória.
+        O journal não é aplicado aqui; use de_json/de_transacoes(iterar_bd(...)) se houver.
+        """
+        if np is None:
+            raise ImportError("A tabela colunar precisa do numpy (pip install numpy).")
+        quantidade, categorias, ids_texto, versoes, (_, offset_ordem) = _cabecalho_binario(filepath)
+        with open(filepath, "rb") as file:
+            mm = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        if offset_ordem is None:  # versão 1 do formato: sem datas
+            registros = np.frombuffer(mm, dtype=_DTYPE_BINARIO_V1, count=quantidade, offset=_CABECALHO_BINARIO.size)
+            return cls(registros['centavos'], registros['codigo'], list(categorias), registros['uuid'], dict(ids_texto),
+                       versoes=dict(versoes))
+        registros = np.frombuffer(mm, dtype=_DTYPE_BINARIO, count=quantidade, offset=_CABECALHO_BINARIO.size)
+        ordem = np.frombuffer(mm, dtype='<i8', count=quantidade, offset=offset_ordem)
+        return cls(registros['centavos'], registros['codigo'], list(categorias), registros['uuid'], dict(ids_texto),
+                   registros['instante'], ordem, dict(versoes))
+
+    def transacao(self, linha):
+        linha = int(linha)
+        transacao = {"UUID": self.uuid(linha),
+                     "valor": int(self.centavos[linha]) / 100,
+                     "categoria": self.categorias[self.codigos[linha]]}
+        if self.instantes[linha]:
+            transacao["criado_em"] = texto_instante(self.instantes[linha])
+        if linha in self.versoes:
+            transacao["versao"] = self.versoes[linha]
+        return transacao
+
+    def uuid(self, linha):
+        return self.ids_texto.get(linha) or str(uuid.UUID(bytes=self.uuids[linha].ljust(16, b'\0')))
+
+    def __len__(self):
+        return len(self.centavos)
+
+    @property
+    def nbytes(self):
+        return self.centavos.nbytes + self.codigos.nbytes + self.uuids.nbytes
+
+    # --- relatórios vetorizados ---
+
+    def _linhas(self, categoria=None):
+        """Índices das linhas da categoria (ou None para todas)."""
+        if categoria is None:
+            return None
+        if categoria not in self.categorias:
+            return np.empty(0, dtype=np.intp)
+        return np.flatnonzero(self.codigos == self.categorias.index(categoria))
+
+    def _centavos(self, categoria=None):
+        linhas = self._linhas(categoria)
+        return self.centavos if linhas is None else self.centavos[linhas]
+
+    def contar(self, categoria=None):
+        return len(self._centavos(categoria))
+
+    def total(self, categoria=None):
+        return int(self._centavos(categoria).sum()) / 100
+
+    def media(self, categoria=None):
+        centavos = self._centavos(categoria)
+        if len(centavos) == 0:
+            return None
+        return int(centavos.sum()) / len(centavos) / 100
+
+    def top_k(self, k=5, m='max', categoria=None):
+        """
+        As k transações com maior valor ('max'), menor valor ('min') ou mais próximas
+        da média ('median'), usando partição (O(N)) em vez de ordenar tudo.
+        Empates saem na ordem de cadastro, como no sorted() da versão com lista.
+        """
+        linhas = self._linhas(categoria)
+        if linhas is None:
+            linhas = np.arange(len(self))
+        centavos = self.centavos[linhas]
+        if len(centavos) == 0 or k <= 0:
+            return []
+        if m == 'max':
+            chave = -centavos
+        elif m == 'min':
+            chave = centavos
+        elif m == 'median':
+            chave = np.abs(centavos - int(centavos.sum()) / len(centavos))
+        else:
+            raise ValueError(f"m deve ser 'max', 'min' ou 'median', não {m!r}")
+        if k < len(chave):
+            limite = np.partition(chave, k - 1)[k - 1]
+            candidatos = np.flatnonzero(chave <= limite)
+        else:
+            candidatos = np.arange(len(chave))
+        escolhidos = candidatos[np.argsort(chave[candidatos], kind='stable')][:k]
+        return [self.transacao(linhas[i]) for i in escolhidos]
+
+    # --- índice de tempo ---
+
+    def ordem_tempo(self):
+        """Linhas em ordem de criação (empates e transações sem data na ordem de cadastro)."""
+        if self._ordem is None:
+            self._ordem = np.argsort(self.instantes, kind='stable')
+        return self._ordem
+
+    def posicoes_entre(self, inicio=None, fim=None):
+        """
+        Faixa [a, b) da ordem_tempo com inicio <= instante < fim, por busca binária:
+        O(log N) leituras, sem percorrer as linhas fora do período.
+        """
+        ordem, instantes = self.ordem_tempo(), self.instantes
+        a = 0 if inicio is None else bisect.bisect_left(ordem, inicio, key=lambda linha: instantes[linha])
+        b = len(ordem) if fim is None else bisect.bisect_left(ordem, fim, lo=a, key=lambda linha: instantes[linha])
+        return a, b
+
+    def linhas_recentes(self, inicio=None, fim=None):
+        """Gera as linhas do período da mais nova para a mais antiga, sob demanda."""
+        ordem = self.ordem_tempo()
+        a, b = self.posicoes_entre(inicio, fim)
+        for posicao in range(b - 1, a - 1, -1):
+            yield int(ordem[posicao])
+
+# -----------------------
+# QUANTILE sketches
+# -----------------------
+# Mediana, percentis e histogramas sem ordenar a lista: cada categoria dos agregados
+# guarda a distribuição dos seus valores num SketchQuantis, atualizado a cada escrita.
+# Enquanto há poucos valores distintos ele conta cada valor (exato); acima disso troca os
+# valores por baldes logarítmicos (como o DDSketch), em memória limitada, com os quantis a
+# menos de ERRO_RELATIVO_QUANTIS do exato. Inserir e remover mudam um contador, e dois
+# sketches (de categorias ou de fatias do banco) se juntam somando os contadores.
+
+class SketchQuantis:
+    """
+    Distribuição de valores em centavos. Exata (centavos -> quantidade) até `limite`
+    valores distintos; depois, balde -> quantidade, com o balde k cobrindo os valores
+    de módulo em (gama^(k-1), gama^k]: são ~2.100 baldes de 1 centavo a 10 milhões de
+    reais, seja qual for a quantidade. Um sketch que virou aproximado não volta a ser exato.
+    """
+
+    def __init__(self, limite=LIMITE_QUANTIS_EXATOS, erro=ERRO_RELATIVO_QUANTIS):
+        self.limite = limite
+        self.erro = erro
+        self.gama = (1 + erro) / (1 - erro)
+        self._inverso_log = 1 / math.log(self.gama)
+        self.exato = True
+        self.contagens = {}  # centavos (exato) ou balde (aproximado) -> quantidade
+        self.quantidade = 0
+
+    def _balde(self, centavos):
+        """Balde do valor: 0 para zero, ±(k + 1) para |centavos| em (gama^(k-1), gama^k]; ordena igual aos valores."""
+        if centavos == 0:
+            return 0
+        k = math.ceil(math.log(abs(centavos)) * self._inverso_log)
+        return k + 1 if centavos > 0 else -(k + 1)
+
+    def _valor(self, chave):
+        """Centavos que representam a chave: o próprio valor, ou o ponto do balde com o menor erro relativo."""
+        if self.exato or chave == 0:
+            return chave
+        centavos = round(2 * self.gama ** (abs(chave) - 1) / (self.gama + 1))
+        return centavos if chave > 0 else -centavos
+
+    def _aproximar(self):
+        baldes = {}
+        for centavos, quantidade in self.contagens.items():
+            balde = self._balde(centavos)
+            baldes[balde] = baldes.get(balde, 0) + quantidade
+        self.contagens, self.exato = baldes, False
+
+    def adicionar(self, centavos, quantidade=1):
+        if self.exato:
+            chave = centavos
+        elif centavos > 0:  # o _balde dos positivos, sem a chamada: é o caminho de toda inserção
+            chave = math.ceil(math.log(centavos) * self._inverso_log) + 1
+        else:
+            chave = self._balde(centavos)
+        self.contagens[chave] = self.contagens.get(chave, 0) + quantidade
+        self.quantidade += quantidade
+        if self.exato and len(self.contagens) > self.limite:
+            self._aproximar()
+
+    def remover(self, centavos):
+        chave = centavos if self.exato else self._balde(centavos)
+        restante = self.contagens.get(chave, 0) - 1
+        if restante:
+            self.contagens[chave] = restante
+        else:
+            self.contagens.pop(chave, None)
+        self.quantidade -= 1
+
+    def mesclar(self, outro):
+        """Soma a distribuição de `outro` a esta (aproximada se qualquer uma das duas for)."""
+        if self.exato and not outro.exato:
+            self._aproximar()
+        for chave, quantidade in outro.contagens.items():
+            if self.exato or not outro.exato:
+                self.contagens[chave] = self.contagens.get(chave, 0) + quantidade
+            else:
+                balde = self._balde(chave)
+                self.contagens[balde] = self.contagens.get(balde, 0) + quantidade
+        self.quantidade += outro.quantidade
+        if self.exato and len(self.contagens) > self.limite:
+            self._aproximar()
+        return self
+
+    def copy(self):
+        copia = SketchQuantis(self.limite, self.erro)
+        copia.exato, copia.contagens, copia.quantidade = self.exato, dict(self.contagens), self.quantidade
+        return copia
+
+    def __len__(self):
+        return self.quantidade
+
+    # --- consultas ---
+
+    def quantil(self, q):
+        """
+        Centavos do quantil q (0 a 1) pelo posto mais próximo: a mediana de 4 valores é
+        o 2º, então o resultado é sempre um valor em centavos, sem meio centavo. None se vazio.
+        """
+        if self.quantidade <= 0:
+            return None
+        posto = max(1, math.ceil(q * self.quantidade))
+        acumulado = 0
+        for chave in sorted(self.contagens):
+            acumulado += self.contagens[chave]
+            if acumulado >= posto:
+                return self._valor(chave)
+        return self._valor(max(self.contagens))
+
+    def resumo(self, percentis=PERCENTIS_RELATORIO):
+        """{'quantidade', 'exato', 'min', 'mediana', 'p90', 'p99', 'max'} com os valores em reais (None se vazio)."""
+        resumo = {"quantidade": self.quantidade, "exato": self.exato}
+        for nome, q in [("min", 0)] + [("mediana" if p == 50 else f"p{p}", p / 100) for p in percentis] + [("max", 1)]:
+            centavos = self.quantil(q)
+            resumo[nome] = None if centavos is None else centavos / 100
+        return resumo
+
+    def histograma(self, baldes=BALDES_HISTOGRAMA):
+        """
+        [{'de', 'ate', 'quantidade'}] em faixas de mesma largura (em centavos, inclusive)
+        entre o menor e o maior valor, com os valores em reais. No modo aproximado cada
+        balde do sketch entra inteiro na faixa do seu valor representativo.
+        """
+        if self.quantidade <= 0:
+            return []
+        valores = [(self._valor(chave), quantidade) for chave, quantidade in self.contagens.items() if quantidade]
+        menor, maior = min(v for v, _ in valores), max(v for v, _ in valores)
+        largura = max(1, -(-(maior - menor + 1) // max(1, baldes)))
+        contagens = [0] * (-(-(maior - menor + 1) // largura))
+        for valor, quantidade in valores:
+            contagens[(valor - menor) // largura] += quantidade
+        return [{"de": (menor + i * largura) / 100, "ate": (menor + (i + 1) * largura - 1) / 100, "quantidade": quantidade}
+                for i, quantidade in enumerate(contagens)]
+
+# -----------------------
+# AGGREGATES
+# -----------------------
+
+class AgregadosPorCategoria:
+    """
+    Soma, quantidade, mínimo e máximo de cada categoria, atualizados a cada
+    inserção, edição e exclusão, para que total, quantidade e média saiam em O(1).
+
+    A soma é guardada em centavos (inteiro), então somar e subtrair repetidamente
+    não acumula erro de float. Quando se remove o mínimo ou o máximo de uma categoria,
+    ele só é recalculado (percorrendo `fonte()`) na próxima vez que for pedido.
+    Soma e quantidade também são mantidas por mês de criação, para os totais mensais,
+    e a distribuição dos valores num SketchQuantis, para mediana, percentis e histogramas.
+    """
+
+    def __init__(self, categorias=settings.categorias_proporcao, fonte=None):
+        self.fonte = fonte  # função que devolve as transações, usada para recalcular extremos
+        self.por_categoria = {}
+        self.por_mes = {}  # (mês 'aaaa-mm' ou None se sem data, categoria) -> [soma, quantidade]
+        self.sketches = {}  # categoria -> SketchQuantis dos centavos
+        for categoria in categorias:
+            self._categoria(categoria)
+
+    @classmethod
+    def de_transacoes(cls, transacoes, fonte=None):
+        agregados = cls(fonte=fonte)
+        for t in transacoes:
+            agregados.adicionar(t)
+        return agregados
+
+    def _categoria(self, categoria):
+        agregado = self.por_categoria.get(categoria)
+        if agregado is None:
+            agregado = self.por_categoria[categoria] = {"soma": 0, "quantidade": 0, "min": None, "max": None, "extremos_ok": True}
+        return agregado
+
+    @staticmethod
+    def _campos(transacao):
+        """(categoria, centavos, mês) da transação, pelos atributos se for uma Transacao."""
+        if type(transacao) is Transacao:
+            return transacao.categoria, transacao.centavos, transacao.mes()
+        return transacao.get('categoria'), para_centavos(transacao['valor']), mes_de(transacao)
+
+    def _sketch(self, categoria):
+        sketch = self.sketches.get(categoria)
+        if sketch is None:
+            sketch = self.sketches[categoria] = SketchQuantis()
+        return sketch
+
+    def _mes(self, categoria, mes):
+        chave = (mes, categoria)
+        mensal = self.por_mes.get(chave)
+        if mensal is None:
+            mensal = self.por_mes[chave] = [0, 0]
+        return chave, mensal
+
+    def adicionar(self, transacao):
+        categoria, centavos, mes = self._campos(transacao)
+        agregado = self._categoria(categoria)
+        agregado["soma"] += centavos
+        agregado["quantidade"] += 1
+        _, mensal = self._mes(categoria, mes)
+        mensal[0] += centavos
+        mensal[1] += 1
+        self._sketch(categoria).adicionar(centavos)
+        if agregado["extremos_ok"]:
+            if agregado["min"] is None or centavos < agregado["min"]:
+                agregado["min"] = centavos
+            if agregado["max"] is None or centavos > agregado["max"]:
+                agregado["max"] = centavos
+
+    def remover(self, transacao):
+        categoria, centavos, mes = self._campos(transacao)
+        agregado = self._categoria(categoria)
+        agregado["soma"] -= centavos
+        agregado["quantidade"] -= 1
+        chave, mensal = self._mes(categoria, mes)
+        mensal[0] -= centavos
+        mensal[1] -= 1
+        if mensal[1] == 0:
+            del self.por_mes[chave]
+        self._sketch(categoria).remover(centavos)
+        if agregado["quantidade"] == 0:
+            agregado.update({"min": None, "max": None, "extremos_ok": True})
+        elif centavos in (agregado["min"], agregado["max"]):
+            agregado["extremos_ok"] = False
+
+    def editar(self, antiga, nova):
+        self.remover(antiga)
+        self.adicionar(nova)
+
+    def mesclar(self, outro):
+        """Soma os agregados de `outro` (ex.: de outra fatia do banco) a estes."""
+        outro._corrigir_extremos()
+        for categoria, parcial in outro.por_categoria.items():
+            agregado = self._categoria(categoria)
+            agregado["soma"] += parcial["soma"]
+            agregado["quantidade"] += parcial["quantidade"]
+            for extremo, escolher in (("min", min), ("max", max)):
+                valores = [v for v in (agregado[extremo], parcial[extremo]) if v is not None]
+                agregado[extremo] = escolher(valores) if valores else None
+        for chave, (soma, quantidade) in outro.por_mes.items():
+            mensal = self.por_mes.setdefault(chave, [0, 0])
+            mensal[0] += soma
+            mensal[1] += quantidade
+        for categoria, sketch in outro.sketches.items():
+            self._sketch(categoria).mesclar(sketch)
+        return self
+
+    # --- consultas ---
+
+    def categorias(self):
+        return list(self.por_categoria)
+
+    def quantidade(self, categoria=None):
+        if categoria is None:
+            return sum(a["quantidade"] for a in self.por_categoria.values())
+        return self.por_categoria.get(categoria, {"quantidade": 0})["quantidade"]
+
+    def total(self, categoria=None):
+        if categoria is None:
+            return sum(a["soma"] for a in self.por_categoria.values()) / 100
+        return self.por_categoria.get(categoria, {"soma": 0})["soma"] / 100
+
+    def media(self, categoria=None):
+        quantidade = self.quantidade(categoria)
+        return self.total(categoria) / quantidade if quantidade else None
+
+    def _corrigir_extremos(self):
+        pendentes = {c for c, a in self.por_categoria.items() if not a["extremos_ok"]}
+        if not pendentes:
+            return
+        for categoria in pendentes:
+            self.por_categoria[categoria].update({"min": None, "max": None, "extremos_ok": True})
+        for t in self.fonte():
+            categoria = t.categoria if type(t) is Transacao else t.get('categoria')
+            if categoria in pendentes:
+                agregado = self.por_categoria[categoria]
+                centavos = t.centavos if type(t) is Transacao else para_centavos(t['valor'])
+                if agregado["min"] is None or centavos < agregado["min"]:
+                    agregado["min"] = centavos
+                if agregado["max"] is None or centavos > agregado["max"]:
+                    agregado["max"] = centavos
+
+    def minimo(self, categoria=None):
+        self._corrigir_extremos()
+        valores = [a["min"] for c, a in self.por_categoria.items() if a["min"] is not None and categoria in (None, c)]
+        return min(valores) / 100 if valores else None
+
+    def maximo(self, categoria=None):
+        self._corrigir_extremos()
+        valores = [a["max"] for c, a in self.por_categoria.items() if a["max"] is not None and categoria in (None, c)]
+        return max(valores) / 100 if valores else None
+
+    def resumo(self, categoria=None):
+        return {"total": self.total(categoria), "quantidade": self.quantidade(categoria), "media": self.media(categoria),
+                "min": self.minimo(categoria), "max": self.maximo(categoria)}
+
+    def distribuicao(self, categoria=None):
+        """SketchQuantis dos valores da categoria, ou de todas juntas (uma cópia mesclada) se None."""
+        if categoria is not None:
+            return self.sketches.get(categoria) or SketchQuantis()
+        juntas = SketchQuantis()
+        for sketch in self.sketches.values():
+            juntas.mesclar(sketch)
+        return juntas
+
+    def totais_por_mes(self, categoria=None):
+        """[{'mes', 'total', 'quantidade'}] por mês de criação, em ordem; o mês None (sem data) vem no fim."""
+        meses = {}
+        for (mes, c), (soma, quantidade) in self.por_mes.items():
+            if categoria is None or c == categoria:
+                acumulado = meses.setdefault(mes, [0, 0])
+                acumulado[0] += soma
+                acumulado[1] += quantidade
+        return [{"mes": mes, "total": soma / 100, "quantidade": quantidade}
+                for mes, (soma, quantidade) in sorted(meses.items(), key=lambda item: (item[0] is None, item[0] or ""))]
+
+    def verificar(self, transacoes):
+        """
+        Compara com um recálculo completo a partir de `transacoes`.
+        Retorna a lista de divergências (vazia se está tudo consistente).
+        """
+        esperado = AgregadosPorCategoria.de_transacoes(transacoes)
+        divergencias = []
+        for categoria in set(self.por_categoria) | set(esperado.por_categoria):
+            atual, certo = self.resumo(categoria), esperado.resumo(categoria)
+            if atual != certo:
+                divergencias.append(f"{categoria}: mantido {atual} != recalculado {certo}")
+        if self.totais_por_mes() != esperado.totais_por_mes():
+            divergencias.append("totais por mês divergem do recálculo")
+        for categoria in set(self.sketches) | set(esperado.sketches):
+            atual, certo = self.distribuicao(categoria), esperado.distribuicao(categoria)
+            # um sketch que já ficou aproximado só pode ser comparado com outro aproximado
+            if atual.exato == certo.exato and atual.contagens != certo.contagens:
+                divergencias.append(f"{categoria}: distribuição dos valores diverge do recálculo")
+        return divergencias
+
+# -----------------------
+# SECONDARY indexes
+# -----------------------
+# Filtros por categoria, faixa de valor e prefixo de UUID sem percorrer o banco:
+#   - categoria -> chaves das transações (lista invertida, um dict usado como conjunto ordenado);
+#   - valores em centavos ordenados (com as chaves na mesma ordem), para faixas por busca binária;
+#   - UUIDs ordenados: o int dos canônicos ordena igual ao texto em hexadecimal, então um
+#     prefixo ('87aed9a6', o que o m5 mostra) vira uma faixa de ints; ids fora do padrão
+#     ficam numa lista de textos à parte.
+# A consulta começa pelo índice que devolve menos candidatas e confere os outros filtros
+# só nelas: total, quantidade e listagem custam O(resultado) em vez de O(N).
+# Montados na primeira consulta e mantidos a cada escrita, como os agregados.
+LIMITE_LISTAGEM_FILTRO = 20  # transações listadas na tela; o total e a quantidade contam o filtro inteiro
+
+_POSICOES_HIFEN_UUID = (8, 13, 18, 23)
+_DIGITOS_HEX = frozenset("0123456789abcdef")
+
+def faixa_prefixo_uuid(prefixo):
+    """
+    [início, fim) dos ints de UUID canônico cujo texto começa com `prefixo`
+    ('87aed9a6', '87aed9a6-7b'...), ou None se nenhum UUID canônico começa assim.
+    """
+    prefixo = prefixo.strip().lower()
+    if len(prefixo) > 36 or any((c == "-") != (i in _POSICOES_HIFEN_UUID) or (c != "-" and c not in _DIGITOS_HEX)
+                                for i, c in enumerate(prefixo)):
+        return None
+    digitos = prefixo.replace("-", "")
+    livres = 4 * (32 - len(digitos))
+    numero = int(digitos, 16) if digitos else 0
+    return numero << livres, (numero + 1) << livres
+
+class IndicesSecundarios:
+    """
+    Índices secundários das transações em memória (ver SECONDARY indexes). Guardam
+    só as chaves (chave_transacao), que já são as do dict do repositório: as
+    transações em si são buscadas nele por `obter`.
+    """
+
+    def __init__(self, obter):
+        self.obter = obter  # chave -> transação (o dict do repositório)
+        self.por_categoria = {}
+        self.centavos = array.array('q')  # em ordem crescente
+        self.chaves_por_valor = []        # chave de cada posição de `centavos`
+        self.uuids = []                   # chaves int (UUIDs canônicos), ordenadas
+        self.ids_texto = []               # chaves de texto, ordenadas
+
+    @staticmethod
+    def _campos(transacao):
+        """(chave, categoria, centavos) da transação, pelos atributos se for uma Transacao."""
+        if type(transacao) is Transacao:
+            return transacao.chave(), transacao.categoria, transacao.centavos
+        return chave_registro(transacao), transacao.get('categoria'), para_centavos(transacao['valor'])
+
+    @classmethod
+    def de_transacoes(cls, transacoes, obter):
+        """Monta os índices de uma vez (ordenando), em vez de inserir uma a uma."""
+        indices = cls(obter)
+        chaves, centavos = [], array.array('q')
+        for chave, categoria, valor in map(cls._campos, transacoes):
+            indices.por_categoria.setdefault(categoria, {})[chave] = None
+            chaves.append(chave)
+            centavos.append(valor)
+        ordem = sorted(range(len(chaves)), key=centavos.__getitem__)  # estável: empates na ordem de cadastro
+        indices.centavos = array.array('q', map(centavos.__getitem__, ordem))
+        indices.chaves_por_valor = list(map(chaves.__getitem__, ordem))
+        indices.uuids = sorted(chave for chave in chaves if type(chave) is int)
+        indices.ids_texto = sorted(chave for chave in chaves if type(chave) is not int)
+        return indices
+
+    def adicionar(self, transacao):
+        chave, categoria, centavos = self._campos(transacao)
+        self.por_categoria.setdefault(categoria, {})[chave] = None
+        posicao = bisect.bisect_right(self.centavos, centavos)
+        self.centavos.insert(posicao, centavos)
+        self.chaves_por_valor.insert(posicao, chave)
+        bisect.insort(self.uuids if type(chave) is int else self.ids_texto, chave)
+
+    def remover(self, transacao):
+        chave, categoria, centavos = self._campos(transacao)
+        chaves = self.por_categoria.get(categoria, {})
+        chaves.pop(chave, None)
+        if not chaves:
+            self.por_categoria.pop(categoria, None)
+        inicio = bisect.bisect_left(self.centavos, centavos)
+        fim = bisect.bisect_right(self.centavos, centavos, lo=inicio)
+        posicao = self.chaves_por_valor.index(chave, inicio, fim)
+        del self.centavos[posicao]
+        del self.chaves_por_valor[posicao]
+        ordenadas = self.uuids if type(chave) is int else self.ids_texto
+        del ordenadas[bisect.bisect_left(ordenadas, chave)]
+
+    def editar(self, antiga, nova):
+        self.remover(antiga)
+        self.adicionar(nova)
+
+    def __len__(self):
+        return len(self.centavos)
+
+    # --- candidatas de cada filtro ---
+
+    def da_categoria(self, categoria):
+        return self.por_categoria.get(categoria, {}).keys()
+
+    def faixa_valor(self, minimo=None, maximo=None):
+        """Chaves com minimo <= centavos <= maximo (None = sem limite), por busca binária."""
+        inicio = 0 if minimo is None else bisect.bisect_left(self.centavos, minimo)
+        fim = len(self.centavos) if maximo is None else bisect.bisect_right(self.centavos, maximo, lo=inicio)
+        return self.chaves_por_valor[inicio:fim] if fim > inicio else []
+
+    def com_prefixo(self, prefixo):
+        """Chaves dos UUIDs que começam com `prefixo` (sem diferenciar maiúsculas)."""
+        prefixo = prefixo.strip().lower()
+        chaves = []
+        faixa = faixa_prefixo_uuid(prefixo)
+        if faixa is not None:
+            chaves += self.uuids[bisect.bisect_left(self.uuids, faixa[0]):bisect.bisect_left(self.uuids, faixa[1])]
+        chaves += self.ids_texto[bisect.bisect_left(self.ids_texto, prefixo):
+                                 bisect.bisect_left(self.ids_texto, prefixo + "\U0010ffff")]
+        return chaves
+
+    # --- consulta ---
+
+    def filtrar(self, categoria=None, minimo=None, maximo=None, prefixo=None):
+        """
+        Transações que passam em todos os filtros dados (valores em centavos,
+        inclusive), ordenadas por valor. Começa pelo filtro com menos candidatas e
+        confere os outros só nelas; sem filtro nenhum, devolve todas.
+        """
+        candidatas = []
+        if categoria is not None:
+            candidatas.append(self.da_categoria(categoria))
+        if prefixo:
+            prefixo = prefixo.strip().lower()
+            candidatas.append(self.com_prefixo(prefixo))
+        por_valor = None
+        if minimo is not None or maximo is not None or not candidatas:
+            por_valor = self.faixa_valor(minimo, maximo)
+            candidatas.append(por_valor)
+        menor = min(candidatas, key=len)
+        transacoes = []
+        for chave in menor:
+            t = self.obter(chave)
+            _, c, centavos = self._campos(t)
+            if ((categoria is None or c == categoria) and (minimo is None or centavos >= minimo)
+                    and (maximo is None or centavos <= maximo)
+                    and (not prefixo or str(t['UUID']).lower().startswith(prefixo))):
+                transacoes.append(t)
+        if menor is not por_valor:  # a faixa de valor já vem ordenada
+            transacoes.sort(key=lambda t: self._campos(t)[2])
+        return transacoes
+# -----------------------
+# PARALLEL reports
+# -----------------------
+# O banco é dividido em fatias contíguas; cada processo do pool calcula os agregados
+# e o top-k parcial da sua fatia e o processo principal junta os resultados.
+# As chaves levam (número da fatia, linha na fatia), que ordena igual à linha global,
+# então os empates saem exatamente como no selecionar_top_k serial.
+
+_fatia_lista = None      # transações em memória (herdadas pelo pool)
+_fatia_arquivo = None    # ou o snapshot binário que cada processo lê por faixa de linhas
+_fatia_pendentes = {}    # journal do snapshot binário: UUID -> transação (None se excluída)
+
+def _iniciar_processo_relatorio(lista, filepath, pendentes):
+    global _fatia_lista, _fatia_arquivo, _fatia_pendentes
+    _fatia_lista, _fatia_arquivo, _fatia_pendentes = lista, filepath, pendentes
+
+def _transacoes_da_fatia(inicio, fim, vistos):
+    if _fatia_lista is not None:
+        yield from itertools.islice(_fatia_lista, inicio, fim)
+        return
+    for _, transacao in iterar_binario(_fatia_arquivo, inicio=inicio, fim=fim):
+        chave = transacao["UUID"]
+        if chave in _fatia_pendentes:
+            vistos.append(chave)
+            transacao = _fatia_pendentes[chave]
+            if transacao is None:
+                continue
+        yield transacao
+
+def _top_parcial(transacoes, numero, k, categoria, media=None):
+    """
+    Fase 1 (sem média): agregados + heaps de maiores e menores da fatia.
+    Fase 2 (com a média global): heap das mais próximas da média.
+    """
+    agregados = AgregadosPorCategoria(categorias=())
+    maiores, menores, proximas = [], [], []
+    # mesmas chaves (em centavos) do selecionar_top_k, para os empates saírem iguais aos do caminho serial
+    media_centavos = media * 100 if media is not None else None
+    for i, (t, c, valor) in enumerate(_categorias_e_centavos(transacoes)):
+        if media is None:
+            agregados.adicionar(t)
+        if categoria is not None and c != categoria:
+            continue
+        if k > 0:
+            if media is None:
+                _manter_top(maiores, k, (valor, -numero, -i), t)
+                _manter_top(menores, k, (-valor, -numero, -i), t)
+            else:
+                _manter_top(proximas, k, (-abs(valor - media_centavos), -numero, -i), t)
+    if media is None:
+        return agregados, maiores, menores
+    return proximas
+
+def _tarefa_relatorio(numero, inicio, fim, k, categoria, media=None):
+    vistos = []
+    resultado = _top_parcial(_transacoes_da_fatia(inicio, fim, vistos), numero, k, categoria, media)
+    return resultado if media is not None else (*resultado, vistos)
+
+def _juntar_top(parciais, k):
+    return [t for _, t in heapq.nlargest(k, itertools.chain.from_iterable(parciais), key=lambda item: item[0])]
+
+def relatorio_paralelo(fonte, k=5, categoria=None, processos=None, limite_serial=LIMITE_RELATORIO_SERIAL):
+    """
+    Total, quantidade, média e top-k (max/min/median) calculados em paralelo por fatias.
+    `fonte` é uma lista de transações ou o caminho do banco (json ou .bin).
+    O snapshot binário é lido direto por cada processo; o json é carregado antes.
+    O resultado é o mesmo do caminho serial (selecionar_top_k + AgregadosPorCategoria);
+    abaixo de `limite_serial` transações ele é usado diretamente.
+
+    Retorna {'max', 'min', 'median', 'media', 'quantidade', 'total', 'percentis'}, como o
+    relatorio_streaming; os percentis vêm dos sketches das fatias, mesclados.
+    """
+    lista, filepath, pendentes = None, None, {}
+    if isinstance(fonte, (str, os.PathLike)):
+        if formato_binario(str(fonte)):
+            filepath, pendentes = str(fonte), pendentes_journal(fonte)
+            quantidade = _cabecalho_binario(filepath)[0]
+        else:
+            lista = list(iterar_bd(fonte))
+            quantidade = len(lista)
+    else:
+        lista = fonte if isinstance(fonte, list) else list(fonte)
+        quantidade = len(lista)
+
+    if not processos:
+        processos = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else (os.cpu_count() or 1)
+    if quantidade < limite_serial or processos < 2:
+        transacoes = lista if lista is not None else list(iterar_bd(filepath))
+        agregados = AgregadosPorCategoria.de_transacoes(transacoes)
+        relatorio = selecionar_top_k(transacoes, k, categoria, media=agregados.media(categoria))
+        relatorio["total"] = agregados.total(categoria)
+        relatorio["percentis"] = agregados.distribuicao(categoria).resumo()
+        return relatorio
+
+    tamanho = -(-quantidade // processos)
+    fatias = [(numero, inicio, min(inicio + tamanho, quantidade))
+              for numero, inicio in enumerate(range(0, quantidade, tamanho))]
+    with ProcessPoolExecutor(processos, initializer=_iniciar_processo_relatorio, initargs=(lista, filepath, pendentes)) as pool:
+        fase1 = list(pool.map(_tarefa_relatorio, *zip(*fatias), itertools.repeat(k), itertools.repeat(categoria)))
+
+        # transações novas do journal entram como uma última fatia, depois do snapshot
+        vistos = set(itertools.chain.from_iterable(parcial[3] for parcial in fase1))
+        novas = [t for chave, t in pendentes.items() if t is not None and chave not in vistos]
+        fase1.append((*_top_parcial(novas, len(fatias), k, categoria), []))
+
+        agregados = AgregadosPorCategoria()
+        for parcial in fase1:
+            agregados.mesclar(parcial[0])
+        media = agregados.media(categoria)
+
+        fase2 = []
+        if media is not None:
+            fase2 = list(pool.map(_tarefa_relatorio, *zip(*fatias), itertools.repeat(k), itertools.repeat(categoria), itertools.repeat(media)))
+            fase2.append(_top_parcial(novas, len(fatias), k, categoria, media))
+
+    return {"max": _juntar_top([parcial[1] for parcial in fase1], k),
+            "min": _juntar_top([parcial[2] for parcial in fase1], k),
+            "median": _juntar_top(fase2, k),
+            "media": media,
+            "quantidade": agregados.quantidade(categoria),
+            "total": agregados.total(categoria),
+            "percentis": agregados.distribuicao(categoria).resumo()}
+
+# -----------------------
+# REPORT cache
+# -----------------------
+# Relatórios já prontos (os dados e o texto formatado) ficam guardados por tipo,
+# parâmetros e versão dos dados (ver versao_dados nos repositórios). Toda escrita muda
+# a versão, então um relatório antigo nunca é servido; as entradas de versões
+# anteriores são descartadas quando a versão muda e, dentro de uma versão, o cache
+# guarda os TAMANHO_CACHE_RELATORIOS usados mais recentemente (LRU).
+# Com TRANSACOES_CACHE_DISCO=1 (ou --cache-disco no CLI) o cache também é gravado ao
+# lado do banco (<banco>.cache.json) e vale entre execuções do programa.
+TAMANHO_CACHE_RELATORIOS = 128
+
+def caminho_cache(filepath):
+    return _base_arquivos(filepath) + '.cache.json'
+
+def cache_em_disco_ativo():
+    return os.environ.get("TRANSACOES_CACHE_DISCO", "") not in ("", "0")
+
+class CacheRelatorios:
+    """Cache LRU de relatórios de um banco; os valores precisam ser serializáveis em json."""
+
+    def __init__(self, tamanho=TAMANHO_CACHE_RELATORIOS, caminho=None):
+        self.tamanho = tamanho
+        self.caminho = None
+        self.versao = None
+        self.acertos = self.faltas = 0
+        self._entradas = collections.OrderedDict()  # chave em texto -> valor, do menos ao mais usado
+        if caminho:
+            self.persistir_em(caminho)
+
+    @staticmethod
+    def _chave(tipo, parametros):
+        return json.dumps([tipo, parametros], ensure_ascii=False, sort_keys=True)
+
+    def persistir_em(self, caminho):
+        """Passa a gravar o cache em `caminho`, aproveitando o que já estiver lá."""
+        self.caminho = caminho
+        try:
+            with open(caminho, "r", encoding="utf-8") as file:
+                salvo = json.load(file)
+            if salvo.get("versao") is not None and not self._entradas:
+                self.versao = salvo["versao"]
+                self._entradas.update(salvo["entradas"][-self.tamanho:])
+        except (FileNotFoundError, json.JSONDecodeError, AttributeError, KeyError, TypeError, ValueError):
+            pass  # sem cache salvo (ou arquivo corrompido): começa vazio
+
+    def _gravar(self):
+        temporario = f"{self.caminho}.{os.getpid()}.tmp"
+        with open(temporario, "w", encoding="utf-8") as file:
+            json.dump({"versao": self.versao, "entradas": list(self._entradas.items())}, file, ensure_ascii=False, default=_json_padrao)
+        os.replace(temporario, self.caminho)
+
+    def obter(self, tipo, parametros, versao, calcular):
+        """
+        O relatório (tipo, parametros) na versão `versao` dos dados: do cache se já foi
+        calculado nessa versão, senão chama `calcular()` e guarda o resultado.
+        """
+        if versao != self.versao:
+            self._entradas.clear()  # os dados mudaram: nada do que está aqui vale mais
+            self.versao = versao
+        chave = self._chave(tipo, parametros)
+        if chave in self._entradas:
+            self._entradas.move_to_end(chave)
+            self.acertos += 1
+            return self._entradas[chave]
+        self.faltas += 1
+        valor = self._entradas[chave] = calcular()
+        while len(self._entradas) > self.tamanho:
+            self._entradas.popitem(last=False)
+        if self.caminho:
+            try:
+                self._gravar()
+            except OSError:
+                pass  # o cache em disco é só uma otimização
+        return valor
+
+    def limpar(self):
+        self._entradas.clear()
+        self.versao = None
+        if self.caminho and os.path.exists(self.caminho):
+            os.remove(self.caminho)
+
+    def __len__(self):
+        return len(self._entradas)
+
+def em_cache(repo, tipo, parametros, calcular):
+    """Resultado de `calcular()` pelo cache de relatórios do repositório (sem cache se a versão é desconhecida)."""
+    versao = repo.versao_dados()  # lida antes de calcular: um resultado nunca fica com uma versão mais nova que a dele
+    if versao is None:
+        return calcular()
+    return repo.cache_relatorios().obter(tipo, parametros, versao, calcular)
+
+# -----------------------
+# WARM START
+# -----------------------
+# O menu aparece na hora: criar/ler o banco e montar agregados, tabela colunar e índices
+# roda numa thread em background (PreCarga), uma etapa de cada vez, na ordem em que as
+# opções costumam precisar delas. Cada opção espera só pela etapa que usa (ETAPAS_MENU e
+# ETAPAS_RELATORIO), com uma linha de progresso enquanto espera; a consulta por ID nem
+# espera a leitura, porque o índice em disco responde sem carregar o banco.
+# Quem garante a correção é o repositório: pedir algo que a thread ainda está montando
+# espera pela trava de carga dele (_lock_carga) em vez de montar de novo.
+# Os tempos de cada etapa (e até o menu aparecer) vão para o diagnóstico (opção 7).
+ETAPAS_CARGA = {  # etapa -> o que a linha de progresso mostra, na ordem em que rodam
+    "banco": "preparando o banco",
+    "transacoes": "lendo as transações",
+    "agregados": "somando os agregados",
+    "tabela": "montando a tabela colunar",
+    "indices": "montando os índices",
+}
+# opção do menu (e do menu de relatórios) -> etapa que ela precisa pronta
+ETAPAS_MENU = {'1': "banco", '2': "transacoes", '3': "transacoes", '4': "transacoes", '5': "banco", '6': "agregados"}
+ETAPAS_RELATORIO = {'1': "agregados", '2': "tabela", '3': "tabela", '4': "agregados", '5': "tabela",
+                    '6': "agregados", '7': "indices", '8': "agregados", '9': "agregados"}
+INTERVALO_PROGRESSO = 0.1  # segundos entre as atualizações da linha de progresso
+
+def preparar_bd_padrao():
+    """Cria o banco da conta padrão se ele não existe: o json e, no formato escolhido, o .bin ou o .db."""
+    if not os.path.exists('./data/transactions.json'):
+        criar_bd_datado()
+    filepath = caminho_bd()
+    if not os.path.exists(filepath):
+        converter_bd('./data/transactions.json', filepath)
+
+class PreCarga:
+    """
+    Prepara em background o repositório do banco `filepath`: roda `preparar` (que cria
+    o banco se ele não existe), lê as transações e monta as estruturas derivadas.
+    Um erro interrompe a pré-carga; a opção que precisar da etapa tenta de novo e o mostra.
+    """
+
+    def __init__(self, filepath, preparar=None):
+        self.filepath = filepath
+        self.preparar = preparar
+        # sqlite não carrega nada em memória, e a conexão fica presa à thread que a abriu: é aberta em repositorio()
+        self.repo = None if formato_sqlite(filepath) else RepositorioTransacoes(filepath)
+        self.etapa = None
+        self.erro = None
+        self.prontas = {}  # etapa -> (segundos desde o início do programa, duração da etapa)
+        self._eventos = {etapa: threading.Event() for etapa in ETAPAS_CARGA}
+        self._lidos = 0
+        self._tamanho = 0
+        self._inicio = None
+
+    def iniciar(self):
+        self.etapa = next(iter(ETAPAS_CARGA))
+        self._inicio = time.perf_counter()
+        threading.Thread(target=self._executar, name="pre-carga", daemon=True).start()
+        return self
+
+    def _registrar(self, etapa, inicio):
+        agora = time.perf_counter()
+        self.prontas[etapa] = (agora - INICIO_PROGRAMA, agora - inicio)
+        diagnostico.registrar_inicializacao(etapa, *self.prontas[etapa])
+
+    def _progresso(self, offset):
+        self._lidos = offset
+
+    def _executar(self):
+        etapas = [("banco", self.preparar)]
+        if self.repo is not None:
+            etapas += [("transacoes", self.repo.transacoes), ("agregados", self.repo.agregados),
+                       ("tabela", self.repo.tabela), ("indices", self.repo.indices)]
+            self.repo.progresso_carga = self._progresso
+        try:
+            for etapa, funcao in etapas:
+                self.etapa, inicio = etapa, time.perf_counter()
+                if funcao is not None:
+                    funcao()
+                if etapa == "banco":
+                    self._tamanho = os.path.getsize(self.filepath)
+                self._registrar(etapa, inicio)
+                self._eventos[etapa].set()
+        except Exception as e:
+            self.erro = e
+        finally:
+            if self.repo is not None:
+                self.repo.progresso_carga = None
+            self.etapa = None
+            for evento in self._eventos.values():  # sem erro, as etapas que não se aplicam (ex.: sqlite) ficam prontas
+                evento.set()
+
+    def pronta(self, etapa):
+        return self._eventos[etapa].is_set()
+
+    def esperar(self, etapa):
+        """Espera a etapa ficar pronta, reescrevendo a linha de progresso enquanto isso."""
+        evento = self._eventos[etapa]
+        mostrou = False
+        while not evento.wait(INTERVALO_PROGRESSO):
+            print(f"\r{self.status():<79}", end="", flush=True)
+            mostrou = True
+        if mostrou:
+            print(f"\r{self.status():<79}")
 
-def criar_bd(num_transacoes:int = 10000, proporcao_categorias:list = settings.categorias_proporcao, path2save="./data", filename='transactions.json'):
-    salvar_json(criar_transacoes(num_transacoes=num_transacoes,  proporcao_categorias=proporcao_categorias),
-                path2save, filename
-    )
+    def repositorio(self):
+        """O repositório da sessão, assim que o banco existe (levanta o erro se não foi possível criá-lo)."""
+        self.esperar("banco")
+        if "banco" not in self.prontas:
+            raise self.erro
+        if self.repo is None:
+            self.repo = abrir_repositorio(self.filepath)
+        return self.repo
 
-def load_bd(filepath='./data/transactions.json'):
-    with open(filepath, "r") as file:
-        bd = json.load(file)
-    return bd
+    def menu_exibido(self):
+        if "menu" not in self.prontas:
+            self._registrar("menu", INICIO_PROGRAMA)
 
-def tela_inicial():
-    print("Bem-vindo <teu nome inteiro aqui>!")
-    print('conta: 0000001-0')
-    print("\nEste programa permite gerenciar transações de sua conta pessoal.")
-    print("\nEscolha uma das opções abaixo:")
-    print("1. Visualizar relatórios")
-    print("2. Cadastrar transações")
-    print("3. Editar transações")
-    print("4. Excluir transações")
-    print("5. Consultar transação por ID")
-    print("-" * 10)
-    print("0. Sair")
-    print('\n')
+    def status(self):
+        """Linha de progresso: a etapa em andamento, quanto do arquivo já foi lido e há quanto tempo."""
+        if self.erro is not None:
+            return f"⚠️ Pré-carga interrompida: {self.erro}"
+        etapa = self.etapa
+        if etapa is None:
+            return f"✅ Banco pronto ({max(fim for fim, _ in self.prontas.values()):.2f}s após o início)"
+        texto = f"⏳ Carregando em background ({list(ETAPAS_CARGA).index(etapa) + 1}/{len(ETAPAS_CARGA)}): {ETAPAS_CARGA[etapa]}"
+        if etapa == "transacoes" and self._tamanho:
+            texto += f" {min(self._lidos / self._tamanho, 1):.0%}"
+        return texto + f" ({time.perf_counter() - self._inicio:.1f}s)"
 
 # -----------------------
 # PROGRAM functions
@@ -83,12 +3095,12 @@ def tela_inicial():
 # pode editar como quiser as funções abaixo! Somente não altere os nomes das funções.
 # para alterar as funções abaixo, basta apagar o `pass` e preencher com as instruções.
 
-def run():
+def run(conta=CONTA_PADRAO):
     """
     Esta é a função principal que vai rodar o programa
     """
     # exibe a tela inicial
-    tela_inicial()
+    tela_inicial(conta)
 
 def visualizar_relatorios():
     """
@@ -100,6 +3112,11 @@ def visualizar_relatorios():
     print("2. Todas as 5 últimas transações (m5)")
     print("3. Visualizar as 5 últimas transações")
     print("4. Visualizar média de gastos gerais")
+    print("5. Transações por período")
+    print("6. Totais por mês")
+    print("7. Filtrar transações (categoria, faixa de valor, início do UUID)")
+    print("8. Mediana e percentis (p90/p99)")
+    print("9. Histograma dos valores")
     print("-" * 10)
     print("0. Retornar ao menu anterior")
     print('\n')
@@ -123,11 +3140,155 @@ def salvar_relatorio(conteudo_relatorio, nome_arquivo):
 
 
 def calcular_total_transacoes(transacoes, categoria=None):
-           total = sum(float(t['valor']) for t in transacoes if categoria is None or t.get('categoria') == categoria)
+           if isinstance(transacoes, (TabelaColunar, AgregadosPorCategoria, armazenamento_sqlite.ConsultasSQLite)):
+               return transacoes.total(categoria)  # soma vetorizada / total já mantido
+           # soma exata em centavos, sem o erro de arredondamento que o sum() de floats acumula
+           if categoria is None and isinstance(transacoes, (list, tuple)):
+               try:
+                   return sum(map(operator.attrgetter('centavos'), transacoes)) / 100  # lista de Transacao: só somar inteiros
+               except AttributeError:
+                   return somar_centavos(map(operator.itemgetter('valor'), transacoes), len(transacoes)) / 100
+           total = sum(centavos for _, c, centavos in _categorias_e_centavos(transacoes) if categoria is None or c == categoria) / 100
            return total
 
 
-def mostrar_m5_transacoes():
+def _categorias_e_centavos(transacoes):
+    """(transação, categoria, centavos) de cada uma: pelos atributos se for Transacao, pelas chaves se for dict."""
+    for t in transacoes:
+        if type(t) is Transacao:
+            yield t, t.categoria, t.centavos
+        else:
+            yield t, t.get('categoria'), para_centavos(t['valor'])
+
+
+def _manter_top(heap, k, chave, transacao):
+    """Mantém no heap só as k maiores chaves vistas até agora."""
+    if len(heap) < k:
+        heapq.heappush(heap, (chave, transacao))
+    elif chave > heap[0][0]:
+        heapq.heapreplace(heap, (chave, transacao))
+
+def selecionar_top_k(transacoes, k=5, categoria=None, media=None):
+    """
+    Seleciona numa única passada as k transações de maior valor, de menor valor e
+    mais próximas da média, com heaps de tamanho k: O(N log k) em vez de três sorted().
+    Empates saem na ordem de cadastro, igual ao sorted().
+
+    A distância à média depende da média: se ela não for informada, é calculada
+    antes com uma soma simples (por isso `transacoes` é percorrido duas vezes nesse caso,
+    e um iterador vira lista; quem lê em streaming deve passar a média).
+    Com uma TabelaColunar a seleção é feita por partição, vetorizada; com as
+    ConsultasSQLite, por ORDER BY ... LIMIT no banco.
+
+    Retorna {'max': [...], 'min': [...], 'median': [...], 'media': média, 'quantidade': n}.
+    """
+    if isinstance(transacoes, (TabelaColunar, armazenamento_sqlite.ConsultasSQLite)):
+        return {"max": transacoes.top_k(k, 'max', categoria),
+                "min": transacoes.top_k(k, 'min', categoria),
+                "median": transacoes.top_k(k, 'median', categoria),
+                "media": transacoes.media(categoria),
+                "quantidade": transacoes.contar(categoria)}
+
+    if media is None:
+        if iter(transacoes) is transacoes:
+            transacoes = list(transacoes)  # um iterador só pode ser percorrido uma vez
+        soma = quantidade = 0  # soma em centavos
+        for _, c, centavos in _categorias_e_centavos(transacoes):
+            if categoria is None or c == categoria:
+                soma += centavos
+                quantidade += 1
+        media = soma / quantidade / 100 if quantidade else None
+
+    # as chaves (em centavos) levam -i para desempatar pela ordem de cadastro (a mais antiga vence)
+    maiores, menores, proximas = [], [], []
+    quantidade = 0
+    media_centavos = media * 100 if media is not None else None
+    for i, (t, c, valor) in enumerate(_categorias_e_centavos(transacoes)):
+        if categoria is not None and c != categoria:
+            continue
+        quantidade += 1
+        if k > 0:
+            _manter_top(maiores, k, (valor, -i), t)
+            _manter_top(menores, k, (-valor, -i), t)
+            _manter_top(proximas, k, (-abs(valor - media_centavos), -i), t)
+
+    return {"max": [t for _, t in sorted(maiores, reverse=True)],
+            "min": [t for _, t in sorted(menores, reverse=True)],
+            "median": [t for _, t in sorted(proximas, reverse=True)],
+            "media": media,
+            "quantidade": quantidade}
+
+def relatorio_streaming(filepath='./data/transactions.json', k=5, categoria=None):
+    """
+    Total, média, percentis e top-k lidos direto do arquivo com `iterar_bd`, em memória
+    constante (para bancos maiores que a RAM). São duas passadas no arquivo: uma para os
+    agregados (com os sketches de quantis) e outra para a seleção, que precisa da média.
+    """
+    agregados = AgregadosPorCategoria.de_transacoes(iterar_bd(filepath))
+    relatorio = selecionar_top_k(iterar_bd(filepath), k, categoria, media=agregados.media(categoria))
+    relatorio["total"] = agregados.total(categoria)
+    relatorio["percentis"] = agregados.distribuicao(categoria).resumo()
+    return relatorio
+
+def calcular_m5(repo, k=5, categoria=None):
+    """
+    Seleção das três listas do m5 (uma única passada): vetorizada se houver a
+    tabela colunar, em paralelo para bancos grandes sem numpy, ou com heaps.
+    """
+    tabela = repo.tabela()
+    if tabela is not None:
+        return selecionar_top_k(tabela, k, categoria)
+    transacoes = repo.transacoes()
+    if len(transacoes) >= LIMITE_RELATORIO_SERIAL:
+        return relatorio_paralelo(list(transacoes), k, categoria)  # sem numpy e banco grande: divide entre os núcleos
+    # com a média dos agregados a seleção faz uma passada só
+    return selecionar_top_k(transacoes, k, categoria, media=repo.agregados().media(categoria))
+
+def formatar_m5(top, k=5, categoria=None):
+    """Texto do relatório m5 (o mesmo mostrado no menu) a partir do resultado do calcular_m5."""
+    media = top["media"]
+    sufixo = f" da categoria '{categoria}'" if categoria else ""
+
+    relatorio = ""
+
+    # Top k MAIORES
+    relatorio += f"\n🔺 Top {k} transações{sufixo} com MAIOR valor:\n"
+    relatorio += "-" * 50 + "\n"
+    for t in top["max"]:
+        relatorio += f"{t['UUID'][:8]}...\t{t['categoria']:<10}\tR$ {formatar_valor(t['valor'])}\n"
+
+    # Top k MENORES
+    relatorio += f"\n🔻 Top {k} transações{sufixo} com MENOR valor:\n"
+    relatorio += "-" * 50 + "\n"
+    for t in top["min"]:
+        relatorio += f"{t['UUID'][:8]}...\t{t['categoria']:<10}\tR$ {formatar_valor(t['valor'])}\n"
+
+    # Top k mais próximas da MÉDIA
+    relatorio += f"\n📊 Top {k} transações{sufixo} mais próximas da MÉDIA (R$ {formatar_valor(media)}):\n"
+    relatorio += "-" * 50 + "\n"
+    for t in top["median"]:
+        relatorio += f"{t['UUID'][:8]}...\t{t['categoria']:<10}\tR$ {formatar_valor(t['valor'])}\n"
+    return relatorio
+
+def texto_m5(repo, k=5, categoria=None):
+    """Texto pronto do m5 (None se a categoria não tem transações), do cache enquanto os dados não mudam."""
+    def calcular():
+        top = dados_relatorio(repo, "m5", categoria, k)
+        return formatar_m5(top, k, categoria) if top["quantidade"] else None
+    return em_cache(repo, "texto_m5", {"categoria": categoria, "k": k}, calcular)
+
+def texto_total(repo, categoria=None):
+    """Texto do relatório de total (opção 1 do menu), do cache enquanto os dados não mudam."""
+    def calcular():
+        dados = dados_relatorio(repo, "total", categoria)
+        if categoria is None:
+            return (f"\n💰 Total de todas as transações: R$ {formatar_valor(dados['total'])}" + "\n"
+                    + f"📦 Quantidade de transações: {dados['quantidade']}")
+        return (f"\n📂 Total da categoria '{categoria}': R$ {formatar_valor(dados['total'])}" + "\n"
+                + f"📦 Quantidade de transações na categoria '{categoria}': {dados['quantidade']}")
+    return em_cache(repo, "texto_total", {"categoria": categoria}, calcular)
+
+def mostrar_m5_transacoes(repo, k=5, categoria=None):
     """
     Mostra as m5 transações realizadas, sendo m parâmetro que deve ser adicionada à função.
     \nm : 'max','min','median', sendo
@@ -136,41 +3297,19 @@ def mostrar_m5_transacoes():
     \n\t'median' mostra os top 5 valores próximos a média
 
     Utilize essa mesma função para o caso `por categoria`
+    \nk : quantidade de transações em cada lista (padrão 5)
+    \ncategoria : se informada, considera só as transações dessa categoria
     """
     try:
-        transacoes = load_bd()
+        relatorio = texto_m5(repo, k, categoria)  # do cache se nada mudou desde a última vez
     except FileNotFoundError:
         print("❌ Nenhum banco de dados encontrado.")
         return
 
-    if not transacoes:
-        print("❌ Nenhuma transação cadastrada.")
+    if relatorio is None:
+        print(f"❌ Nenhuma transação na categoria '{categoria}'." if categoria else "❌ Nenhuma transação cadastrada.")
         return
 
-    relatorio = ""
-
-    # Top 5 MAIORES
-    top_max = sorted(transacoes, key=lambda x: x['valor'], reverse=True)[:5]
-    relatorio += "\n🔺 Top 5 transações com MAIOR valor:\n"
-    relatorio += "-" * 50 + "\n"
-    for t in top_max:
-        relatorio += f"{t['UUID'][:8]}...\t{t['categoria']:<10}\tR$ {t['valor']:,.2f}\n".replace('.', ',')
-
-    # Top 5 MENORES
-    top_min = sorted(transacoes, key=lambda x: x['valor'])[:5]
-    relatorio += "\n🔻 Top 5 transações com MENOR valor:\n"
-    relatorio += "-" * 50 + "\n"
-    for t in top_min:
-        relatorio += f"{t['UUID'][:8]}...\t{t['categoria']:<10}\tR$ {t['valor']:,.2f}\n".replace('.', ',')
-
-    # Top 5 mais próximas da MÉDIA
-    media = sum(t['valor'] for t in transacoes) / len(transacoes)
-    top_median = sorted(transacoes, key=lambda x: abs(x['valor'] - media))[:5]
-    relatorio += f"\n📊 Top 5 transações mais próximas da MÉDIA (R$ {media:,.2f}):\n".replace('.', ',')
-    relatorio += "-" * 50 + "\n"
-    for t in top_median:
-        relatorio += f"{t['UUID'][:8]}...\t{t['categoria']:<10}\tR$ {t['valor']:,.2f}\n".replace('.', ',')
-
     # Exibe tudo na tela
     print(relatorio)
 
@@ -178,9 +3317,9 @@ def mostrar_m5_transacoes():
     resposta = input("\nDeseja salvar este relatório em um arquivo .txt? (S/N): ").strip().lower()
     if resposta in ['s', 'sim']:
         try:
-            with open("relatorio_top5.txt", "w", encoding="utf-8") as f:
+            with open(f"relatorio_top{k}.txt", "w", encoding="utf-8") as f:
                 f.write(relatorio)
-            print("✅ Relatório salvo com sucesso como 'relatorio_top5.txt'")
+            print(f"✅ Relatório salvo com sucesso como 'relatorio_top{k}.txt'")
         except:
             print("❌ Erro ao salvar o relatório.")
     else:
@@ -188,7 +3327,7 @@ def mostrar_m5_transacoes():
 
 
 
-def calcular_media():
+def calcular_media(repo, categoria=None):
     """
     Calcula a média dos valores das transações.
     Utilize essa mesma função para o caso `por categoria`
@@ -196,50 +3335,180 @@ def calcular_media():
     print("\n--- Cálculo da Média dos Valores ---")
 
     try:
-        transacoes = load_bd()
+        vazio = not dados_relatorio(repo, "media")["quantidade"]
     except FileNotFoundError:
         print("❌ Nenhuma transação encontrada. O banco de dados está vazio.")
         return
 
-    if not transacoes:
+    if vazio:
         print("❌ Nenhuma transação encontrada.")
         return
 
-    soma = 0
-    for t in transacoes:
-        soma += t['valor']
+    # Média direto dos agregados por categoria (ou do cache de relatórios), sem percorrer as transações
+    media = dados_relatorio(repo, "media", categoria)["media"]
+    if media is None:
+        print(f"❌ Nenhuma transação encontrada na categoria '{categoria}'.")
+        return
+
+    if categoria:
+        print(f"✅ A média dos valores da categoria '{categoria}' é: R$ {formatar_valor(media)}")
+    else:
+        print(f"✅ A média dos valores é: R$ {formatar_valor(media)}")
+
+
+LIMITE_LISTAGEM_PERIODO = 20  # transações listadas na tela; o total e a quantidade contam o período inteiro
+
+def mostrar_transacoes_periodo(repo):
+    """Lista as transações criadas entre duas datas (as mais recentes primeiro), com total e quantidade."""
+    print("\n--- Transações por Período ---")
+    try:
+        inicio = input("Data inicial (dd/mm/aaaa, Enter para desde o começo): ").strip()
+        fim = input("Data final (dd/mm/aaaa, inclusive; Enter para até hoje): ").strip()
+        inicio = ler_data(inicio) if inicio else None
+        fim = ler_data(fim, fim_do_dia=True) if fim else None
+    except ValueError as e:
+        print(f"❌ {e}")
+        return
+
+    periodo = repo.entre(inicio, fim)
+    if not periodo:
+        print("❌ Nenhuma transação encontrada no período.")
+        return
+
+    print(f"\n🗓️ {len(periodo)} transação(ões) no período; mostrando as {min(len(periodo), LIMITE_LISTAGEM_PERIODO)} mais recentes:")
+    for i, transacao in enumerate(reversed(periodo[-LIMITE_LISTAGEM_PERIODO:]), start=1):
+        print(f"{i}. {transacao.get('criado_em', 'sem data')} | {transacao.get('categoria')} | "
+              + f"R$ {formatar_valor(transacao['valor'])}")
+    print(f"\n💰 Total do período: R$ {formatar_valor(calcular_total_transacoes(periodo))}")
+
+
+def mostrar_totais_por_mes(repo, categoria=None):
+    """Total e quantidade por mês de criação (mantidos nos agregados, sem percorrer as transações)."""
+    print("\n--- Totais por Mês ---")
+    meses = repo.totais_por_mes(categoria)
+    if not meses:
+        print("❌ Nenhuma transação encontrada.")
+        return
+    for mes in meses:
+        rotulo = f"{mes['mes'][5:]}/{mes['mes'][:4]}" if mes["mes"] else "sem data"
+        print(f"📅 {rotulo:>8}: " + f"R$ {formatar_valor(mes['total'])}" + f" em {mes['quantidade']} transação(ões)")
+
+
+LARGURA_HISTOGRAMA = 40  # caracteres da maior barra do histograma
+
+def formatar_percentis(dados):
+    """Texto do relatório de percentis (menu e CLI) a partir do dados_relatorio(..., 'percentis')."""
+    sufixo = f" da categoria '{dados['categoria']}'" if dados["categoria"] else ""
+    texto = f"\n📐 Distribuição dos valores{sufixo} ({dados['quantidade']} transação(ões)"
+    texto += ", exata):\n" if dados["exato"] else f", aproximada: erro de até {ERRO_RELATIVO_QUANTIS:.1%}):\n"
+    for nome in ["min", "mediana"] + [f"p{p}" for p in PERCENTIS_RELATORIO if p != 50] + ["max"]:
+        texto += f"{nome:>8}: R$ {formatar_valor(dados[nome])}\n"
+    return texto.rstrip("\n")
+
+def formatar_histograma(dados):
+    """Texto do histograma (menu e CLI): uma barra por faixa de valor, proporcional à quantidade."""
+    sufixo = f" da categoria '{dados['categoria']}'" if dados["categoria"] else ""
+    texto = f"\n📊 Histograma dos valores{sufixo} ({dados['quantidade']} transação(ões)"
+    texto += "):\n" if dados["exato"] else ", faixas aproximadas):\n"
+    maior = max(faixa["quantidade"] for faixa in dados["faixas"]) or 1
+    for faixa in dados["faixas"]:
+        barra = "█" * round(LARGURA_HISTOGRAMA * faixa["quantidade"] / maior)
+        texto += (f"R$ {formatar_valor(faixa['de']):>12} a {formatar_valor(faixa['ate']):>12} | "
+                  + f"{barra} {faixa['quantidade']}\n")
+    return texto.rstrip("\n")
+
+def mostrar_percentis(repo, categoria=None):
+    """Mediana, p90 e p99 dos valores (do sketch mantido nos agregados, sem ordenar as transações)."""
+    try:
+        dados = dados_relatorio(repo, "percentis", categoria)
+    except FileNotFoundError:
+        print("❌ Nenhuma transação encontrada.")
+        return
+    if not dados["quantidade"]:
+        print(f"❌ Nenhuma transação na categoria '{categoria}'." if categoria else "❌ Nenhuma transação cadastrada.")
+        return
+    print(formatar_percentis(dados))
+
+def mostrar_histograma(repo, categoria=None, baldes=BALDES_HISTOGRAMA):
+    """Histograma dos valores em `baldes` faixas de mesma largura."""
+    try:
+        dados = dados_relatorio(repo, "histograma", categoria, baldes=baldes)
+    except FileNotFoundError:
+        print("❌ Nenhuma transação encontrada.")
+        return
+    if not dados["quantidade"]:
+        print(f"❌ Nenhuma transação na categoria '{categoria}'." if categoria else "❌ Nenhuma transação cadastrada.")
+        return
+    print(formatar_histograma(dados))
+
+
+def mostrar_transacoes_filtradas(repo):
+    """Lista as transações que passam nos filtros (pelos índices secundários), com total e quantidade."""
+    print("\n--- Filtrar Transações ---")
+    categoria = input("Categoria (Enter para todas): ").strip()
+    minimo = input("Valor mínimo (ex: 100,00; Enter para sem mínimo): ").strip()
+    maximo = input("Valor máximo (ex: 500,00; Enter para sem máximo): ").strip()
+    prefixo = input("Início do UUID (ex: os 8 caracteres do m5; Enter para qualquer): ").strip()
+    try:
+        dados = dados_filtro(repo, categoria, minimo, maximo, prefixo, LIMITE_LISTAGEM_FILTRO)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return
+    except FileNotFoundError:
+        print("❌ Nenhuma transação encontrada.")
+        return
 
-    media = soma / len(transacoes)
+    if not dados["quantidade"]:
+        print("❌ Nenhuma transação encontrada com esses filtros.")
+        return
 
-    print(f"✅ A média dos valores é: R$ {media:,.2f}".replace('.', ','))
+    print(f"\n🔎 {dados['quantidade']} transação(ões) encontrada(s); mostrando {len(dados['transacoes'])}, da menor para a maior:")
+    for i, transacao in enumerate(dados["transacoes"], start=1):
+        print(f"{i}. {transacao['UUID']} | {transacao.get('categoria')} | R$ {formatar_valor(transacao['valor'])}")
+    print(f"\n💰 Total filtrado: R$ {formatar_valor(dados['total'])}")
 
 
-def consultar_transacao_por_ID():
+def consultar_transacao_por_ID(repo):
     """
     Consulta uma transação específica usando apenas o UUID como identificador.
+    Aceita também o começo do UUID (como o m5 mostra), pelo índice de UUIDs.
     """
     print("\n--- Consultar Transação por UUID ---")
     uuid_procurado = input("Digite o UUID da transação: ").strip().lower()
 
     try:
-        transacoes = load_bd()
+        transacao = repo.buscar(uuid_procurado)  # busca direta pelo UUID, sem percorrer a lista
     except FileNotFoundError:
         print("❌ Nenhuma transação encontrada.")
         return
 
-    for transacao in transacoes:
-        uuid_salvo = str(transacao.get("UUID", "")).strip().lower()
-        if uuid_salvo == uuid_procurado:
-            print("\n✅ Transação encontrada:")
-            print(f"UUID: {transacao['UUID']}")
-            print(f"Categoria: {transacao.get('categoria', 'N/A')}")
-            print(f"Valor: R$ {transacao['valor']:,.2f}".replace(".", ","))
-            return
+    if transacao:
+        print("\n✅ Transação encontrada:")
+        print(f"UUID: {transacao['UUID']}")
+        print(f"Categoria: {transacao.get('categoria', 'N/A')}")
+        print(f"Valor: R$ {formatar_valor(transacao['valor'])}")
+        return
+
+    # só um começo de UUID (o m5 mostra 8 caracteres) vai para o índice de prefixos; o UUID inteiro já foi buscado
+    parecidas = repo.filtrar(prefixo=uuid_procurado) if 0 < len(uuid_procurado) < 36 else []
+    if len(parecidas) == 1:
+        transacao = parecidas[0]
+        print("\n✅ Transação encontrada pelo início do UUID:")
+        print(f"UUID: {transacao['UUID']}")
+        print(f"Categoria: {transacao.get('categoria', 'N/A')}")
+        print(f"Valor: R$ {formatar_valor(transacao['valor'])}")
+        return
+    if parecidas:
+        print(f"\n🔎 {len(parecidas)} transações começam com '{uuid_procurado}'; mostrando "
+              + f"{min(len(parecidas), LIMITE_LISTAGEM_FILTRO)} (digite mais caracteres para escolher uma):")
+        for transacao in parecidas[:LIMITE_LISTAGEM_FILTRO]:
+            print(f"- {transacao['UUID']} | {transacao.get('categoria', 'N/A')} | R$ {formatar_valor(transacao['valor'])}")
+        return
 
     print("❌ Nenhuma transação encontrada com esse UUID.")
 
 
-def cadastrar_transacao():
+def cadastrar_transacao(repo):
     print("\n--- Cadastro de Nova Transação ---")
 
     print("\n--- Cadastro de Nova Transação ---")
@@ -251,7 +3520,7 @@ def cadastrar_transacao():
     while True:
         valor_texto = input("Digite o valor da transação (ex: 250,00): ")
         try:
-            valor = float(valor_texto.replace(",", "."))
+            centavos = ler_valor(valor_texto)  # aceita '1.234,56': conta em centavos, sem erro de float
             break
         except ValueError:
             print("❌ Valor inválido! Digite apenas números com vírgula para os centavos (ex: 99,90).")
@@ -260,20 +3529,12 @@ def cadastrar_transacao():
     transacao = {
         "UUID": str(uuid.uuid4()),  # Gera um ID único automático
         "categoria": categoria,
-        "valor": round(valor, 2)
+        "valor": centavos / 100,
+        "criado_em": agora_iso()  # Data de criação, usada nas consultas por período
     }
 
-    # Tenta carregar transações existentes
-    try:
-        transacoes = load_bd()
-    except FileNotFoundError:
-        transacoes = []
-
-    # Adiciona nova transação à lista
-    transacoes.append(transacao)
-
-    # Salva a lista atualizada
-    salvar_json(transacoes, "./data", "transactions.json")
+    # Adiciona a nova transação ao repositório, que grava no journal (ou reescreve o json)
+    repo.adicionar(transacao)
 
     print("\n✅ Transação cadastrada com sucesso!")
     print(transacao)
@@ -315,7 +3576,7 @@ def cadastrar_transacao():
 """
 
 
-def exibir_menu(transacoes):
+def exibir_menu(repo):
     while True:
         print("\n--- MENU DE TRANSAÇÕES ---")
         print("1. Ver total geral de transações")
@@ -323,12 +3584,12 @@ def exibir_menu(transacoes):
         print("3. Sair")
         opcao = input("Escolha uma opção (1-3): ")
         if opcao == '1':
-            total = calcular_total_transacoes(transacoes)
-            print(f"💰 Total geral das transações: R$ {total:.2f}")
+            total = calcular_total_transacoes(repo.agregados())
+            print(f"💰 Total geral das transações: R$ {formatar_valor(total)}")
         elif opcao == '2':
             categoria = input("Digite o nome da categoria: ")
-            total = calcular_total_transacoes(transacoes, categoria)
-            print(f"📂 Total da categoria '{categoria}': R$ {total:.2f}")
+            total = calcular_total_transacoes(repo.agregados(), categoria)
+            print(f"📂 Total da categoria '{categoria}': R$ {formatar_valor(total)}")
         elif opcao == '3':
             print("👋 Saindo do menu. Até mais!")
             break
@@ -336,23 +3597,7 @@ def exibir_menu(transacoes):
             print("⚠️ Opção inválida. Tente novamente.")
 
 
-    # Tenta carregar transações existentes
-    try:
-        transacoes = load_bd()
-    except FileNotFoundError:
-        transacoes = []
-
-    # Adiciona nova transação à lista
-    transacoes.append(transacao)
-
-    # Salva a lista atualizada
-    salvar_json(transacoes, "./data", "transactions.json")
-
-    print("\n✅ Transação cadastrada com sucesso!")
-    print(transacao)
-
-
-def editar_transacao_por_ID(): # Editado por Bernardo
+def editar_transacao_por_ID(repo): # Editado por Bernardo
     """
     Edita uma transação específica pelo seu UUID.
     """
@@ -360,44 +3605,50 @@ def editar_transacao_por_ID(): # Editado por Bernardo
     uuid_editar = input("Digite o UUID da transação que deseja editar: ").strip()
 
     try:
-        transacoes = load_bd(filepath='./data/transactions.json')
-    except FileNotFoundError: # Carrega as transações do arquivo JSON e trata a exceção caso o arquivo não exista
+        transacao = repo.buscar(uuid_editar) # Busca a transação pelo UUID
+    except FileNotFoundError: # Trata a exceção caso o arquivo não exista
         print("\n--- Nenhuma transação encontrada ---")
         return
 
-    for transacao in transacoes:
-        if transacao.get("UUID") == uuid_editar:
-            print(f"Transação encontrada: {transacao}") # Mostra os dados atuais da transação
-            nova_categoria = input(f"Nova categoria (atual: {transacao['categoria']}) ou Enter para manter: ").strip()
-            novo_valor = input(f"Novo valor (atual: R$ {transacao['valor']:,.2f}) ou Enter para manter: ").strip()
-            # Pede a nova categoria e o novo valor ao usuário, mantendo os valores atuais se o usuário pressionar Enter
-
-            transacao_editada = transacao.copy() # Fazendo uma cópia para confirmar antes de salvar
-            if nova_categoria:
-                transacao_editada['categoria'] = nova_categoria # Atualiza a categoria se o usuário fornecer um novo valor
-            if novo_valor:
-                try: # Verifica se o valor é válido, transforma para float e troca vírgula por ponto
-                    transacao_editada['valor'] = round(float(novo_valor.replace(",", ".")), 2)
-                except ValueError:
-                    print("--- Valor inválido! Mantendo valor anterior ---")
-
-            # Mostra a transação editada antes de confirmar
-            print("\nTransação editada (prévia):")
-            print(transacao_editada)
-            confirmar = input("Deseja salvar as alterações? (S/N): ").strip().lower()
-            if confirmar in ['s', 'sim']:
-                transacao.update(transacao_editada)
-                # Salva a lista de transaçções atualizadas no arquivo JSON
-                salvar_json(transacoes, "./data", "transactions.json")
-                print("\n✅ Transação editada com sucesso!")
-                print(transacao) # Mostra a transação editada e mensagem de sucesso
-            else:
-                print("Alterações descartadas.")
-            return
+    if transacao is None:
+        print("--- Nenhuma transação encontrada com esse UUID. ---") # Caso não encontre a transação com o UUID fornecido
+        return
+
+    print(f"Transação encontrada: {transacao}") # Mostra os dados atuais da transação
+    nova_categoria = input(f"Nova categoria (atual: {transacao['categoria']}) ou Enter para manter: ").strip()
+    novo_valor = input(f"Novo valor (atual: R$ {formatar_valor(transacao['valor'])}) ou Enter para manter: ").strip()
+    # Pede a nova categoria e o novo valor ao usuário, mantendo os valores atuais se o usuário pressionar Enter
+
+    transacao_editada = transacao.copy() # Fazendo uma cópia para confirmar antes de salvar
+    transacao_editada['versao'] = transacao.get('versao', 1) # versão lida: detecta edição de outro operador no meio tempo
+    if nova_categoria:
+        transacao_editada['categoria'] = nova_categoria # Atualiza a categoria se o usuário fornecer um novo valor
+    if novo_valor:
+        try: # Verifica se o valor é válido ('1.234,56', '99,90'...) e converte pelos centavos
+            transacao_editada['valor'] = ler_valor(novo_valor) / 100
+        except ValueError:
+            print("--- Valor inválido! Mantendo valor anterior ---")
 
-    print("--- Nenhuma transação encontrada com esse UUID. ---") # Caso não encontre a transação com o UUID fornecido
+    # Mostra a transação editada antes de confirmar
+    print("\nTransação editada (prévia):")
+    print(transacao_editada)
+    confirmar = input("Deseja salvar as alterações? (S/N): ").strip().lower()
+    if confirmar in ['s', 'sim']:
+        try:
+            # Salva a transação editada; se outro operador mexeu em outros campos, as alterações são mescladas
+            repo.editar(transacao_editada, original=transacao)
+        except ConflitoVersao as e:
+            print(f"\n❌ Conflito: {e}")
+            print(f"Versão atual: {repo.buscar(uuid_editar)}")
+            print("Nada foi salvo. Abra a transação de novo para editar a versão atual.")
+            return
+        transacao = repo.buscar(uuid_editar)
+        print("\n✅ Transação editada com sucesso!")
+        print(transacao) # Mostra a transação editada e mensagem de sucesso
+    else:
+        print("Alterações descartadas.")
 
-def excluir_transacao(): # Editado por Bernardo
+def excluir_transacao(repo): # Editado por Bernardo
     """
     Exclui uma transação específica pelo UUID.
     """
@@ -405,18 +3656,12 @@ def excluir_transacao(): # Editado por Bernardo
     uuid_excluir = input("Digite o UUID da transação que deseja excluir: ").strip()
 
     try:
-        transacoes = load_bd(filepath='./data/transactions.json')
+        # Busca a transação pelo UUID
+        transacao_encontrada = repo.buscar(uuid_excluir)
     except FileNotFoundError: # Tratamento de exceção para caso não exista o arquivo
         print("\n--- Nenhuma transação encontrada ---")
         return
 
-    # Busca a transação pelo UUID
-    transacao_encontrada = None
-    for t in transacoes:
-        if t.get("UUID") == uuid_excluir:
-            transacao_encontrada = t
-            break # Para o loop se encontrar a transação
-
     if not transacao_encontrada: # Caso não encontre a transação
         print("--- Nenhuma transação encontrada com esse UUID ---")
         return
@@ -430,29 +3675,669 @@ def excluir_transacao(): # Editado por Bernardo
         print("Exclusão cancelada pelo usuário.")
         return
 
-    # Remove a transação da lista e salva o JSON atualizado
-    transacoes.remove(transacao_encontrada)
-    salvar_json(transacoes, "./data", "transactions.json")
+    # Remove a transação do repositório e salva (só se ninguém a alterou desde que foi mostrada)
+    try:
+        repo.excluir(transacao_encontrada["UUID"], versao=transacao_encontrada.get("versao", 1))
+    except ConflitoVersao as e:
+        print(f"\n❌ Conflito: {e} Nada foi excluído.")
+        return
     print("\n✅ Transação excluída com sucesso!")
 
+# -----------------------
+# IMPORT / EXPORT
+# -----------------------
+LOTE_IMPORTACAO = 50_000  # até esse tamanho a importação vai para o journal; acima, o snapshot é regravado em streaming
+
+def importar_transacoes(entrada, filepath='./data/transactions.json', formato=None, tamanho_lote=LOTE_IMPORTACAO):
+    """
+    Importa transações de CSV ou NDJSON (`entrada` é um arquivo de texto aberto),
+    validando linha a linha: valores como '250,00' são aceitos, o UUID é gerado
+    quando falta e UUIDs repetidos (no banco ou no próprio arquivo) são rejeitados.
+
+    Importações pequenas (menos de `tamanho_lote` linhas) vão numa única escrita
+    para o journal. As grandes regravam o snapshot em streaming (banco atual +
+    linhas novas), sem carregar o arquivo importado; só os UUIDs que vieram nele
+    ficam em memória (~80 bytes cada), para achar os repetidos dentro do próprio
+    arquivo, já que o índice em disco só os conhece no fim.
+    No sqlite as linhas entram direto no banco, uma transação a cada `tamanho_lote`,
+    e os UUIDs guardados são descartados a cada lote: dali em diante o banco os acha.
+
+    Retorna (quantidade importada, lista de {'linha', 'erro'} das rejeitadas).
+    """
+    rejeitadas, vistos = [], set()  # chaves dos UUIDs do arquivo que o banco ainda não tem
+    if formato_sqlite(filepath):
+        repo = RepositorioTransacoesSQLite(filepath)
+        existe = lambda uuid_transacao: repo.buscar(uuid_transacao) is not None
+    else:
+        indice = obter_indice(filepath)
+        with indice.lock:
+            indice.validar()
+        existe = indice.contem
+
+    def validas():
+        for numero, registro, erro in ler_registros_lote(entrada, formato):
+            if erro is None:
+                try:
+                    fornecido = registro.get("UUID") or registro.get("uuid")
+                    transacao = validar_transacao(registro)
+                    if fornecido:  # os gerados aqui são únicos; só os que vieram no arquivo precisam de conferência
+                        chave = chave_uuid(transacao["UUID"])
+                        if chave in vistos or existe(transacao["UUID"]):
+                            raise ValueError(f"UUID {transacao['UUID']} já existe")
+                        vistos.add(chave)
+                    yield transacao
+                    continue
+                except ValueError as e:
+                    erro = str(e)
+            rejeitadas.append({"linha": numero, "erro": erro})
+
+    novas = validas()
+    if formato_sqlite(filepath):
+        importadas = 0
+        while lote := list(itertools.islice(novas, tamanho_lote)):
+            repo.aplicar_lote([("add", t) for t in lote])
+            importadas += len(lote)
+            vistos.clear()
+        return importadas, rejeitadas
+
+    primeiras = list(itertools.islice(novas, tamanho_lote))
+    if len(primeiras) < tamanho_lote and USAR_JOURNAL:
+        if primeiras:
+            indice.gravar_lote([("add", t) for t in primeiras])
+        return len(primeiras), rejeitadas
+
+    if _thread_compactacao is not None:
+        _thread_compactacao.join()  # não regrava o snapshot junto com uma compactação
+    importadas = 0
+    def contar(transacoes):
+        nonlocal importadas
+        for importadas, t in enumerate(transacoes, 1):
+            yield t
+    # os outros escritores esperam: o que eles pusessem no journal agora se perderia no descarte abaixo
+    with trava_arquivo(filepath, '.compactacao.lock'), trava_arquivo(filepath):
+        gravar_snapshot(itertools.chain(iterar_bd(filepath), contar(itertools.chain(primeiras, novas))), filepath)
+        descartar_journais(filepath)  # o snapshot novo já tem o journal aplicado
+    return importadas, rejeitadas
+
+def exportar_transacoes(saida, filepath='./data/transactions.json', formato='csv'):
+    """
+    Exporta o banco (com o journal aplicado) em streaming para `saida`, um arquivo de
+    texto aberto. O CSV sai separado por ';' e com vírgula decimal ('250,00'), que é
+    o que o importar_transacoes lê de volta. Retorna a quantidade exportada.
+    """
+    quantidade = 0
+    if formato == 'ndjson':
+        for quantidade, t in enumerate(iterar_bd(filepath), 1):
+            saida.write(json.dumps(t, ensure_ascii=False, default=_json_padrao) + "\n")
+    else:
+        escritor = csv.writer(saida, delimiter=';', lineterminator="\n")
+        escritor.writerow(["UUID", "valor", "categoria", "criado_em"])
+        for quantidade, t in enumerate(iterar_bd(filepath), 1):
+            escritor.writerow([t["UUID"], formatar_valor(t['valor'], milhar=False), t.get("categoria"), t.get("criado_em", "")])
+    return quantidade
+
+def formato_por_extensao(caminho):
+    """'csv' ou 'ndjson' pela extensão do arquivo (None se não der para saber)."""
+    extensao = os.path.splitext(caminho)[1].lower()
+    return {'.csv': 'csv', '.ndjson': 'ndjson', '.jsonl': 'ndjson'}.get(extensao)
+
+# -----------------------
+# BATCH CLI
+# -----------------------
+# Modo não interativo, para scripts e cargas em lote:
+#   python desafio_final_grupo3_ultimaversao.py report total|m5|media|ultimas|mensal [--categoria C] [--k N] [--json]
+#   python desafio_final_grupo3_ultimaversao.py report periodo [--de dd/mm/aaaa] [--ate dd/mm/aaaa] [--json]
+#   python desafio_final_grupo3_ultimaversao.py report percentis|histograma [--categoria C] [--baldes N] [--json]
+#   (com --cache-disco os relatórios prontos ficam no <banco>.cache.json até os dados mudarem)
+#   python desafio_final_grupo3_ultimaversao.py add|edit|delete [--formato ndjson|csv] [--json] < arquivo
+#   python desafio_final_grupo3_ultimaversao.py get <uuid> [--json]
+#   python desafio_final_grupo3_ultimaversao.py query [--categoria C] [--min V] [--max V] [--uuid PREFIXO] [--limite N] [--json]
+#   python desafio_final_grupo3_ultimaversao.py import|export <arquivo ou -> [--formato ndjson|csv] [--json]
+#   python desafio_final_grupo3_ultimaversao.py migrate [destino.db] [--bd origem.json]
+#   python desafio_final_grupo3_ultimaversao.py serve|carga [--host H] [--porta P]   (ver api_http.py)
+#   python desafio_final_grupo3_ultimaversao.py bench [--tamanhos 10k,100k]             (ver benchmark.py)
+#   python desafio_final_grupo3_ultimaversao.py falhas [--transacoes N]                 (ver injecao_falhas.py)
+# O banco é aberto uma vez e o lote inteiro vai para o disco numa única escrita.
+# Com --group-commit MS (ou TRANSACOES_GROUP_COMMIT=MS, que vale também para o menu) as
+# escritas que chegam dentro de MS milissegundos são gravadas juntas (ver _enfileirar).
+
+def ler_registros_lote(entrada, formato=None):
+    """
+    Lê registros de NDJSON (um objeto json por linha) ou CSV com cabeçalho
+    (separado por ',' ou ';'). Gera (número da linha, registro ou None, erro ou None),
+    para que uma linha ruim seja rejeitada sem interromper o lote.
+    """
+    linhas = iter(entrada)
+    primeira = next((linha for linha in linhas if linha.strip()), None)
+    if primeira is None:
+        return
+    linhas = itertools.chain([primeira], linhas)
+    if formato is None:
+        formato = 'ndjson' if primeira.lstrip().startswith('{') else 'csv'
+
+    if formato == 'ndjson':
+        for numero, linha in enumerate(linhas, 1):
+            if not linha.strip():
+                continue
+            try:
+                registro = json.loads(linha)
+            except json.JSONDecodeError as e:
+                yield numero, None, f"json inválido ({e.msg})"
+                continue
+            if not isinstance(registro, dict):
+                yield numero, None, "a linha não é um objeto json"
+                continue
+            yield numero, registro, None
+    else:
+        separador = ';' if primeira.count(';') > primeira.count(',') else ','
+        # o número da linha conta o cabeçalho, como num editor de texto
+        for numero, registro in enumerate(csv.DictReader(linhas, delimiter=separador), 2):
+            yield numero, {k.strip(): (v.strip() if isinstance(v, str) else v) for k, v in registro.items() if k}, None
+
+def _valor_lote(valor):
+    """
+    Valor de um registro do lote: número do json (arredondado ao centavo) ou texto
+    como no cadastrar_transacao ('250,00', '1.234,56'), convertido pelos centavos.
+    """
+    try:
+        if isinstance(valor, bool):
+            raise ValueError(valor)
+        if isinstance(valor, (int, float)):
+            if not math.isfinite(valor):
+                raise ValueError(valor)
+            return para_centavos(valor) / 100
+        return ler_valor(valor) / 100
+    except (TypeError, ValueError):
+        raise ValueError(f"valor inválido: {valor!r}") from None
+
+def validar_transacao(registro):
+    """
+    Monta uma transação nova a partir de um registro importado: exige categoria e
+    valor, converte o valor e gera o UUID (v4) quando ele não vem no registro.
+    O "criado_em" do registro é mantido (dd/mm/aaaa ou ISO); sem ele, vale o momento atual.
+    """
+    categoria = str(registro.get("categoria") or "").strip()
+    if not categoria:
+        raise ValueError("categoria ausente")
+    if registro.get("valor") in (None, ""):
+        raise ValueError("valor ausente")
+    uuid_transacao = str(registro.get("UUID") or registro.get("uuid") or "").strip()
+    criado_em = str(registro.get("criado_em") or "").strip()
+    return {"UUID": uuid_transacao or str(uuid.uuid4()), "categoria": categoria, "valor": _valor_lote(registro["valor"]),
+            "criado_em": ler_data(criado_em) if criado_em else agora_iso()}
+
+def _operacao_lote(op, registro, estado, repo):
+    """
+    Valida um registro e monta a operação (op, transação) para o repositório.
+    `estado` guarda as transações já tocadas neste lote (UUID -> transação ou None),
+    para que um lote possa, por exemplo, cadastrar e editar a mesma transação.
+    """
+    uuid_transacao = str(registro.get("UUID") or registro.get("uuid") or "").strip()
+
+    def atual():
+        chave = uuid_transacao.lower()
+        return estado[chave] if chave in estado else repo.buscar(uuid_transacao)
+
+    if op == "add":
+        transacao = validar_transacao(registro)
+        uuid_transacao = transacao["UUID"]
+        if atual() is not None:
+            raise ValueError(f"UUID {uuid_transacao} já existe")
+    else:
+        if not uuid_transacao:
+            raise ValueError("UUID ausente")
+        existente = atual()
+        if existente is None:
+            raise ValueError(f"UUID {uuid_transacao} não encontrado")
+        if op == "edit":
+            transacao = existente.copy()
+            transacao["versao"] = existente.get("versao", 1)
+            if registro.get("categoria"):
+                transacao["categoria"] = str(registro["categoria"])
+            if registro.get("valor") not in (None, ""):
+                transacao["valor"] = _valor_lote(registro["valor"])
+            estado[transacao["UUID"].lower()] = transacao
+            return op, transacao, existente  # com o original, edições concorrentes em outros campos são mescladas
+        transacao = {"UUID": existente["UUID"], "versao": existente.get("versao", 1)}
+    estado[transacao["UUID"].lower()] = None if op == "delete" else transacao
+    return op, transacao
+
+def aplicar_lote_cli(repo, op, entrada, formato=None):
+    """Valida todo o lote, grava as operações válidas de uma vez e devolve (aplicadas, rejeitadas)."""
+    operacoes, rejeitadas, estado = [], [], {}
+    for numero, registro, erro in ler_registros_lote(entrada, formato):
+        if erro is None:
+            try:
+                operacoes.append(_operacao_lote(op, registro, estado, repo))
+                continue
+            except ValueError as e:
+                erro = str(e)
+        rejeitadas.append({"linha": numero, "erro": erro})
+    repo.aplicar_lote(operacoes)  # ConflitoVersao aqui descarta o lote inteiro
+    return operacoes, rejeitadas
+
+def dados_relatorio(repo, tipo, categoria=None, k=5, de=None, ate=None, baldes=BALDES_HISTOGRAMA):
+    """
+    Resultado de um relatório ('total', 'm5', 'media', 'ultimas', 'periodo', 'mensal',
+    'percentis' ou 'histograma') como dicionário: é o json do CLI e da API HTTP. `de`/`ate`
+    são as datas do 'periodo' (dd/mm/aaaa ou ISO, `ate` inclusive); data inválida levanta
+    ValueError. `baldes` é o número de faixas do 'histograma'.
+    Os relatórios agregados vêm do cache enquanto os dados não mudam; 'ultimas' (uma
+    busca no índice de tempo) e 'periodo' (de tamanho ilimitado) são sempre lidos na hora.
+    """
+    categoria = categoria or None
+    if tipo in ("total", "m5", "media", "mensal", "percentis", "histograma"):
+        parametros = {"categoria": categoria, "k": k if tipo == "m5" else None}
+        if tipo == "histograma":
+            parametros["baldes"] = baldes
+        return em_cache(repo, tipo, parametros, lambda: _calcular_relatorio(repo, tipo, categoria, k, baldes))
+    if tipo == "ultimas":
+        return {"categoria": categoria, "k": k, "transacoes": repo.ultimas(k, categoria)}
+    if tipo == "periodo":
+        inicio = ler_data(de) if de else None
+        fim = ler_data(ate, fim_do_dia=True) if ate else None
+        transacoes = repo.entre(inicio, fim, categoria)
+        return {"categoria": categoria, "de": inicio, "ate": fim, "quantidade": len(transacoes),
+                "total": calcular_total_transacoes(transacoes), "transacoes": transacoes}
+    raise ValueError(f"relatório desconhecido: {tipo!r}")
+
+def _calcular_relatorio(repo, tipo, categoria, k, baldes=BALDES_HISTOGRAMA):
+    if tipo == "mensal":
+        return {"categoria": categoria, "meses": repo.totais_por_mes(categoria)}
+    if tipo == "percentis":  # lidos do sketch mantido nos agregados, sem ordenar as transações
+        agregados = repo.agregados()
+        resumo = agregados.distribuicao(categoria).resumo()
+        if resumo["quantidade"] and not resumo["exato"]:
+            # os extremos exatos estão nos agregados; os percentis aproximados não passam deles
+            menor, maior = agregados.minimo(categoria), agregados.maximo(categoria)
+            resumo.update({nome: min(max(valor, menor), maior) for nome, valor in resumo.items()
+                           if nome not in ("quantidade", "exato")}, min=menor, max=maior)
+        return {"categoria": categoria, **resumo}
+    if tipo == "histograma":
+        distribuicao = repo.agregados().distribuicao(categoria)
+        return {"categoria": categoria, "quantidade": len(distribuicao), "exato": distribuicao.exato,
+                "faixas": distribuicao.histograma(baldes)}
+    if tipo == "m5":
+        top = calcular_m5(repo, k, categoria)
+        return {"categoria": categoria, "k": k, "media": top["media"], "quantidade": top["quantidade"],
+                "max": top["max"], "min": top["min"], "median": top["median"]}
+    agregados = repo.agregados()
+    if tipo == "total":
+        return {"categoria": categoria, "total": calcular_total_transacoes(agregados, categoria),
+                "quantidade": agregados.quantidade(categoria)}
+    return {"categoria": categoria, "media": agregados.media(categoria), "quantidade": agregados.quantidade(categoria)}
+
+def dados_filtro(repo, categoria=None, minimo=None, maximo=None, prefixo=None, limite=None):
+    """
+    Resultado de uma consulta filtrada (ver SECONDARY indexes) como dicionário, para o
+    CLI, a API HTTP e o menu. `minimo`/`maximo` são valores como no cadastro ('100',
+    '1.234,56' ou número do json), inclusive; valor inválido levanta ValueError.
+    `limite` corta só a listagem: a quantidade e o total contam o filtro inteiro.
+    """
+    minimo = None if minimo in (None, "") else para_centavos(_valor_lote(minimo))
+    maximo = None if maximo in (None, "") else para_centavos(_valor_lote(maximo))
+    transacoes = repo.filtrar(categoria or None, minimo, maximo, prefixo or None)
+    return {"categoria": categoria or None, "minimo": None if minimo is None else minimo / 100,
+            "maximo": None if maximo is None else maximo / 100, "prefixo": prefixo or None,
+            "quantidade": len(transacoes), "total": calcular_total_transacoes(transacoes),
+            "transacoes": transacoes[:limite] if limite else transacoes}
+
+def _imprimir(dados, texto, como_json):
+    if como_json:
+        print(json.dumps(dados, ensure_ascii=False, indent=2, default=_json_padrao))
+    else:
+        print(texto)
+
+def executar_cli(argv):
+    """Ponto de entrada do modo linha de comando. Retorna o código de saída do processo."""
+    parser = argparse.ArgumentParser(description="Transações bancárias em modo não interativo.")
+    parser.add_argument("--bd", help="arquivo do banco (.json, .bin ou .db); o padrão é o da conta")
+    parser.add_argument("--conta", default=os.environ.get("TRANSACOES_CONTA", CONTA_PADRAO), help="conta (partição) usada")
+    parser.add_argument("--json", action="store_true", help="saída em json em vez de texto")
+    parser.add_argument("--diagnostico", action="store_true", help="mede as funções e mostra as métricas no stderr ao final")
+    parser.add_argument("--perfil", metavar="ARQUIVO", help="grava um cProfile (.prof) da execução")
+    parser.add_argument("--cache-disco", action="store_true",
+                        help="guarda os relatórios prontos ao lado do banco, para as próximas execuções")
+    parser.add_argument("--group-commit", type=float, metavar="MS",
+                        help="junta as escritas que chegam dentro dessa janela (ms) numa gravação só")
+    comandos = parser.add_subparsers(dest="comando", required=True)
+
+    report = comandos.add_parser("report", help="relatórios")
+    report.add_argument("tipo", choices=["total", "m5", "media", "ultimas", "periodo", "mensal", "percentis", "histograma"])
+    report.add_argument("--categoria", help="só as transações dessa categoria")
+    report.add_argument("--k", type=int, default=5, help="tamanho de cada lista do m5 / quantidade das últimas")
+    report.add_argument("--de", help="data inicial do período (dd/mm/aaaa)")
+    report.add_argument("--ate", help="data final do período, inclusive (dd/mm/aaaa)")
+    report.add_argument("--baldes", type=int, default=BALDES_HISTOGRAMA, help="faixas do histograma")
+
+    for op in ("add", "edit", "delete"):
+        lote = comandos.add_parser(op, help=f"{op} em lote lendo NDJSON ou CSV da entrada padrão")
+        lote.add_argument("--formato", choices=["ndjson", "csv"], help="detectado pela primeira linha se omitido")
+
+    get = comandos.add_parser("get", help="consulta uma transação pelo UUID")
+    get.add_argument("uuid")
+
+    query = comandos.add_parser("query", help="filtra por categoria, faixa de valor e início do UUID, usando os índices em memória")
+    query.add_argument("--categoria", help="só as transações dessa categoria")
+    query.add_argument("--min", dest="minimo", help="valor mínimo, inclusive (ex.: 100 ou 1.234,56)")
+    query.add_argument("--max", dest="maximo", help="valor máximo, inclusive")
+    query.add_argument("--uuid", dest="prefixo", help="início do UUID (ex.: os 8 caracteres mostrados no m5)")
+    query.add_argument("--limite", type=int, default=LIMITE_LISTAGEM_FILTRO, help="transações listadas (0 = todas)")
+
+    for comando, ajuda in (("import", "importa transações novas de CSV ou NDJSON ('-' lê a entrada padrão)"),
+                           ("export", "exporta o banco para CSV ou NDJSON ('-' escreve na saída padrão)")):
+        transferencia = comandos.add_parser(comando, help=ajuda)
+        transferencia.add_argument("arquivo")
+        transferencia.add_argument("--formato", choices=["ndjson", "csv"], help="pela extensão do arquivo se omitido")
+
+    migrate = comandos.add_parser("migrate", help="converte o banco (--bd) para outro formato, pela extensão do destino")
+    migrate.add_argument("destino", nargs="?", default="./data/transactions.db", help=".db (sqlite), .bin ou .json")
+
+    serve = comandos.add_parser("serve", help="sobe a API HTTP/JSON com as operações do menu: /transacoes "
+                                              "(POST, GET, PUT/PATCH, DELETE) e /relatorios/<tipo>")
+    serve.add_argument("--host", default="127.0.0.1", help="endereço em que o servidor escuta")
+    serve.add_argument("--porta", type=int, default=8000, help="porta TCP do servidor")
+
+    carga = comandos.add_parser("carga", help="teste de carga contra uma API já no ar (grava transações nela)")
+    carga.add_argument("--host", default="127.0.0.1", help="endereço da API")
+    carga.add_argument("--porta", type=int, default=8000, help="porta da API")
+    carga.add_argument("--requisicoes", type=int, default=10_000, help="total de requisições enviadas")
+    carga.add_argument("--concorrencia", type=int, default=50, help="conexões simultâneas")
+
+    bench = comandos.add_parser("bench", help="mede tempo, pico de memória e bytes escritos de cada operação do menu "
+                                              "em bancos gerados de vários tamanhos (cada medição num processo novo)")
+    bench.add_argument("--tamanhos", default=benchmark.TAMANHOS_BENCH, help="lista separada por vírgula, aceita k e M")
+    bench.add_argument("--operacoes", default=",".join(benchmark.OPERACOES_BENCH), help="operações medidas, separadas por vírgula")
+    bench.add_argument("--repeticoes", type=int, default=1, help="processos por medição (vale a mediana)")
+    bench.add_argument("--saida", default=os.path.join(benchmark.DIRETORIO_BENCH, "resultado.json"), help="json com o resultado")
+    bench.add_argument("--baseline", default=os.path.join(benchmark.DIRETORIO_BENCH, "baseline.json"), help="comparado se existir")
+    bench.add_argument("--atualizar-baseline", action="store_true", help="grava o resultado como novo baseline")
+
+    falhas = comandos.add_parser("falhas", help="derruba o processo no meio de gravações (saída forçada em pontos de falha "
+                                                "e SIGKILL) e confere que o banco fica como antes ou depois do lote")
+    falhas.add_argument("--transacoes", type=int, default=2_000, help="tamanho do banco de cada cenário")
+    falhas.add_argument("--formatos", default="json,bin", help="formatos de snapshot testados, separados por vírgula")
+    falhas.add_argument("--aleatorias", type=int, default=5, help="mortes (SIGKILL) em instantes sorteados por cenário")
+
+    # as opções globais também valem depois do subcomando
+    for subparser in comandos.choices.values():
+        subparser.add_argument("--json", action="store_true", default=argparse.SUPPRESS)
+        subparser.add_argument("--bd", default=argparse.SUPPRESS)
+        subparser.add_argument("--conta", default=argparse.SUPPRESS)
+        subparser.add_argument("--diagnostico", action="store_true", default=argparse.SUPPRESS)
+        subparser.add_argument("--perfil", default=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.diagnostico:
+        diagnostico.ativar_diagnostico(sys.modules[__name__], FUNCOES_DIAGNOSTICO)
+    if args.perfil:
+        diagnostico.iniciar_perfil()
+    try:
+        return _executar_comando(args)
+    finally:
+        if args.perfil:
+            diagnostico.parar_perfil(args.perfil)
+            print(f"📈 Perfil salvo em: {os.path.abspath(args.perfil)}", file=sys.stderr)
+        if args.diagnostico:
+            print(diagnostico.formatar_diagnostico(), file=sys.stderr)
+
+def _executar_comando(args):
+    if args.comando == "carga":  # não abre banco nenhum: só fala com a API
+        try:
+            resultado = asyncio.run(api_http.teste_de_carga(args.host, args.porta, args.requisicoes, args.concorrencia))
+        except (OSError, asyncio.IncompleteReadError) as e:
+            print(f"❌ Falha na conexão com {args.host}:{args.porta}: {e}", file=sys.stderr)
+            return 2
+        _imprimir(resultado, api_http.formatar_carga(resultado), args.json)
+        # 409 é conflito de versão entre edições simultâneas da mesma transação, esperado sob carga
+        return 1 if any(status != "409" for status in resultado["erros"]) else 0
+
+    if args.comando == "bench":  # gera os próprios bancos em ./bench
+        operacoes = [op.strip() for op in args.operacoes.split(",") if op.strip()]
+        desconhecidas = sorted(set(operacoes) - set(benchmark.OPERACOES_BENCH))
+        if desconhecidas or args.repeticoes < 1:
+            print(f"❌ Operações inválidas: {', '.join(desconhecidas)} (use {', '.join(benchmark.OPERACOES_BENCH)})"
+                  if desconhecidas else "❌ --repeticoes deve ser pelo menos 1.", file=sys.stderr)
+            return 2
+        resultado = benchmark.executar_benchmark(sys.modules[__name__],
+                                                 [benchmark.tamanho_bench(t) for t in args.tamanhos.split(",") if t.strip()],
+                                                 operacoes, args.repeticoes)
+        regressoes = []
+        if os.path.exists(args.baseline) and not args.atualizar_baseline:
+            with open(args.baseline, encoding="utf-8") as file:
+                regressoes = benchmark.comparar_benchmark(resultado, json.load(file))
+            resultado["regressoes"] = regressoes
+        for caminho in [args.saida] + ([args.baseline] if args.atualizar_baseline else []):
+            os.makedirs(os.path.dirname(os.path.abspath(caminho)), exist_ok=True)
+            with open(caminho, "w", encoding="utf-8") as file:
+                json.dump(resultado, file, ensure_ascii=False, indent=2)
+        texto = f"✅ Resultado salvo em {os.path.abspath(args.saida)}"
+        if args.atualizar_baseline:
+            texto += f"\n📌 Baseline atualizado: {os.path.abspath(args.baseline)}"
+        for r in regressoes:
+            texto += (f"\n⚠️ Regressão: {r['operacao']} com {r['tamanho']} transações, {r['metrica']} "
+                      f"{r['baseline']:.4g} -> {r['atual']:.4g} ({r['razao']}x)")
+        _imprimir(resultado, texto, args.json)
+        return 1 if regressoes else 0
+
+    if args.comando == "falhas":  # usa bancos próprios em ./falhas
+        formatos = [f.strip() for f in args.formatos.split(",") if f.strip()]
+        if not formatos or set(formatos) - {"json", "bin"}:
+            print("❌ --formatos aceita json e bin (o sqlite garante a atomicidade pelas próprias transações).", file=sys.stderr)
+            return 2
+        resultados = injecao_falhas.executar_testes_de_falha(sys.modules[__name__], args.transacoes, formatos, args.aleatorias)
+        falharam = [r for r in resultados if not r["ok"]]
+        texto = (f"✅ {len(resultados)} quedas simuladas: o banco ficou sempre inteiro (antes ou depois do lote)"
+                 if not falharam else f"❌ {len(falharam)} de {len(resultados)} quedas deixaram o banco num estado inválido")
+        _imprimir({"resultados": resultados, "falharam": len(falharam)}, texto, args.json)
+        return 1 if falharam else 0
+
+    if args.bd is None:
+        try:
+            if args.conta == CONTA_PADRAO:  # como no menu: gera o banco padrão, não uma partição vazia
+                with contextlib.redirect_stdout(sys.stderr):  # o "Arquivo salvo em" não entra no --json
+                    preparar_bd_padrao()
+                args.bd = caminho_bd()
+            else:
+                args.bd = preparar_conta(args.conta)
+        except ValueError as e:
+            print(f"❌ {e}", file=sys.stderr)
+            return 2
+
+    if not os.path.exists(args.bd):
+        print(f"❌ Banco de dados não encontrado: {args.bd}", file=sys.stderr)
+        return 2
+    if args.comando == "migrate":
+        converter_bd(args.bd, args.destino)
+        quantidade = len(abrir_repositorio(args.destino).transacoes())
+        _imprimir({"migradas": quantidade, "destino": os.path.abspath(args.destino)},
+                  f"✅ {quantidade} transação(ões) migrada(s) para {os.path.abspath(args.destino)}", args.json)
+        return 0
+    repo = abrir_repositorio(args.bd)
+    if args.cache_disco:
+        repo.cache_relatorios().persistir_em(caminho_cache(repo.filepath))
+    if args.group_commit is not None and not isinstance(repo, RepositorioTransacoesSQLite):
+        repo.janela_grupo = args.group_commit / 1000
+
+    if args.comando == "serve":
+        try:
+            asyncio.run(api_http.servir_http(repo, sys.modules[__name__], args.host, args.porta))
+        except KeyboardInterrupt:
+            print("\nAPI encerrada.")
+        return 0
+
+    if args.comando == "get":
+        transacao = repo.buscar(args.uuid)
+        if transacao is None:
+            print(f"❌ Nenhuma transação encontrada com esse UUID: {args.uuid}", file=sys.stderr)
+            return 1
+        _imprimir(transacao, f"UUID: {transacao['UUID']}\nCategoria: {transacao.get('categoria', 'N/A')}\n"
+                             + f"Valor: R$ {formatar_valor(transacao['valor'])}", args.json)
+        return 0
+
+    if args.comando == "query":
+        try:
+            dados = dados_filtro(repo, args.categoria, args.minimo, args.maximo, args.prefixo, args.limite)
+        except ValueError as e:
+            print(f"❌ {e}", file=sys.stderr)
+            return 2
+        linhas = [f"{t['UUID']} | {t.get('categoria')} | " + f"R$ {formatar_valor(t['valor'])}" for t in dados["transacoes"]]
+        texto = "\n".join(linhas) if linhas else "❌ Nenhuma transação encontrada."
+        texto += f"\n📦 {dados['quantidade']} transação(ões), total " + f"R$ {formatar_valor(dados['total'])}"
+        _imprimir(dados, texto, args.json)
+        return 0
+
+    if args.comando == "report":
+        categoria = args.categoria or None
+        try:
+            dados = dados_relatorio(repo, args.tipo, categoria, args.k, args.de, args.ate, args.baldes)
+        except ValueError as e:
+            print(f"❌ {e}", file=sys.stderr)
+            return 2
+        if args.tipo in ("ultimas", "periodo"):
+            linhas = [f"{t.get('criado_em', 'sem data')} | {t['UUID']} | {t.get('categoria')} | "
+                      + f"R$ {formatar_valor(t['valor'])}" for t in dados["transacoes"]]
+            texto = "\n".join(linhas) if linhas else "❌ Nenhuma transação encontrada."
+            if args.tipo == "periodo":
+                texto += f"\n📦 {dados['quantidade']} transação(ões), total " + f"R$ {formatar_valor(dados['total'])}"
+        elif args.tipo in ("percentis", "histograma"):
+            formatar = formatar_percentis if args.tipo == "percentis" else formatar_histograma
+            texto = formatar(dados).lstrip("\n") if dados["quantidade"] else "❌ Nenhuma transação encontrada."
+        elif args.tipo == "mensal":
+            texto = "\n".join(f"{m['mes'] or 'sem data'}: " + f"R$ {formatar_valor(m['total'])}" + f" ({m['quantidade']})"
+                              for m in dados["meses"]) or "❌ Nenhuma transação encontrada."
+        elif args.tipo == "total":
+            nome = f"da categoria '{categoria}'" if categoria else "de todas as transações"
+            texto = f"💰 Total {nome}: R$ {formatar_valor(dados['total'])}" + f"\n📦 Quantidade de transações: {dados['quantidade']}"
+        elif args.tipo == "media":
+            media = dados["media"]
+            texto = (f"✅ A média dos valores{f' da categoria {categoria!r}' if categoria else ''} é: R$ {formatar_valor(media)}"
+                     if media is not None else "❌ Nenhuma transação encontrada.")
+        else:
+            texto = texto_m5(repo, args.k, categoria) or f"❌ Nenhuma transação na categoria '{categoria}'."
+        _imprimir(dados, texto, args.json)
+        return 0
+
+    if args.comando == "import":
+        formato = args.formato or formato_por_extensao(args.arquivo)
+        with (open(args.arquivo, "r", encoding="utf-8-sig", newline="") if args.arquivo != "-"
+              else contextlib.nullcontext(sys.stdin)) as entrada:
+            importadas, rejeitadas = importar_transacoes(entrada, args.bd, formato)
+        for rejeitada in rejeitadas:
+            print(f"⚠️ Linha {rejeitada['linha']} rejeitada: {rejeitada['erro']}", file=sys.stderr)
+        _imprimir({"importadas": importadas, "rejeitadas": rejeitadas},
+                  f"✅ {importadas} transação(ões) importada(s), {len(rejeitadas)} rejeitada(s).", args.json)
+        return 1 if rejeitadas else 0
+
+    if args.comando == "export":
+        formato = args.formato or formato_por_extensao(args.arquivo) or "csv"
+        if args.arquivo == "-":
+            exportar_transacoes(sys.stdout, args.bd, formato)
+            return 0
+        with open(args.arquivo, "w", encoding="utf-8", newline="") as saida:
+            quantidade = exportar_transacoes(saida, args.bd, formato)
+        _imprimir({"exportadas": quantidade, "arquivo": os.path.abspath(args.arquivo)},
+                  f"✅ {quantidade} transação(ões) exportada(s) para {os.path.abspath(args.arquivo)}", args.json)
+        return 0
+
+    try:
+        operacoes, rejeitadas = aplicar_lote_cli(repo, args.comando, sys.stdin, args.formato)
+    except ConflitoVersao as e:
+        print(f"❌ Conflito: {e} Nenhuma operação do lote foi gravada.", file=sys.stderr)
+        return 3
+    for rejeitada in rejeitadas:
+        print(f"⚠️ Linha {rejeitada['linha']} rejeitada: {rejeitada['erro']}", file=sys.stderr)
+    _imprimir({"aplicadas": len(operacoes), "rejeitadas": rejeitadas, "UUIDs": [operacao[1]["UUID"] for operacao in operacoes]},
+              f"✅ {len(operacoes)} operação(ões) '{args.comando}' aplicada(s), {len(rejeitadas)} rejeitada(s).", args.json)
+    return 1 if rejeitadas else 0
+
+# -----------------------
+# DIAGNOSTICS
+# -----------------------
+# A instrumentação fica em diagnostico.py; aqui, quais funções ela mede e como contar as
+# linhas de cada uma. Desligada (o padrão), nada é trocado.
+
+def _tamanho(valor):
+    """Quantidade de linhas de uma coleção já em memória (None para iteradores e consultas ao banco)."""
+    if isinstance(valor, (list, tuple, dict, type({}.values()), TabelaColunar)):
+        return len(valor)
+    return None
+
+# função instrumentada -> como contar as linhas a partir de (argumentos, resultado), ou None
+FUNCOES_DIAGNOSTICO = {
+    # leitura e parsing
+    "load_bd": lambda args, resultado: len(resultado),
+    "carregar_transacoes": lambda args, resultado: len(resultado),
+    "ler_snapshot": lambda args, resultado: len(resultado),
+    "aplicar_journais": lambda args, resultado: len(resultado),
+    "TabelaColunar.de_transacoes": lambda args, resultado: len(resultado),
+    "AgregadosPorCategoria.de_transacoes": lambda args, resultado: resultado.quantidade(),
+    "IndicesSecundarios.de_transacoes": lambda args, resultado: len(resultado),
+    # relatórios: seleção (ordenação) e formatação
+    "calcular_total_transacoes": lambda args, resultado: _tamanho(args[0]),
+    "calcular_m5": lambda args, resultado: resultado["quantidade"],
+    "selecionar_top_k": lambda args, resultado: resultado["quantidade"],
+    "formatar_m5": None,
+    "mostrar_m5_transacoes": None,
+    "calcular_media": None,
+    "RepositorioTransacoes.ultimas": lambda args, resultado: len(resultado),
+    "RepositorioTransacoes.entre": lambda args, resultado: len(resultado),
+    "RepositorioTransacoes.filtrar": lambda args, resultado: len(resultado),
+    "mostrar_transacoes_filtradas": None,
+    "mostrar_transacoes_periodo": None,
+    "mostrar_totais_por_mes": None,
+    "mostrar_percentis": None,
+    "mostrar_histograma": None,
+    "salvar_relatorio": None,
+    # CRUD
+    "consultar_transacao_por_ID": None,
+    "cadastrar_transacao": None,
+    "editar_transacao_por_ID": None,
+    "excluir_transacao": None,
+    # escrita em disco
+    "salvar_json": lambda args, resultado: _tamanho(args[0]),
+    "escrever_json": lambda args, resultado: _tamanho(args[0]),
+    "RepositorioTransacoes.aplicar_lote": lambda args, resultado: _tamanho(args[1]),
+    "registrar_operacoes": lambda args, resultado: _tamanho(args[0]),
+    "importar_transacoes": lambda args, resultado: resultado[0],
+    "exportar_transacoes": lambda args, resultado: resultado,
+}
+
+# TRANSACOES_DIAGNOSTICO=1 liga a instrumentação; com um nome .json, também grava as métricas nele ao sair
+if os.environ.get("TRANSACOES_DIAGNOSTICO", "") not in ("", "0"):
+    diagnostico.ativar_diagnostico(sys.modules[__name__], FUNCOES_DIAGNOSTICO)
+    if os.environ["TRANSACOES_DIAGNOSTICO"].endswith(".json"):
+        atexit.register(diagnostico.salvar_diagnostico, os.environ["TRANSACOES_DIAGNOSTICO"])
+
 # -----------------------
 # MAIN SCRIPT
 # -----------------------
 # não alterar nada abaixo
 if __name__ == "__main__":
 
+    # com argumentos roda o modo linha de comando (ver BATCH CLI) em vez do menu
+    if len(sys.argv) > 1:
+        sys.exit(executar_cli(sys.argv[1:]))
+
     # -----------------------
     # NÃO ALTERAR ESTE BLOCO
     # -----------------------
     # criar o banco de dados caso ele não exista
     print(os.path.abspath('.'))
-    if not os.path.exists('./data/transactions.json'):
-        criar_bd()
-
-    # load bd
-    bd = load_bd()
+    # criar_bd() e load_bd() rodam na pré-carga, em background (ver WARM START),
+    # para o menu aparecer sem esperar a leitura do banco
     # -----------------------
 
+    # conta da sessão (cada operador pode abrir outra com a variável TRANSACOES_CONTA)
+    conta = os.environ.get("TRANSACOES_CONTA", CONTA_PADRAO)
+
+    # repositório único da sessão: preparado em background e passado para todas as funções
+    if conta != CONTA_PADRAO:
+        pre_carga = PreCarga(caminho_bd(conta), functools.partial(preparar_conta, conta)).iniciar()
+    else:
+        pre_carga = PreCarga(caminho_bd(), preparar_bd_padrao).iniciar()
+    repo = None
+
     # -----------------------
     # ABAIXO PODE ALTERAR
     # -----------------------
@@ -461,10 +4346,18 @@ if __name__ == "__main__":
 
 
     # inicia o programa
-while True:
-        tela_inicial()
+    while True:
+        tela_inicial(conta, pre_carga)
         opcao_menu = input("Digite o número da opção desejada: ")
 
+        if opcao_menu in ETAPAS_MENU:  # espera só a parte da pré-carga que a opção usa
+            pre_carga.esperar(ETAPAS_MENU[opcao_menu])
+            try:
+                repo = pre_carga.repositorio()
+            except Exception as e:
+                print(f"❌ Não foi possível abrir o banco: {e}")
+                continue
+
         if opcao_menu == '0':
             print("Encerrando o programa. Até logo!")
             break
@@ -474,14 +4367,15 @@ while True:
         elif opcao_menu == '1':  # Visualizar relatórios
             while True:
                 opcao_relatorio = visualizar_relatorios()
+                if opcao_relatorio in ETAPAS_RELATORIO:
+                    pre_carga.esperar(ETAPAS_RELATORIO[opcao_relatorio])
 
                 match opcao_relatorio:
                     case '1':
                         print("\n📊 Opção selecionada: Valor total das transações efetuadas")
 
                         try:
-                             transacoes = load_bd()
-                             if not transacoes:
+                             if not dados_relatorio(repo, "total")["quantidade"]:
                                  print("❌ Nenhuma transação encontrada no banco de dados.")
                                  continue
 
@@ -492,28 +4386,12 @@ while True:
                         categoria = input("Deseja filtrar por categoria? Se sim, digite o nome (ou pressione Enter para somar todas): ").strip()
 
                         try:
-                            # Filtra se necessário
-
-                            transacoes_filtradas = (
-                                transacoes if categoria == ""
-                                else [t for t in transacoes if t.get("categoria") == categoria]
-                            )
-                            total = calcular_total_transacoes(transacoes_filtradas)
-                            quantidade = len(transacoes_filtradas)
+                            # Total e quantidade saem dos agregados por categoria; o texto pronto fica no cache de relatórios
+                            relatorio_str = texto_total(repo, categoria or None)
                         except Exception as e:
                             print(f"❌ Erro ao calcular total: {e}")
                             continue
 
-
-                        # Exibe na tela
-                        relatorio_str = ""
-                        if categoria == "":
-                            relatorio_str += f"\n💰 Total de todas as transações: R$ {total:,.2f}".replace(".", ",") + "\n"
-                            relatorio_str += f"📦 Quantidade de transações: {quantidade}"
-                        else:
-                            relatorio_str += f"\n📂 Total da categoria '{categoria}': R$ {total:,.2f}".replace(".", ",") + "\n"
-                            relatorio_str += f"📦 Quantidade de transações na categoria '{categoria}': {quantidade}"
-
                         print(relatorio_str) # Imprime o relatório no console
 
                         # Pergunta se o usuário deseja salvar o relatório
@@ -527,7 +4405,15 @@ while True:
 
                     case '2':
                         print("Opção selecionada: todas as 5 últimas transações (m5)\n")
-                        mostrar_m5_transacoes()
+                        k_texto = input("Quantas transações em cada lista? (Enter para 5): ").strip()
+                        if k_texto.isdigit() and int(k_texto) > 0:
+                            k = int(k_texto)
+                        else:
+                            if k_texto:
+                                print("⚠️ Quantidade inválida. Usando 5.")
+                            k = 5
+                        categoria = input("Deseja filtrar por categoria? Se sim, digite o nome (ou pressione Enter para todas): ").strip()
+                        mostrar_m5_transacoes(repo, k, categoria or None)
                         continue
                  
                     
@@ -536,39 +4422,72 @@ while True:
                         print("Opção selecionada: Visualizar as 5 últimas transações\n")
                         
                         try:
-                            transacoes = load_bd()
-                            if not transacoes:
+                            ultimas_transacoes = repo.ultimas(5) # Seleciona as 5 últimas transações
+                            if not ultimas_transacoes:
                                 print("❌ Nenhuma transação encontrada no banco de dados.")
                                 continue
                         except (FileNotFoundError, json.JSONDecodeError):
                             print("❌ Erro ao carregar as transações.")
                             continue
 
-                        # Seleciona as 5 últimas transações
-
-                        ultimas_transacoes = transacoes[-5:]
-
                         print("\n🧾 Últimas 5 transações registradas:")
                         for i, transacao in enumerate(ultimas_transacoes, start=1):
-                            uuid = transacao.get("UUID", "N/A")
+                            uuid_transacao = transacao.get("UUID", "N/A") # não usar `uuid` aqui: sobrescreveria o módulo uuid
                             categoria = transacao.get("categoria", "Não especificada")
                             valor = transacao.get("valor", 0.0)
-                            print(f"{i}. UUID: {uuid}")
+                            print(f"{i}. UUID: {uuid_transacao}")
+                            print(f"   Data: {transacao.get('criado_em', 'sem data')}")
                             print(f"   Categoria: {categoria}")
-                            print(f"   Valor: R$ {valor:,.2f}".replace(".", ","))
+                            print(f"   Valor: R$ {formatar_valor(valor)}")
                             print("-" * 40)
                         
                         # Soma dos 5 valores
     
                         total_5 = calcular_total_transacoes(ultimas_transacoes)
-                        print(f"\n💰 Soma total das últimas 5 transações: R$ {total_5:,.2f}".replace(".", ","))
+                        print(f"\n💰 Soma total das últimas 5 transações: R$ {formatar_valor(total_5)}")
 
                         continue
 
                     case '4':
                         print("Opção selecionada: média de gastos gerais\n")
-                        calcular_media()
-                        continue                    
+                        categoria = input("Deseja filtrar por categoria? Se sim, digite o nome (ou pressione Enter para todas): ").strip()
+                        calcular_media(repo, categoria or None)
+                        continue
+
+                    case '5':
+                        print("Opção selecionada: transações por período\n")
+                        mostrar_transacoes_periodo(repo)
+                        continue
+
+                    case '6':
+                        print("Opção selecionada: totais por mês\n")
+                        categoria = input("Deseja filtrar por categoria? Se sim, digite o nome (ou pressione Enter para todas): ").strip()
+                        mostrar_totais_por_mes(repo, categoria or None)
+                        continue
+
+                    case '7':
+                        print("Opção selecionada: filtrar transações\n")
+                        mostrar_transacoes_filtradas(repo)
+                        continue
+
+                    case '8':
+                        print("Opção selecionada: mediana e percentis\n")
+                        categoria = input("Deseja filtrar por categoria? Se sim, digite o nome (ou pressione Enter para todas): ").strip()
+                        mostrar_percentis(repo, categoria or None)
+                        continue
+
+                    case '9':
+                        print("Opção selecionada: histograma dos valores\n")
+                        categoria = input("Deseja filtrar por categoria? Se sim, digite o nome (ou pressione Enter para todas): ").strip()
+                        baldes_texto = input(f"Quantas faixas? (Enter para {BALDES_HISTOGRAMA}): ").strip()
+                        if baldes_texto.isdigit() and int(baldes_texto) > 0:
+                            baldes = int(baldes_texto)
+                        else:
+                            if baldes_texto:
+                                print(f"⚠️ Quantidade inválida. Usando {BALDES_HISTOGRAMA}.")
+                            baldes = BALDES_HISTOGRAMA
+                        mostrar_histograma(repo, categoria or None, baldes)
+                        continue
                     
                     case '0':
                         print("Retornando ao menu principal...\n")
@@ -583,11 +4502,11 @@ while True:
             while True:
                 confirmar = input("Deseja realmente cadastrar uma nova transação? (S/N): ").strip().lower() #opção de escolha ao usuário
                 if confirmar in ['s', 'sim']:
-                    cadastrar_transacao()
+                    cadastrar_transacao(repo)
                     break
                 elif confirmar in ['não', 'nao', 'n']:
                     print("Retornando ao menu principal...")
-                    tela_inicial()
+                    tela_inicial(conta, pre_carga)
                     break
                 else:
                    print("❌ Opção inválida! Digite 'sim' ou 'não'.")
@@ -599,11 +4518,11 @@ while True:
             while True:
                 confirmar = input("Deseja realmente editar uma nova transação? (S/N): ").strip().lower() #opção de escolha ao usuário
                 if confirmar in ['s', 'sim']:
-                    editar_transacao_por_ID()
+                    editar_transacao_por_ID(repo)
                     break
                 elif confirmar in ['não', 'nao', 'n']:
                     print("Retornando ao menu principal...")
-                    tela_inicial()
+                    tela_inicial(conta, pre_carga)
                     break
                 else:
                    print("❌ Opção inválida! Digite 'sim' ou 'não'.")
@@ -616,11 +4535,11 @@ while True:
             while True:
                 confirmar = input("Deseja realmente excluir uma transação? (S/N): ").strip().lower() #opção de escolha ao usuário
                 if confirmar in ['s', 'sim']:
-                    excluir_transacao() # Chamando a função de exclusão
+                    excluir_transacao(repo) # Chamando a função de exclusão
                     break
                 elif confirmar in ['não', 'nao', 'n']:
                     print("Retornando ao menu principal...")
-                    tela_inicial()
+                    tela_inicial(conta, pre_carga)
                     break
                 else:
                    print("❌ Opção inválida! Digite 'sim' ou 'não'.")
@@ -632,11 +4551,11 @@ while True:
             while True:
                 confirmar = input("Deseja realmente consultar uma transação? (S/N): ").strip().lower() #opção de escolha ao usuário
                 if confirmar in ['s', 'sim']:
-                    consultar_transacao_por_ID()
+                    consultar_transacao_por_ID(repo)
                     break
                 elif confirmar in ['não', 'nao', 'n']:
                     print("Retornando ao menu principal...")
-                    tela_inicial()
+                    tela_inicial(conta, pre_carga)
                     break
                 else:
                     print("❌ Opção inválida! Digite 'sim' ou 'não'.")
@@ -646,7 +4565,7 @@ while True:
         elif opcao_menu == '6':
             print("Opção selecionada: calcular_total_transacoes")
             try:
-                transacoes = load_bd()
+                transacoes = repo.transacoes()
             except FileNotFoundError:
                  print("❌ Nenhuma transação encontrada.")
                  continue
@@ -654,18 +4573,22 @@ while True:
             categoria = input("Deseja filtrar por categoria? Se sim, digite o nome (ou pressione Enter para somar todas): ").strip()
 
             if categoria == "":
-                total = calcular_total_transacoes(transacoes)
+                total = calcular_total_transacoes(repo.agregados())
             else:
-                total = calcular_total_transacoes(transacoes, categoria)
+                total = calcular_total_transacoes(repo.agregados(), categoria)
+
+            print(f"\n💰 Total das transações: R$ {formatar_valor(total)}")
 
-            print(f"\n💰 Total das transações: R$ {total:,.2f}".replace(".", ","))
 
 
+#OPÇÃO 7 DO MENU - DIAGNÓSTICO
+        elif opcao_menu == '7':
+            diagnostico.menu_diagnostico(sys.modules[__name__], FUNCOES_DIAGNOSTICO)
 
 #OPÇÃO INVÁLIDA
         else:
             print("Opção inválida. Tente novamente.")
 
-# Execução do programa
-# -------------------------------
-run()
\ No newline at end of file
+    # Execução do programa
+    # -------------------------------
+    run(conta)
\ No newline at end of file
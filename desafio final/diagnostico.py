@@ -0,0 +1,226 @@
+# -----------------------
+# DIAGNOSTICS
+# -----------------------
+# Instrumentação opcional: TRANSACOES_DIAGNOSTICO=1, --diagnostico no CLI ou a opção 7 do menu.
+# Desligada não custa nada: ativar_diagnostico(modulo, funcoes) é que troca as funções
+# listadas (do módulo ou das classes dele) por versões que contam chamadas, latência
+# (histograma), linhas e bytes lidos/escritos. As medidas são inclusivas: o load_bd inclui o
+# ler_snapshot que ele chama.
+# Bytes vêm do /proc/thread-self/io (Linux); noutros sistemas ficam em branco.
+# Não conhece o script: ele passa o próprio módulo e a lista das funções (FUNCOES_DIAGNOSTICO).
+import bisect
+import cProfile
+import functools
+import io
+import json
+import os
+import pstats
+import threading
+import time
+
+LIMITES_HISTOGRAMA_MS = (0.1, 1, 10, 100, 1_000, 10_000)  # faixas do histograma de latência
+
+class MetricaDiagnostico:
+    """Acumulado das chamadas de uma função instrumentada."""
+
+    def __init__(self):
+        self.chamadas = 0
+        self.erros = 0
+        self.segundos = 0.0
+        self.maximo = 0.0
+        self.histograma = [0] * (len(LIMITES_HISTOGRAMA_MS) + 1)
+        self.linhas = 0
+        self.bytes_lidos = 0
+        self.bytes_escritos = 0
+
+    def registrar(self, segundos, linhas=None, lidos=None, escritos=None, erro=False):
+        self.chamadas += 1
+        self.erros += erro
+        self.segundos += segundos
+        self.maximo = max(self.maximo, segundos)
+        self.histograma[bisect.bisect_left(LIMITES_HISTOGRAMA_MS, segundos * 1000)] += 1
+        self.linhas += linhas or 0
+        self.bytes_lidos += lidos or 0
+        self.bytes_escritos += escritos or 0
+
+    def para_dict(self):
+        faixas = [f"<={limite}ms" for limite in LIMITES_HISTOGRAMA_MS] + [f">{LIMITES_HISTOGRAMA_MS[-1]}ms"]
+        return {"chamadas": self.chamadas, "erros": self.erros, "segundos": self.segundos,
+                "media_ms": self.segundos / self.chamadas * 1000 if self.chamadas else None,
+                "maximo_ms": self.maximo * 1000, "histograma": dict(zip(faixas, self.histograma)),
+                "linhas": self.linhas, "bytes_lidos": self.bytes_lidos, "bytes_escritos": self.bytes_escritos}
+
+_metricas = {}                         # nome da função -> MetricaDiagnostico
+_lock_diagnostico = threading.Lock()   # a compactação e o servidor HTTP também chamam funções medidas
+_originais = {}                        # nome -> (dono, atributo, objeto original), para desativar
+_perfil = None                         # cProfile.Profile em andamento, se houver
+_inicializacao = {}                    # etapa da inicialização -> (segundos desde o início do programa, duração)
+
+def _contadores_io():
+    """(bytes lidos, bytes escritos, bytes desta própria leitura) pela thread até agora, ou None fora do Linux."""
+    for caminho in ("/proc/thread-self/io", "/proc/self/io"):
+        try:
+            with open(caminho, "rb") as file:
+                conteudo = file.read()
+            campos = dict(linha.split(b":") for linha in conteudo.splitlines())
+            return int(campos[b"rchar"]), int(campos[b"wchar"]), len(conteudo)
+        except (OSError, KeyError, ValueError):
+            continue
+    return None
+
+def _medir(nome, funcao, contar_linhas):
+    @functools.wraps(funcao)
+    def medida(*args, **kwargs):
+        antes = _contadores_io()
+        inicio = time.perf_counter()
+        resultado, erro = None, True
+        try:
+            resultado = funcao(*args, **kwargs)
+            erro = False
+            return resultado
+        finally:
+            segundos = time.perf_counter() - inicio
+            depois = _contadores_io()
+            linhas = None
+            if not erro and contar_linhas is not None:
+                try:
+                    linhas = contar_linhas(args, resultado)
+                except Exception:
+                    pass  # contar linhas nunca pode quebrar a operação medida
+            lidos, escritos = (depois[0] - antes[0] - antes[2], depois[1] - antes[1]) if antes and depois else (None, None)
+            with _lock_diagnostico:
+                if nome not in _metricas:
+                    _metricas[nome] = MetricaDiagnostico()
+                _metricas[nome].registrar(segundos, linhas, lidos, escritos, erro)
+    return medida
+
+def diagnostico_ativo():
+    return bool(_originais)
+
+def ativar_diagnostico(modulo, funcoes):
+    """
+    Troca as funções de `modulo` listadas em `funcoes` pelas versões medidas (chamar de novo não
+    faz nada). `funcoes`: nome ("load_bd" ou "Classe.metodo") -> como contar as linhas a partir
+    de (argumentos, resultado), ou None.
+    """
+    for nome, contar_linhas in funcoes.items():
+        if nome in _originais:
+            continue
+        classe, _, atributo = nome.rpartition(".")
+        dono = getattr(modulo, classe) if classe else modulo
+        original = vars(dono)[atributo]
+        if isinstance(original, classmethod):
+            medida = classmethod(_medir(nome, original.__func__, contar_linhas))
+        else:
+            medida = _medir(nome, original, contar_linhas)
+        setattr(dono, atributo, medida)
+        _originais[nome] = (dono, atributo, original)
+
+def desativar_diagnostico():
+    """Volta as funções originais (as métricas já coletadas continuam lá)."""
+    while _originais:
+        _, (dono, atributo, original) = _originais.popitem()
+        setattr(dono, atributo, original)
+
+def registrar_inicializacao(etapa, desde_inicio, duracao=None):
+    """Tempos da inicialização (ver WARM START): medidos sempre, mesmo com a instrumentação desligada."""
+    with _lock_diagnostico:
+        _inicializacao[etapa] = (desde_inicio, duracao)
+
+def zerar_diagnostico():
+    with _lock_diagnostico:
+        _metricas.clear()
+
+def dados_diagnostico():
+    """Métricas de todas as funções chamadas, da que mais consumiu tempo para a que menos."""
+    with _lock_diagnostico:
+        funcoes = {nome: metrica.para_dict() for nome, metrica in
+                   sorted(_metricas.items(), key=lambda item: item[1].segundos, reverse=True)}
+        inicializacao = {etapa: {"desde_inicio_s": desde_inicio, "duracao_s": duracao}
+                         for etapa, (desde_inicio, duracao) in sorted(_inicializacao.items(), key=lambda item: item[1][0])}
+    return {"ativo": diagnostico_ativo(), "gerado_em": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "pid": os.getpid(), "inicializacao": inicializacao, "funcoes": funcoes}
+
+def salvar_diagnostico(caminho):
+    with open(caminho, "w", encoding="utf-8") as file:
+        json.dump(dados_diagnostico(), file, ensure_ascii=False, indent=2)
+    return os.path.abspath(caminho)
+
+def formatar_diagnostico(dados=None):
+    dados = dados or dados_diagnostico()
+    texto = ""
+    if dados.get("inicializacao"):
+        texto = "inicialização (desde o início do programa):\n"
+        for etapa, tempos in dados["inicializacao"].items():
+            texto += f"    {etapa:<12}{tempos['desde_inicio_s']:>8.2f}s"
+            texto += f"  (etapa: {tempos['duracao_s']:.2f}s)\n" if tempos["duracao_s"] is not None else "\n"
+        texto += "\n"
+    if not dados["funcoes"]:
+        return texto + ("Nenhuma chamada medida ainda." if dados["ativo"] else "Diagnóstico desligado.")
+    texto += f"{'função':<38}{'chamadas':>9}{'total ms':>12}{'média ms':>11}{'máx ms':>11}{'linhas':>11}{'lidos':>13}{'escritos':>13}\n"
+    texto += "-" * 118 + "\n"
+    for nome, m in dados["funcoes"].items():
+        texto += (f"{nome:<38}{m['chamadas']:>9}{m['segundos'] * 1000:>12.2f}{m['media_ms']:>11.3f}{m['maximo_ms']:>11.2f}"
+                  f"{m['linhas'] or '-':>11}{m['bytes_lidos'] or '-':>13}{m['bytes_escritos'] or '-':>13}\n")
+        texto += "    " + "  ".join(f"{faixa}: {n}" for faixa, n in m["histograma"].items() if n) + "\n"
+    return texto.rstrip("\n")
+
+def iniciar_perfil():
+    """Liga o cProfile no processo inteiro (independe da instrumentação acima)."""
+    global _perfil
+    if _perfil is None:
+        _perfil = cProfile.Profile()
+        _perfil.enable()
+
+def parar_perfil(caminho, linhas=20):
+    """Desliga o cProfile, grava o .prof (abre com pstats ou snakeviz) e retorna o resumo por tempo acumulado."""
+    global _perfil
+    if _perfil is None:
+        return None
+    _perfil.disable()
+    _perfil.dump_stats(caminho)
+    resumo = io.StringIO()
+    pstats.Stats(_perfil, stream=resumo).sort_stats("cumulative").print_stats(linhas)
+    _perfil = None
+    return resumo.getvalue()
+
+def menu_diagnostico(modulo, funcoes):
+    """Opção 7 do menu: métricas da sessão, dump em json e cProfile (ativar_diagnostico recebe modulo e funcoes)."""
+    while True:
+        print("\n## Diagnóstico de desempenho ##")
+        print(f"Instrumentação: {'ligada' if diagnostico_ativo() else 'desligada'}"
+              f" | cProfile: {'gravando' if _perfil is not None else 'parado'}")
+        print("1. Ver métricas")
+        print("2. Salvar métricas em json")
+        print("3. Iniciar cProfile" if _perfil is None else "3. Parar cProfile e salvar")
+        print("4. Zerar métricas")
+        print("5. Desligar instrumentação" if diagnostico_ativo() else "5. Ligar instrumentação")
+        print("-" * 10)
+        print("0. Retornar ao menu anterior")
+        opcao = input("Digite o número da opção desejada: ").strip()
+        if opcao == '1':
+            print("\n" + formatar_diagnostico())
+        elif opcao == '2':
+            nome_arquivo = input("Nome do arquivo (Enter para diagnostico.json): ").strip() or "diagnostico.json"
+            print(f"✅ Métricas salvas em: {salvar_diagnostico(nome_arquivo)}")
+        elif opcao == '3':
+            if _perfil is None:
+                iniciar_perfil()
+                print("⏺️ cProfile iniciado: use o programa e volte aqui para parar.")
+            else:
+                nome_arquivo = input("Nome do arquivo (Enter para perfil.prof): ").strip() or "perfil.prof"
+                print(parar_perfil(nome_arquivo))
+                print(f"✅ Perfil salvo em: {os.path.abspath(nome_arquivo)}")
+        elif opcao == '4':
+            zerar_diagnostico()
+            print("Métricas zeradas.")
+        elif opcao == '5':
+            if diagnostico_ativo():
+                desativar_diagnostico()
+            else:
+                ativar_diagnostico(modulo, funcoes)
+            print(f"Instrumentação {'ligada' if diagnostico_ativo() else 'desligada'}.")
+        elif opcao == '0':
+            break
+        else:
+            print("Opção inválida. Tente novamente.")
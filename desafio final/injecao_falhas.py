@@ -0,0 +1,162 @@
+# -----------------------
+# FAULT INJECTION
+# -----------------------
+# Confere que uma queda no meio de uma escrita nunca deixa o banco num estado parcial:
+#   python desafio_final_grupo3_ultimaversao.py falhas [--transacoes N] [--formatos json,bin] [--aleatorias K]
+# Cada cenário grava o mesmo lote (edições, exclusões e inclusões) num banco novo em ./falhas,
+# num processo filho que morre com os._exit num ponto de falha (ver ponto_de_falha) ou leva
+# um SIGKILL num instante sorteado. Depois o banco é relido (load_bd e o índice de UUID): tem
+# que estar exatamente como antes do lote ou exatamente como depois dele.
+# Não importa o script: recebe o módulo dele (`app`); o processo filho arma a falha e a
+# escolha do journal com o armar_falha de lá (ver ponto_de_falha).
+import contextlib
+import importlib
+import io
+import multiprocessing
+import os
+import random
+import shutil
+import time
+import uuid
+
+from data import settings
+
+PONTOS_FALHA = {
+    "salvar_json": ("snapshot_parcial", "troca_antes_fsync", "troca_antes_replace", "troca_depois_replace"),
+    "journal": ("journal_parcial", "journal_antes_fsync"),
+    "reescrita": ("snapshot_parcial", "troca_antes_replace", "troca_depois_replace"),  # journal desligado
+    "group_commit": ("grupo_antes_gravar", "journal_parcial", "journal_antes_fsync"),
+    "compactacao": ("snapshot_parcial", "troca_antes_fsync", "troca_antes_replace", "troca_depois_replace"),
+}
+CENARIOS_ALEATORIOS_FALHA = ("salvar_json", "journal", "group_commit")
+DIRETORIO_FALHAS = "./falhas"
+
+def _lote_falhas(uuids, tamanho=50):
+    """O lote gravado em todos os cenários: `tamanho` edições, exclusões e inclusões."""
+    edicoes = [("edit", {"UUID": u, "valor": 1000 + i / 100, "categoria": "casa"}) for i, u in enumerate(uuids[:tamanho])]
+    exclusoes = [("delete", {"UUID": u}) for u in uuids[tamanho:2 * tamanho]]
+    inclusoes = [("add", {"UUID": str(uuid.UUID(int=i + 1)), "valor": i + 0.25, "categoria": "lazer",
+                          "criado_em": "2025-01-01T00:00:00"}) for i in range(tamanho)]
+    return edicoes + exclusoes + inclusoes
+
+def _estado_falhas(app, transacoes):
+    """O que importa comparar: UUID -> (centavos, categoria)."""
+    return {app.chave_registro(t): (app.para_centavos(t["valor"]), t.get("categoria")) for t in transacoes}
+
+def _estado_depois(app, estado, operacoes):
+    depois = dict(estado)
+    for op, transacao in operacoes:
+        if op == "delete":
+            depois.pop(app.chave_registro(transacao), None)
+        else:
+            depois[app.chave_registro(transacao)] = (app.para_centavos(transacao["valor"]), transacao.get("categoria"))
+    return depois
+
+def _executar_cenario_falha(nome_app, cenario, filepath, ponto, operacoes, pronto=None):
+    """
+    Roda no processo filho: grava o lote do cenário com a falha `ponto` armada (None: sem
+    falha). Avisa `pronto` quando começa, para as mortes sorteadas não caírem na importação.
+    """
+    app = importlib.import_module(nome_app)  # o script já carregado no filho ("__main__" quando rodado direto)
+    app.armar_falha(ponto, usar_journal=cenario != "reescrita")
+    if pronto is not None:
+        pronto.set()
+    with contextlib.redirect_stdout(io.StringIO()):
+        if cenario == "salvar_json":
+            dados = {t.chave(): t for t in app.carregar_transacoes(filepath)}
+            for op, transacao in operacoes:
+                if op == "delete":
+                    dados.pop(app.chave_registro(transacao), None)
+                else:
+                    dados[app.chave_registro(transacao)] = app.Transacao.de(transacao)
+            app.salvar_json(list(dados.values()), *os.path.split(filepath))
+        elif cenario in ("journal", "reescrita"):
+            app.RepositorioTransacoes(filepath).aplicar_lote(operacoes)
+        elif cenario == "group_commit":
+            repo = app.RepositorioTransacoes(filepath)
+            repo.janela_grupo = 60  # só o descarregar() abaixo grava
+            for operacao in operacoes:
+                repo.aplicar_lote([operacao])
+            repo.descarregar()
+        elif cenario == "compactacao":
+            app.compactar_journal(filepath)
+
+def _conferir_falha(app, filepath, antes, depois):
+    """'antigo', 'novo' ou a descrição do estado parcial/ilegível em que o banco ficou."""
+    try:
+        estado = _estado_falhas(app, app.load_bd(filepath))
+        indice = app.obter_indice(filepath)
+        for chave in set(antes) ^ set(depois) | {c for c in antes if antes[c] != depois.get(c)}:
+            encontrada = indice.buscar(str(uuid.UUID(int=chave)) if isinstance(chave, int) else chave)
+            if (encontrada is None) != (chave not in estado):
+                return f"índice diverge do banco no UUID {chave}"
+    except Exception as e:
+        return f"ilegível: {type(e).__name__}: {e}"
+    if estado == depois:
+        return "novo"
+    if estado == antes:
+        return "antigo"
+    return (f"parcial: {sum(estado.get(c) != v for c, v in depois.items())} de "
+            f"{sum(antes.get(c) != v for c, v in depois.items())} alterações aplicadas")
+
+def executar_testes_de_falha(app, num_transacoes=2_000, formatos=("json", "bin"), aleatorias=5,
+                             diretorio=DIRETORIO_FALHAS, seed=settings.seed):
+    """Roda todos os cenários/pontos (e as mortes aleatórias) sobre o script `app` e retorna a lista de resultados."""
+    contexto = multiprocessing.get_context("spawn")
+    sorteio = random.Random(seed)
+    resultados = []
+    for formato in formatos:
+        extensao = {"json": ".json", "bin": ".bin"}[formato]
+        base = os.path.join(diretorio, f"base{extensao}")
+        shutil.rmtree(diretorio, ignore_errors=True)
+        with contextlib.redirect_stdout(io.StringIO()):
+            app.criar_bd_datado(num_transacoes, path2save=diretorio, filename=os.path.basename(base))
+        antes_lote = app.carregar_transacoes(base)
+        operacoes = _lote_falhas([t.uuid for t in antes_lote])
+        estado_base = _estado_falhas(app, antes_lote)
+        estado_lote = _estado_depois(app, estado_base, operacoes)
+
+        for cenario, pontos in PONTOS_FALHA.items():
+            antes, depois = (estado_lote, estado_lote) if cenario == "compactacao" else (estado_base, estado_lote)
+            # a primeira tentativa, sem falha, tem que chegar ao fim e dá a duração para sortear as mortes
+            tentativas = [(None, None)] + [(ponto, None) for ponto in pontos]
+            if cenario in CENARIOS_ALEATORIOS_FALHA:
+                tentativas += [(None, sorteio.uniform(0, 1.2)) for _ in range(aleatorias)]  # fração da duração
+            duracao = 0.0
+            for numero, (ponto, fracao) in enumerate(tentativas):
+                pasta = os.path.join(diretorio, f"{formato}-{cenario}-{numero}")
+                os.makedirs(pasta)
+                filepath = os.path.join(pasta, f"transactions{extensao}")
+                shutil.copy2(base, filepath)
+                if cenario == "compactacao":  # o lote já está no journal; a falha é na hora de incorporá-lo
+                    processo = contexto.Process(target=_executar_cenario_falha,
+                                                args=(app.__name__, "journal", filepath, None, operacoes))
+                    processo.start()
+                    processo.join()
+                pronto = contexto.Event()
+                processo = contexto.Process(target=_executar_cenario_falha,
+                                            args=(app.__name__, cenario, filepath, ponto, operacoes, pronto))
+                processo.start()
+                pronto.wait()
+                inicio = time.perf_counter()
+                morte = None if fracao is None else fracao * duracao
+                if morte is not None:
+                    processo.join(morte)
+                    if processo.is_alive():
+                        processo.kill()
+                processo.join()
+                if numero == 0:
+                    duracao = time.perf_counter() - inicio
+                estado = _conferir_falha(app, filepath, antes, depois)
+                if ponto is None and morte is None:
+                    ok = estado == "novo" and processo.exitcode == 0
+                else:  # o processo tem que ter morrido no ponto (a morte sorteada pode chegar depois do fim)
+                    ok = estado in ("antigo", "novo") and (morte is not None or processo.exitcode == app.CODIGO_FALHA_INJETADA)
+                resultado = {"formato": formato, "cenario": cenario,
+                             "falha": ponto or (f"SIGKILL em {morte * 1000:.1f} ms" if morte is not None else "nenhuma"),
+                             "codigo_saida": processo.exitcode, "estado": estado, "ok": ok}
+                resultados.append(resultado)
+                print(f"{'✅' if ok else '❌'} {formato:<5} {cenario:<13} {resultado['falha']:<22} "
+                      f"saída {processo.exitcode:>3}  banco {estado}", flush=True)
+    shutil.rmtree(diretorio, ignore_errors=True)
+    return resultados
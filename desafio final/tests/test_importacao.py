@@ -0,0 +1,75 @@
+import io
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import desafio_final_grupo3_ultimaversao as app
+
+EXISTENTE = "00000000-0000-4000-8000-000000000001"
+
+CSV = """UUID;valor;categoria
+00000000-0000-4000-8000-000000000010;1.234,56;casa
+00000000-0000-4000-8000-000000000011;;casa
+00000000-0000-4000-8000-000000000012;abc;casa
+00000000-0000-4000-8000-000000000013;5,00;
+00000000-0000-4000-8000-000000000001;7,00;casa
+00000000-0000-4000-8000-000000000010;8,00;lazer
+;9,90;lazer
+00000000-0000-4000-8000-000000000014;12.5;saude
+00000000-0000-4000-8000-000000000015;1,234;saude
+00000000-0000-4000-8000-000000000010;2,00;casa
+"""
+
+REJEITADAS_CSV = {
+    3: "valor ausente",
+    4: "abc",
+    5: "categoria ausente",
+    6: f"UUID {EXISTENTE} já existe",                           # já está no banco
+    7: "UUID 00000000-0000-4000-8000-000000000010 já existe",   # repetido dentro do próprio arquivo
+    10: "1,234",
+    11: "UUID 00000000-0000-4000-8000-000000000010 já existe",  # repetido num lote depois do da primeira
+}
+
+
+@pytest.fixture(params=["transactions.json", "transactions.bin", "transactions.db"])
+def banco(request, tmp_path):
+    filepath = str(tmp_path / request.param)
+    app.gravar_snapshot([{"UUID": EXISTENTE, "valor": 1.0, "categoria": "casa"}], filepath)
+    return filepath
+
+
+def _estado(filepath):
+    return {t["UUID"]: (t["valor"], t["categoria"]) for t in app.iterar_bd(filepath)}
+
+
+@pytest.mark.parametrize("tamanho_lote", [100, 2], ids=["journal", "lotes"])
+def test_csv_rejeita_linhas_ruins_e_repetidas(banco, tamanho_lote):
+    importadas, rejeitadas = app.importar_transacoes(io.StringIO(CSV), banco, tamanho_lote=tamanho_lote)
+
+    assert importadas == 3
+    assert {r["linha"] for r in rejeitadas} == set(REJEITADAS_CSV)
+    for r in rejeitadas:
+        assert REJEITADAS_CSV[r["linha"]] in r["erro"], r
+    estado = _estado(banco)
+    assert len(estado) == 4
+    assert estado[EXISTENTE] == (1.0, "casa")  # a repetida não sobrescreveu a do banco
+    assert estado["00000000-0000-4000-8000-000000000010"] == (1234.56, "casa")
+    assert estado["00000000-0000-4000-8000-000000000014"] == (12.5, "saude")
+    assert (9.9, "lazer") in estado.values()  # sem UUID: gerado na importação
+
+
+def test_ndjson_rejeita_json_invalido(banco):
+    entrada = io.StringIO('{"UUID": "00000000-0000-4000-8000-000000000020", "valor": 3, "categoria": "casa"}\n'
+                          '{"valor": 4, "categoria": \n'
+                          '[1, 2]\n'
+                          '\n'
+                          '{"uuid": "00000000-0000-4000-8000-000000000020", "valor": "4,00", "categoria": "lazer"}\n')
+    importadas, rejeitadas = app.importar_transacoes(entrada, banco)
+
+    assert importadas == 1
+    assert [(r["linha"], r["erro"].split(" (")[0]) for r in rejeitadas] == [
+        (2, "json inválido"), (3, "a linha não é um objeto json"), (5, "UUID 00000000-0000-4000-8000-000000000020 já existe")]
+    assert _estado(banco)["00000000-0000-4000-8000-000000000020"] == (3.0, "casa")
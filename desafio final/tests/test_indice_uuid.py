@@ -0,0 +1,67 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import desafio_final_grupo3_ultimaversao as app
+
+
+def _transacao(i, valor=10.0):
+    return {"UUID": f"00000000-0000-4000-8000-{i:012d}", "valor": valor, "categoria": "casa"}
+
+
+def _valor(indice, i):
+    transacao = indice.buscar(_transacao(i)["UUID"])
+    return None if transacao is None else transacao["valor"]
+
+
+@pytest.fixture(params=["transactions.json", "transactions.bin"])
+def banco(request, tmp_path):
+    filepath = str(tmp_path / request.param)
+    app.gravar_snapshot([_transacao(i, float(i)) for i in range(200)], filepath)
+    return filepath
+
+
+def test_indice_acompanha_insercao_edicao_e_exclusao(banco):
+    indice = app.obter_indice(banco)
+    assert _valor(indice, 150) == 150.0
+    assert indice.buscar(_transacao(150)["UUID"].upper())["UUID"] == _transacao(150)["UUID"]
+    assert indice.buscar(_transacao(999)["UUID"]) is None
+
+    indice.gravar("add", _transacao(999, 9.99))
+    indice.gravar_lote([("edit", _transacao(3, 33.0)), ("delete", _transacao(4))])
+    indice.gravar("delete", _transacao(999))
+    indice.gravar("add", _transacao(999, 1.0))  # volta depois de excluída
+
+    assert _valor(indice, 999) == 1.0
+    assert _valor(indice, 3) == 33.0
+    assert _valor(indice, 4) is None
+    assert not indice.contem(_transacao(4)["UUID"]) and indice.contem(_transacao(999)["UUID"])
+
+
+def test_indice_apos_compactacao_e_reabertura(banco):
+    indice = app.obter_indice(banco)
+    indice.gravar_lote([("add", _transacao(500, 5.0)), ("edit", _transacao(7, 70.0)), ("delete", _transacao(8))])
+
+    app.compactar_journal(banco)
+
+    assert app.journais(banco) == []
+    assert _valor(indice, 500) == 5.0
+    assert _valor(indice, 7) == 70.0
+    assert _valor(indice, 8) is None
+    indice.gravar("edit", _transacao(500, 6.0))  # o índice reconstruído continua aceitando escritas
+    assert _valor(indice, 500) == 6.0
+
+    novo = app.IndiceUUID(banco)  # outro processo: lê o .idx do disco
+    assert [_valor(novo, i) for i in (500, 7, 8, 199)] == [6.0, 70.0, None, 199.0]
+
+
+def test_indice_refeito_se_o_snapshot_muda_por_fora(banco):
+    indice = app.obter_indice(banco)
+    assert _valor(indice, 10) == 10.0
+    app.gravar_snapshot([_transacao(10, 1.25), _transacao(1000, 2.5)], banco)
+    assert _valor(indice, 10) == 1.25
+    assert _valor(indice, 1000) == 2.5
+    assert _valor(indice, 11) is None
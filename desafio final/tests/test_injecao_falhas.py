@@ -0,0 +1,18 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import desafio_final_grupo3_ultimaversao as app
+import injecao_falhas
+
+
+def test_quedas_deixam_o_banco_inteiro(tmp_path):
+    # versão reduzida do `falhas`: só o json, 200 transações e uma morte sorteada por cenário
+    resultados = injecao_falhas.executar_testes_de_falha(app, 200, ("json",), 1, diretorio=str(tmp_path / "falhas"))
+
+    assert [r for r in resultados if not r["ok"]] == []
+    esperados = {(cenario, ponto) for cenario, pontos in injecao_falhas.PONTOS_FALHA.items() for ponto in pontos}
+    injetados = {(r["cenario"], r["falha"]) for r in resultados if r["codigo_saida"] == app.CODIGO_FALHA_INJETADA}
+    assert injetados == esperados  # cada ponto de falha foi mesmo atingido no processo filho
+    assert len(resultados) == len(esperados) + len(injecao_falhas.PONTOS_FALHA) + len(injecao_falhas.CENARIOS_ALEATORIOS_FALHA)
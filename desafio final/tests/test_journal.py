@@ -0,0 +1,60 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import desafio_final_grupo3_ultimaversao as app
+
+
+def _transacao(i, valor=10.0, categoria="casa"):
+    return {"UUID": f"00000000-0000-4000-8000-{i:012d}", "valor": valor, "categoria": categoria}
+
+
+def _estado(transacoes):
+    return sorted((t["UUID"], t["valor"], t["categoria"]) for t in transacoes)
+
+
+@pytest.fixture(params=["transactions.json", "transactions.bin"])
+def banco(request, tmp_path):
+    filepath = str(tmp_path / request.param)
+    app.gravar_snapshot([_transacao(i) for i in range(5)], filepath)
+    return filepath
+
+
+def test_replay_do_journal_apos_add_edit_delete(banco):
+    app.registrar_journal("edit", _transacao(1, 99.9, "lazer"), banco)
+    app.registrar_journal("delete", _transacao(2), banco)
+    app.registrar_operacoes([("add", _transacao(7, 1.5)), ("edit", _transacao(7, 2.5)), ("delete", _transacao(3))], banco)
+    app.registrar_journal("delete", _transacao(42), banco)  # excluir o que não existe é ignorado
+
+    esperado = _estado([_transacao(0), _transacao(1, 99.9, "lazer"), _transacao(4), _transacao(7, 2.5)])
+    assert app.journais(banco) == [app.caminho_journal(banco)]
+    assert _estado(app.carregar_transacoes(banco)) == esperado
+    assert _estado(app.iterar_bd(banco)) == esperado
+
+
+def test_compactacao_incorpora_o_journal(banco):
+    app.registrar_operacoes([("edit", _transacao(0, 5.0)), ("delete", _transacao(4)), ("add", _transacao(9))], banco)
+    antes = _estado(app.carregar_transacoes(banco))
+
+    app.compactar_journal(banco)
+
+    assert app.journais(banco) == []
+    assert _estado(app.ler_snapshot(banco)) == antes
+    assert _estado(app.carregar_transacoes(banco)) == antes
+
+    # reaplicar um journal já compactado (queda antes de apagá-lo) não muda nada
+    app.registrar_operacoes([("edit", _transacao(0, 5.0)), ("delete", _transacao(4)), ("add", _transacao(9))], banco)
+    assert _estado(app.carregar_transacoes(banco)) == antes
+
+
+def test_linha_cortada_no_fim_do_journal_e_ignorada(banco):
+    app.registrar_journal("edit", _transacao(1, 3.0), banco)
+    with open(app.caminho_journal(banco), "ab") as file:
+        file.write(b'{"op": "delete", "transacao": {"UUID": "00000000-0000-4000-8000-0000')  # queda no meio da escrita
+
+    assert _estado(app.carregar_transacoes(banco)) == _estado([_transacao(0), _transacao(1, 3.0)] + [_transacao(i) for i in range(2, 5)])
+    app.registrar_journal("delete", _transacao(0), banco)  # a próxima escrita fecha a linha cortada
+    assert [t["UUID"] for t in app.iterar_bd(banco)] == [_transacao(i)["UUID"] for i in range(1, 5)]
@@ -0,0 +1,36 @@
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import desafio_final_grupo3_ultimaversao as app
+
+
+def _uuids(lista):
+    return [t["UUID"] for t in lista]
+
+
+def _comparar(transacoes, k, categoria=None):
+    serial = app.selecionar_top_k(transacoes, k, categoria)
+    paralelo = app.relatorio_paralelo(transacoes, k, categoria, processos=2, limite_serial=0)
+    for lista in ("max", "min", "median"):
+        assert _uuids(paralelo[lista]) == _uuids(serial[lista]), (lista, transacoes)
+    assert paralelo["quantidade"] == serial["quantidade"]
+
+
+def test_empate_na_distancia_da_media():
+    # média 20,20: 20,30 e 20,10 estão a 10 centavos dela; em reais o float desempata errado
+    transacoes = [{"UUID": f"u{i}", "valor": valor, "categoria": "casa"}
+                  for i, valor in enumerate([20.3, 10.1, 30.3, 20.1])]
+    _comparar(transacoes, 2)
+
+
+def test_empates_aleatorios_iguais_ao_serial():
+    gerador = random.Random(42)
+    valores = [round(gerador.uniform(1, 100), 2) for _ in range(12)]  # poucos valores: muitos empates
+    for _ in range(30):
+        transacoes = [{"UUID": f"u{i}", "valor": gerador.choice(valores), "categoria": gerador.choice(["casa", "lazer"])}
+                      for i in range(gerador.randint(2, 40))]
+        _comparar(transacoes, gerador.randint(1, 6))
+        _comparar(transacoes, 3, "lazer")
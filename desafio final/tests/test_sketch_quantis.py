@@ -0,0 +1,66 @@
+import math
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import desafio_final_grupo3_ultimaversao as app
+
+QUANTIS = [0, 0.01, 0.1, 0.25, 0.5, 0.75, 0.9, 0.99, 1]
+
+
+def _posto_mais_proximo(valores, q):
+    ordenados = sorted(valores)
+    return ordenados[max(1, math.ceil(q * len(ordenados))) - 1]
+
+
+def _sketch(valores, **kwargs):
+    sketch = app.SketchQuantis(**kwargs)
+    for centavos in valores:
+        sketch.adicionar(centavos)
+    return sketch
+
+
+def test_modo_exato_igual_a_ordenar():
+    gerador = random.Random(1)
+    valores = [gerador.randint(-5_000, 100_000) for _ in range(3_000)]
+    sketch = _sketch(valores)
+    assert sketch.exato
+    for q in QUANTIS:
+        assert sketch.quantil(q) == _posto_mais_proximo(valores, q)
+
+    for centavos in valores[:1_000]:
+        sketch.remover(centavos)
+    assert sketch.exato and len(sketch) == 2_000
+    for q in QUANTIS:
+        assert sketch.quantil(q) == _posto_mais_proximo(valores[1_000:], q)
+    assert sum(faixa["quantidade"] for faixa in sketch.histograma()) == 2_000
+
+
+def test_modo_aproximado_dentro_do_erro_relativo():
+    gerador = random.Random(2)
+    valores = [round(gerador.lognormvariate(10, 2)) + 100 for _ in range(20_000)]  # de 1 real a milhões
+    sketch = _sketch(valores, limite=500)
+    assert not sketch.exato
+    assert len(sketch.contagens) < 3_000  # memória limitada pelos baldes, não pela quantidade
+    for q in QUANTIS:
+        exato, aproximado = _posto_mais_proximo(valores, q), sketch.quantil(q)
+        assert abs(aproximado - exato) <= app.ERRO_RELATIVO_QUANTIS * exato + 1, (q, exato, aproximado)  # +1: arredonda ao centavo
+
+
+def test_remover_e_mesclar_no_modo_aproximado():
+    gerador = random.Random(3)
+    valores = [gerador.randint(1, 10**7) for _ in range(5_000)]
+    extras = [gerador.randint(1, 10**7) for _ in range(500)]
+    todos = _sketch(valores + extras, limite=100)
+    for centavos in extras:
+        todos.remover(centavos)
+    assert todos.contagens == _sketch(valores, limite=100).contagens
+
+    # juntar um sketch exato com um aproximado dá o mesmo que montar um só com tudo
+    exato, aproximado = _sketch(valores[:50], limite=100), _sketch(valores[50:], limite=100)
+    assert exato.exato and not aproximado.exato
+    mesclado = exato.mesclar(aproximado)
+    assert not mesclado.exato and len(mesclado) == len(valores)
+    assert mesclado.contagens == _sketch(valores, limite=100).contagens
@@ -0,0 +1,55 @@
+import os
+import random
+import sys
+from decimal import Decimal
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import desafio_final_grupo3_ultimaversao as app
+
+
+@pytest.mark.parametrize("texto, centavos", [
+    ("250", 25000),
+    ("250,5", 25050),
+    ("1.234,56", 123456),
+    ("1234,56", 123456),
+    ("1234.56", 123456),
+    ("R$ 9,90", 990),
+    ("r$9,90", 990),
+    ("  -12,01 ", -1201),
+    ("0,07", 7),
+])
+def test_ler_valor_aceita(texto, centavos):
+    assert app.ler_valor(texto) == centavos
+
+
+@pytest.mark.parametrize("texto", ["", "abc", "1,234", "12.345.6", "1.23.456,00", "1234.567", "R$", "1,2,3", "nan", "1e3"])
+def test_ler_valor_rejeita(texto):
+    with pytest.raises(ValueError):
+        app.ler_valor(texto)
+
+
+def test_para_centavos_de_cada_tipo():
+    assert app.para_centavos(452.93) == 45293
+    assert app.para_centavos(7) == 700
+    assert app.para_centavos(Decimal("19.99")) == 1999
+    assert app.para_centavos("1.000,01") == 100001
+
+
+def test_ida_e_volta_texto_centavos_float():
+    gerador = random.Random(7)
+    for _ in range(2_000):
+        centavos = gerador.randint(-10**9, 10**9)
+        reais = centavos / 100  # o float que vai para o dict e o json
+        assert app.para_centavos(reais) == centavos
+        assert app.ler_valor(app.formatar_valor(reais)) == centavos
+        assert app.ler_valor(app.formatar_valor(reais, milhar=False)) == centavos
+
+
+def test_formatar_valor():
+    assert app.formatar_valor(1234.5) == "1.234,50"
+    assert app.formatar_valor(1234.5, milhar=False) == "1234,50"
+    assert app.formatar_valor(-0.07) == "-0,07"
+    assert app.formatar_valor(0) == "0,00"
@@ -0,0 +1,76 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import desafio_final_grupo3_ultimaversao as app
+
+UUID = "00000000-0000-4000-8000-000000000001"
+
+
+def _transacao(versao=None, valor=10.0, categoria="casa"):
+    transacao = {"UUID": UUID, "valor": valor, "categoria": categoria}
+    if versao is not None:
+        transacao["versao"] = versao
+    return transacao
+
+
+def test_versao_em_dia_ou_ausente_segue():
+    assert app.resolver_versao("add", _transacao(), None)["versao"] == 1
+    assert app.resolver_versao("edit", _transacao(2, valor=5.0), _transacao(2))["versao"] == 3
+    assert app.resolver_versao("edit", _transacao(valor=5.0), _transacao(4))["versao"] == 5  # sem "versao": grava sem conferir
+    assert app.resolver_versao("edit", _transacao(1), {"UUID": UUID, "valor": 10.0})["versao"] == 2  # sem o campo conta como 1
+    assert app.resolver_versao("delete", _transacao(3), _transacao(3)) == _transacao(3)
+
+
+def test_mescla_campos_diferentes():
+    original = _transacao(1)
+    atual = _transacao(2, categoria="lazer")                # o outro operador trocou a categoria
+    minha = _transacao(1, valor=99.0)                       # e eu, o valor
+    assert app.resolver_versao("edit", minha, atual, original) == _transacao(3, valor=99.0, categoria="lazer")
+
+
+@pytest.mark.parametrize("op, transacao, atual, original, trecho", [
+    ("edit", _transacao(1, categoria="saude"), _transacao(2, categoria="lazer"), _transacao(1), "mesmos campos: categoria"),
+    ("edit", _transacao(1, valor=1.0), _transacao(2, categoria="lazer"), None, "versão 1 -> 2"),
+    ("delete", _transacao(1), _transacao(2, valor=3.0), None, "alterada por outro operador"),
+    ("edit", _transacao(1, valor=1.0), None, _transacao(1), "excluída"),
+    ("delete", _transacao(1), None, None, "excluída"),
+])
+def test_conflitos(op, transacao, atual, original, trecho):
+    with pytest.raises(app.ConflitoVersao, match=trecho):
+        app.resolver_versao(op, transacao, atual, original)
+
+
+@pytest.fixture
+def banco(tmp_path):
+    filepath = str(tmp_path / "transactions.json")
+    app.gravar_snapshot([_transacao()], filepath)
+    return filepath
+
+
+def _lida(repo):
+    """A transação como o menu a lê para editar: com a versão lida (sem o campo é a 1)."""
+    lida = dict(repo.buscar(UUID))
+    return {**lida, "versao": lida.get("versao", 1)}
+
+
+def test_dois_operadores_no_mesmo_banco(banco):
+    operador1, operador2 = app.RepositorioTransacoes(banco), app.RepositorioTransacoes(banco)
+    lida1, lida2 = _lida(operador1), _lida(operador2)
+    assert lida1["versao"] == lida2["versao"] == 1
+
+    operador2.editar({**lida2, "categoria": "lazer"}, original=lida2)
+    operador1.editar({**lida1, "valor": 42.0}, original=lida1)  # campos diferentes: mescla
+    assert app.carregar_transacoes(banco)[0].para_dict() == _transacao(3, valor=42.0, categoria="lazer")
+
+    with pytest.raises(app.ConflitoVersao):
+        operador2.editar({**lida2, "valor": 1.0}, original=lida2)  # o valor mudou desde a versão 1 que ele leu
+    with pytest.raises(app.ConflitoVersao):
+        operador2.excluir(UUID, versao=lida2["versao"])
+    assert app.carregar_transacoes(banco)[0].para_dict() == _transacao(3, valor=42.0, categoria="lazer")
+
+    operador2.excluir(UUID, versao=3)
+    assert app.carregar_transacoes(banco) == []